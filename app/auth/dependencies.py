@@ -4,8 +4,8 @@ from app.auth.utils import verify_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    user = verify_token(token)
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    user = await verify_token(token)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -14,7 +14,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         )
     return user
 
-def require_admin(user: dict = Depends(get_current_user)):
+async def require_admin(user: dict = Depends(get_current_user)):
     if user["role"] != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
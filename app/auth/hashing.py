@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from app.auth.utils import hash_password, verify_password
+from app.core.config import settings
+
+
+def _lower_priority(increment: int):
+    # bcrypt is throughput work; on a shared CPU the event loop serving
+    # requests should win
+    if increment and hasattr(os, "nice"):
+        os.nice(increment)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated process pool with bounded admission.
+
+    At most `workers` hashes run at once and at most `max_queue` more may wait
+    for a worker; anything beyond that is rejected immediately with 503 so a
+    login burst cannot pile up behind bcrypt. With workers=0 the hashes run on
+    the default thread executor instead (the pre-pool behaviour). Pool
+    processes run `nice` steps below the app.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = 32, nice: int = 0):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_queue = max_queue
+        self.nice = nice
+        self._executor: Executor = None
+        self._slots = None
+        self._waiting = 0
+
+    def _ensure_started(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(self.workers, 1))
+        if self._executor is None and self.workers:
+            # spawn, not fork: the parent has event-loop and driver threads running
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_priority,
+                initargs=(self.nice,),
+            )
+
+    async def _run(self, fn, *args):
+        self._ensure_started()
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except BrokenProcessPool:
+            # a worker died; start a fresh pool for the next caller
+            self._executor = None
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str):
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain: str, hashed: str):
+        return await self._run(verify_password, plain, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    nice=settings.PASSWORD_HASH_NICE,
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum
+from sqlalchemy import Column, Integer, String, Enum, Float
 from app.core.database import Base
 import enum
 
@@ -14,3 +14,16 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole), nullable=False)
+
+class TokenRevocation(Base):
+    """Append-only log of per-user token cutoffs, shared by every worker.
+
+    Tokens for `subject` issued before `revoked_at` (epoch seconds) are
+    rejected. Rows are pruned once no token issued before them can still be
+    unexpired.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True)
+    subject = Column(String, nullable=False)
+    revoked_at = Column(Float, nullable=False, index=True)
@@ -1,64 +1,65 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, status
-from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.hashing import password_hasher
+from app.core.sessions import get_write_db
 from app.auth.schemas import SignupSchema, LoginSchema, ResetPasswordSchema, ForgotPasswordRequestSchema
-from app.auth.utils import hash_password, verify_password, create_access_token, create_refresh_token, verify_token, create_reset_token, send_reset_email
+from app.auth.utils import create_access_token, create_refresh_token, verify_token, create_reset_token, queue_reset_email, token_cache
 from app.auth.models import User
+from app.outbox.delivery import outbox_worker
 from app.utils.response import create_response
 from jose import JWTError
 from typing import Optional
 
 router = APIRouter(prefix="/auth", tags=["Auth Routes"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get('/')
-def health_check():
+async def health_check():
     return create_response(data={"message": "Health Check is done."})
 
 
 # ###################### USER MANAGEMENT ROUTES ######################
+# All auth routes use the primary: a signin right after signup, or after a
+# password reset, must see that write even if the replica lags.
 
 @router.post("/signup")
-def signup(payload: SignupSchema, db: Session = Depends(get_db)):
+async def signup(payload: SignupSchema, db: AsyncSession = Depends(get_write_db)):
     # check if user exists
-    existing_user = db.query(User).filter(User.email == payload.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == payload.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    # Hand the connection back to the pool while bcrypt runs, so logins queued
+    # behind the hashing pool cannot starve other routes of connections.
+    await db.close()
     user = User(
         name=payload.name,
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await password_hasher.hash(payload.password),
         role=payload.role
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     return create_response(data={"message": "User created successfully"})
 
 @router.post("/signin")
-def signin(payload: LoginSchema, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
+async def signin(payload: LoginSchema, db: AsyncSession = Depends(get_write_db)):
+    user = await db.scalar(select(User).where(User.email == payload.email))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not verify_password(payload.password, user.hashed_password):
+    await db.close()
+    if not await password_hasher.verify(payload.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect password")
     access_token = create_access_token(data={"id":user.id, "email": user.email, "role": user.role.value})
     refresh_token = create_refresh_token(data={"id":user.id, "email": user.email, "role": user.role.value})
     return create_response(data={"access_token": access_token, "refresh_token": refresh_token})
     
 @router.post("/reset-password")
-def reset_password(
+async def reset_password(
     payload: ResetPasswordSchema,
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid or missing Authorization header")
@@ -66,17 +67,21 @@ def reset_password(
     token = authorization.split(" ")[1]
 
     try:
-        payload_data = verify_token(token,)
+        payload_data = await verify_token(token)
         user_email = payload_data.get("sub")
         if not user_email:
             raise HTTPException(status_code=400, detail="Invalid token")
 
-        user = db.query(User).filter(User.email == user_email).first()
+        hashed_password = await password_hasher.hash(payload.new_password)
+        user = await db.scalar(select(User).where(User.email == user_email))
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user.hashed_password = hash_password(payload.new_password)
-        db.commit()
+        user.hashed_password = hashed_password
+        # tokens issued before the reset, including this reset token, stop
+        # working on every worker once this commits
+        await token_cache.revoke_subject(db, user.email)
+        await db.commit()
 
         return create_response(data={"message": "Password reset successfully"})
 
@@ -84,8 +89,8 @@ def reset_password(
         raise HTTPException(status_code=401, detail="Token is invalid or expired")
 
 @router.post("/forgot-password")
-def forgot_password(request: ForgotPasswordRequestSchema, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+async def forgot_password(request: ForgotPasswordRequestSchema, db: AsyncSession = Depends(get_write_db)):
+    user = await db.scalar(select(User).where(User.email == request.email))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -93,6 +98,8 @@ def forgot_password(request: ForgotPasswordRequestSchema, db: Session = Depends(
         )
 
     token = create_reset_token({"sub": user.email, "role": user.role.value})
-    send_reset_email(to_email=user.email, token=token)
-    
+    queue_reset_email(db, to_email=user.email, token=token)
+    await db.commit()
+    outbox_worker.notify()
+
     return create_response(data={"message": "Password reset link sent to your email."})  
@@ -0,0 +1,115 @@
+import hashlib
+import time
+from collections import OrderedDict
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.auth.models import TokenRevocation
+from app.core.change_log import ChangeLogCursor
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT claims, keyed by a SHA-256 digest of the token.
+
+    Entries expire at the token's own `exp`, so a cached token is never
+    accepted for longer than a full verification would accept it. Revocations
+    are per-user cutoffs in the token_revocations table, shared by every
+    worker and kept across restarts: tokens whose `iat` is older than the
+    user's cutoff are rejected whether cached or not. Each worker reads new
+    cutoffs at most every `refresh_interval` seconds and holds them for
+    `max_token_age`, the longest any token lives; after that no token they
+    could reject is still unexpired.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_size: int = 10_000, max_token_age: float = 7 * 86400,
+                 refresh_interval: float = 1.0):
+        self.engine = engine
+        self.max_size = max_size
+        self.max_token_age = max_token_age
+        self.refresh_interval = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self._cursor = ChangeLogCursor()
+        self._next_sync = 0.0
+
+    @staticmethod
+    def _key(token: str):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, token: str, claims: dict):
+        if "exp" not in claims:
+            return
+        self._entries[self._key(token)] = (claims["exp"], claims)
+        self._entries.move_to_end(self._key(token))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def revoke_subject(self, db: AsyncSession, subject: str):
+        """Reject every token for `subject` issued before now, once the caller's transaction commits.
+
+        This worker rejects them right away; the others within `refresh_interval`.
+        """
+        now = time.time()
+        await db.execute(insert(TokenRevocation).values(subject=subject, revoked_at=now))
+        await db.execute(delete(TokenRevocation).where(TokenRevocation.revoked_at < now - self.max_token_age))
+        self._revoke(subject, now)
+
+    def _revoke(self, subject: str, cutoff: float):
+        if cutoff > self._revoked.get(subject, 0.0):
+            self._revoked[subject] = cutoff
+
+    async def sync(self):
+        """Pick up other workers' revocations, at most every `refresh_interval` seconds."""
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        self._next_sync = now + self.refresh_interval
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(
+                select(TokenRevocation.id, TokenRevocation.subject, TokenRevocation.revoked_at)
+                .where(self._cursor.pending(TokenRevocation.id))
+            )).all()
+        for row in rows:
+            self._revoke(row.subject, row.revoked_at)
+        self._cursor.advance(row.id for row in rows)
+        expired = time.time() - self.max_token_age
+        if any(cutoff < expired for cutoff in self._revoked.values()):
+            self._revoked = {subject: cutoff for subject, cutoff in self._revoked.items() if cutoff >= expired}
+
+    def is_revoked(self, claims: dict):
+        subject = claims.get("email") or claims.get("sub")
+        cutoff = self._revoked.get(subject)
+        # iat carries sub-second precision, so a token issued in the same
+        # second as the reset is told apart from one issued just before it
+        return cutoff is not None and claims.get("iat", 0) < cutoff
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "revoked_subjects": len(self._revoked),
+        }
+
+    def clear(self):
+        # revocations are reloaded from the table on the next sync
+        self._entries.clear()
+        self._revoked.clear()
+        self._cursor.reset()
+        self._next_sync = 0.0
+        self.hits = self.misses = 0
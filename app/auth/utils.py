@@ -2,56 +2,72 @@ from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from app.core.config import settings
+from app.auth.token_cache import TokenCache
+from app.core.database import async_engine
 from fastapi import HTTPException
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.outbox.utils import enqueue_email
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+RESET_TOKEN_LIFETIME = timedelta(minutes=15)
+# The longest any token lives; a revocation older than this rejects nothing.
+MAX_TOKEN_AGE = max(
+    timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    RESET_TOKEN_LIFETIME,
+)
+
+token_cache = TokenCache(
+    async_engine,
+    max_size=settings.TOKEN_CACHE_SIZE,
+    max_token_age=MAX_TOKEN_AGE.total_seconds(),
+    refresh_interval=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+)
+
 def hash_password(password: str):
     return pwd_context.hash(password)
 
 def verify_password(plain: str, hashed: str):
     return pwd_context.verify(plain, hashed)
 
-def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def verify_token(token: str):
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.put(token, payload)
+    await token_cache.sync()
+    if token_cache.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return payload
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": now.timestamp()})
     return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
 
 def create_refresh_token(data: dict, expires_delta: timedelta = None):
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
     to_encode = data.copy()
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": now.timestamp()})
     return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def create_reset_token(data: dict, expires_delta: timedelta = timedelta(minutes=15)):
+def create_reset_token(data: dict, expires_delta: timedelta = RESET_TOKEN_LIFETIME):
     to_encode = data.copy()
-    expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + expires_delta
+    to_encode.update({"exp": expire, "iat": now.timestamp()})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
-def send_reset_email(to_email: str, token: str):
+def queue_reset_email(db: AsyncSession, to_email: str, token: str):
     subject = "Password Reset Request"
     body = f"Click the link to reset your password: https://yourdomain.com/reset?token={token}"
-    message = MIMEText(body)
-    message["Subject"] = subject
-    message["From"] = settings.EMAIL_USERNAME
-    message["To"] = to_email
-
-    with smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
-        server.starttls()
-        server.login(settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD)
-        server.send_message(message)
-    
\ No newline at end of file
+    return enqueue_email(db, to_email=to_email, subject=subject, body=body)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -10,5 +10,10 @@ class Cart(Base):
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, nullable=False)
 
-    product = relationship("Product")
+    product = relationship("Product", lazy="joined")
     user = relationship("User")
+
+    __table_args__ = (
+        # an index, not a constraint, so create_all builds the same single index as the migration
+        Index("uq_cart_user_product", "user_id", "product_id", unique=True),
+    )
@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
+from typing import Literal
+
+# Lines accepted by one POST /cart/batch.
+CART_BATCH_MAX_LINES = 500
 
 class AddToCart(BaseModel):
     product_id: int
@@ -6,3 +10,13 @@ class AddToCart(BaseModel):
 
 class UpdateCartItem(BaseModel):
     quantity: int
+
+class CartOperation(BaseModel):
+    # add: put `quantity` more units in the cart; set: make it hold exactly
+    # `quantity` (0 removes the line); remove: drop the line
+    op: Literal['add', 'set', 'remove']
+    product_id: int
+    quantity: int = 0
+
+class CartBatch(BaseModel):
+    operations: conlist(CartOperation, min_length=1, max_length=CART_BATCH_MAX_LINES)
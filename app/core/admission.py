@@ -0,0 +1,228 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from app.core.config import settings
+from app.utils.response import create_response
+
+# Never limited: load balancer health checks and metrics scrapes must get
+# through precisely when the app is overloaded.
+EXEMPT_PATHS = {"/", "/metrics"}
+
+
+@dataclass
+class RouteGroup:
+    """Limits for requests whose path starts with one of `prefixes`.
+
+    `rate` tokens per second refill each client's bucket of `burst` tokens
+    (rate 0: no per-client limit). At most `concurrency` requests of the group
+    hold a running slot at once and `queue` more may wait for one (concurrency
+    0: only the global cap applies).
+    """
+
+    name: str
+    prefixes: tuple = ()
+    rate: float = 0.0
+    burst: int = 1
+    concurrency: int = 0
+    queue: int = 0
+
+
+class TokenBuckets:
+    """One token bucket per (group, client), the least recently used evicted past `max_keys`."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def take(self, group: RouteGroup, client: str, now: float = None) -> float:
+        """Take a token; returns 0 if one was there, else the seconds until one will be."""
+        now = time.monotonic() if now is None else now
+        key = (group.name, client)
+        state = self._buckets.pop(key, None)
+        if state is None:
+            tokens = float(group.burst)
+            if len(self._buckets) >= self.max_keys:
+                del self._buckets[next(iter(self._buckets))]
+        else:
+            tokens = min(float(group.burst), state[0] + (now - state[1]) * group.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / group.rate
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class Slots:
+    """At most `limit` holders at once; at most `queue` more wait, for up to `timeout` seconds."""
+
+    def __init__(self, limit: int, queue: int, timeout: float):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.running = 0
+        self._waiters = deque()
+
+    async def acquire(self) -> bool:
+        if self.running < self.limit and not self._waiters:
+            self.running += 1
+            return True
+        if len(self._waiters) >= self.queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # the client went away; a slot handed over meanwhile goes on
+            if self._withdraw(waiter):
+                self.release()
+            raise
+        return self._withdraw(waiter)
+
+    def _withdraw(self, waiter) -> bool:
+        """Take `waiter` out of the queue; True if it was handed a slot first."""
+        if waiter.done():
+            return True
+        self._waiters.remove(waiter)
+        waiter.cancel()
+        return False
+
+    def release(self):
+        # hand the slot straight to the oldest waiter, so it cannot be overtaken
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.running -= 1
+
+
+class AdmissionController:
+    """Decides, before routing, whether a request runs now, waits for a slot or is shed.
+
+    A request first takes a token from its client's bucket for its route
+    group (429 when empty, Retry-After set to the refill time), then a slot of
+    its group, if the group is capped, then one of the `concurrency` global
+    slots. Slots queue boundedly; a full queue or a wait that times out is
+    shed with 503. Capped groups keep a flood on one expensive route from
+    taking every global slot from the rest.
+    """
+
+    def __init__(self, groups, default: RouteGroup = None, concurrency: int = 64, queue: int = 256,
+                 timeout: float = 5.0, max_clients: int = 100_000):
+        self.groups = list(groups)
+        self.default = default or RouteGroup("default")
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.buckets = TokenBuckets(max_keys=max_clients)
+        self.shed = {}
+        self._loop = None
+
+    def _ensure_started(self):
+        # slots hold futures of one event loop; a new loop (a test client, a
+        # benchmark phase) starts with fresh ones
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._global = Slots(self.concurrency, self.queue, self.timeout)
+            self._group_slots = {
+                group.name: Slots(group.concurrency, group.queue, self.timeout)
+                for group in [*self.groups, self.default] if group.concurrency
+            }
+
+    def group_for(self, path: str) -> RouteGroup:
+        for group in self.groups:
+            if path.startswith(group.prefixes):
+                return group
+        return self.default
+
+    def _reject(self, group: RouteGroup, status: int, retry_after: float, detail: str):
+        key = (group.name, status)
+        self.shed[key] = self.shed.get(key, 0) + 1
+        return create_response(
+            message=detail, status_code=status, error=True,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def __call__(self, app, scope, receive, send):
+        self._ensure_started()
+        group = self.group_for(scope["path"])
+        if group.rate:
+            client = scope["client"][0] if scope.get("client") else ""
+            wait = self.buckets.take(group, client)
+            if wait:
+                response = self._reject(group, 429, wait, "Too many requests, please retry later")
+                await response(scope, receive, send)
+                return
+
+        group_slots = self._group_slots.get(group.name)
+        if group_slots is not None and not await group_slots.acquire():
+            response = self._reject(group, 503, 1, "Server is busy, please retry")
+            await response(scope, receive, send)
+            return
+        try:
+            if not await self._global.acquire():
+                response = self._reject(group, 503, 1, "Server is busy, please retry")
+                await response(scope, receive, send)
+                return
+            try:
+                await app(scope, receive, send)
+            finally:
+                self._global.release()
+        finally:
+            if group_slots is not None:
+                group_slots.release()
+
+    def render(self):
+        """Prometheus lines for the /metrics endpoint: requests shed, by group and status."""
+        lines = [
+            "# HELP admission_shed_total Requests rejected before routing, by route group and status code.",
+            "# TYPE admission_shed_total counter",
+        ]
+        for (group, status), count in sorted(self.shed.items()):
+            lines.append(f'admission_shed_total{{group="{group}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        self.buckets.clear()
+        self.shed.clear()
+        self._loop = None
+
+
+class AdmissionMiddleware:
+    """Runs every HTTP request, bar EXEMPT_PATHS, through an AdmissionController."""
+
+    def __init__(self, app, controller: AdmissionController = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await self.controller(self.app, scope, receive, send)
+
+
+admission = AdmissionController(
+    groups=[
+        # bcrypt on every call, and the target of credential stuffing
+        RouteGroup("auth", ("/auth/signin", "/auth/signup", "/auth/forgot-password", "/auth/reset-password"),
+                   rate=settings.RATE_LIMIT_AUTH_PER_SECOND, burst=settings.RATE_LIMIT_AUTH_BURST,
+                   concurrency=settings.ADMISSION_AUTH_CONCURRENCY, queue=settings.ADMISSION_AUTH_QUEUE),
+        # FTS queries, the scraper's favourite
+        RouteGroup("search", ("/products/search",),
+                   rate=settings.RATE_LIMIT_SEARCH_PER_SECOND, burst=settings.RATE_LIMIT_SEARCH_BURST,
+                   concurrency=settings.ADMISSION_SEARCH_CONCURRENCY, queue=settings.ADMISSION_SEARCH_QUEUE),
+    ],
+    default=RouteGroup("default", rate=settings.RATE_LIMIT_DEFAULT_PER_SECOND, burst=settings.RATE_LIMIT_DEFAULT_BURST),
+    concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    queue=settings.ADMISSION_MAX_QUEUE,
+    timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+)
@@ -0,0 +1,59 @@
+import time
+
+# Ids skipped over by a poll are asked for again until this many newer ids
+# have been read, or for this many seconds, whichever ends first.
+GAP_WINDOW_IDS = 1_000
+GAP_WINDOW_SECONDS = 60.0
+
+
+class ChangeLogCursor:
+    """A reader's position in an append-only log keyed by an autoincrement id.
+
+    Ids are handed out when a row is inserted but become visible when its
+    transaction commits. On SQLite writers are serialized, so ids show up in
+    order. On PostgreSQL a transaction holding a lower id can commit
+    after a higher one has been read, so a plain `id > seen` poll would skip
+    it for good. The cursor remembers the ids it stepped over as gaps and
+    polls for them again until they appear or the window passes them (a
+    rolled-back insert leaves a gap that never fills).
+    """
+
+    def __init__(self, window_ids: int = GAP_WINDOW_IDS, window_seconds: float = GAP_WINDOW_SECONDS):
+        self.window_ids = window_ids
+        self.window_seconds = window_seconds
+        self.seen = 0
+        self._gaps = {}
+
+    def pending(self, column):
+        """A WHERE clause selecting the rows not yet read: newer than `seen`, or in a gap."""
+        self._expire()
+        if not self._gaps:
+            return column > self.seen
+        return (column > self.seen) | column.in_(sorted(self._gaps))
+
+    @property
+    def position(self):
+        """`seen`, with the gaps still awaited; readers at one position have read the same rows."""
+        return (self.seen, *sorted(self._gaps)) if self._gaps else self.seen
+
+    def advance(self, ids):
+        """Record the ids a poll returned."""
+        deadline = time.monotonic() + self.window_seconds
+        for id in sorted(ids):
+            if id > self.seen:
+                # below the first id ever read lies pruned history, not gaps
+                if self.seen:
+                    self._gaps.update((gap, deadline) for gap in range(max(self.seen + 1, id - self.window_ids), id))
+                self.seen = id
+            else:
+                self._gaps.pop(id, None)
+        self._expire()
+
+    def reset(self):
+        self.seen = 0
+        self._gaps.clear()
+
+    def _expire(self):
+        now = time.monotonic()
+        floor = self.seen - self.window_ids
+        self._gaps = {gap: deadline for gap, deadline in self._gaps.items() if gap > floor and deadline > now}
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,11 +8,115 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
 
-    EMAIL_HOST: str
-    EMAIL_PORT: int
-    EMAIL_USERNAME: str
-    EMAIL_PASSWORD: str
-    EMAIL_FROM: str
+    # SMTP for the email outbox; only the delivery worker needs it, so the
+    # app (and every command) starts without it. EMAIL_FROM defaults to the
+    # login name.
+    EMAIL_HOST: str = "localhost"
+    EMAIL_PORT: int = 25
+    EMAIL_USERNAME: str = ""
+    EMAIL_PASSWORD: str = ""
+    EMAIL_FROM: str = ""
+
+    # create tables and apply migrations in the lifespan; for single-process
+    # development only, deployments run `python -m app.core.migrations` once
+    MIGRATE_ON_STARTUP: bool = False
+
+    # database tuning: DB_PROFILE picks a SQLite pragma set from
+    # app.core.database.SQLITE_PROFILES, SQLITE_PRAGMAS overrides single
+    # pragmas (JSON object); the pool settings apply to server databases
+    DB_PROFILE: str = "production"
+    SQLITE_PRAGMAS: dict[str, str] = {}
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # read replica for read-only routes; clients that wrote read from the
+    # primary for REPLICA_STICKY_SECONDS afterwards
+    DATABASE_REPLICA_URL: Optional[str] = None
+    REPLICA_STICKY_SECONDS: float = 5.0
+    REPLICA_HEALTH_SECONDS: float = 5.0
+
+    # logging: JSON lines through a queue; LOG_ROTATE_WHEN (e.g. "midnight")
+    # switches rotation from size to time; identical warnings and errors are
+    # sampled down to LOG_SAMPLE_BURST per LOG_SAMPLE_WINDOW_SECONDS
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "logs/logs.txt"
+    LOG_CONSOLE: bool = True
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_ROTATE_WHEN: str = ""
+    LOG_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_SAMPLE_BURST: int = 20
+    LOG_SAMPLE_WINDOW_SECONDS: float = 10.0
+
+    # Prometheus metrics: request/query middleware and the /metrics endpoint
+    METRICS_ENABLED: bool = True
+
+    # bcrypt process pool: None sizes it to the CPU count, 0 hashes on threads;
+    # pool processes run PASSWORD_HASH_NICE steps below request handling
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_NICE: int = 10
+
+    # admission control, before routing: at most ADMISSION_MAX_CONCURRENCY
+    # requests run at once and ADMISSION_MAX_QUEUE more wait up to
+    # ADMISSION_QUEUE_TIMEOUT_SECONDS for a slot, else 503. Token buckets per
+    # client address and route group (auth, search, default) answer 429 once
+    # empty; a rate of 0 turns a group's bucket off. Only auth has one by
+    # default: behind a CDN or load balancer many clients share an address,
+    # and a per-address limit on ordinary traffic would throttle them all.
+    # The auth and search groups may also hold only so many of the running
+    # slots, so a flood on them cannot take every slot from checkout and the
+    # catalog.
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    ADMISSION_AUTH_CONCURRENCY: int = 8
+    ADMISSION_AUTH_QUEUE: int = 32
+    ADMISSION_SEARCH_CONCURRENCY: int = 16
+    ADMISSION_SEARCH_QUEUE: int = 64
+    RATE_LIMIT_AUTH_PER_SECOND: float = 1.0
+    RATE_LIMIT_AUTH_BURST: int = 10
+    RATE_LIMIT_SEARCH_PER_SECOND: float = 0.0
+    RATE_LIMIT_SEARCH_BURST: int = 20
+    RATE_LIMIT_DEFAULT_PER_SECOND: float = 0.0
+    RATE_LIMIT_DEFAULT_BURST: int = 100
+    RATE_LIMIT_MAX_CLIENTS: int = 100_000
+
+    # verified-token cache entries (LRU), and how often each worker reads
+    # token revocations made by the others
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 1.0
+
+    # catalog cache: "database" shares invalidation across workers, "local" is
+    # per-process only; 0 bytes disables caching
+    CATALOG_CACHE_BACKEND: str = "database"
+    CATALOG_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CATALOG_CACHE_REFRESH_SECONDS: float = 1.0
+
+    # HTTP caching of public catalog reads: Cache-Control sent with the ETag
+    # and Last-Modified validators, and the body size from which responses
+    # are compressed (brotli if installed and accepted, else gzip)
+    CATALOG_CACHE_CONTROL: str = "public, max-age=0, must-revalidate"
+    CATALOG_COMPRESS_MIN_BYTES: int = 1024
+
+    # cart reservations hold stock for RESERVATION_TTL_SECONDS after the last
+    # cart change; the in-process sweeper returns expired ones to stock
+    RESERVATION_TTL_SECONDS: float = 900.0
+    RESERVATION_SWEEPER: bool = True
+    RESERVATION_SWEEP_SECONDS: float = 30.0
+
+    # email outbox: delivery runs in-process unless EMAIL_OUTBOX_WORKER is off
+    EMAIL_STARTTLS: bool = True
+    EMAIL_SMTP_CONNECTIONS: int = 2
+    EMAIL_OUTBOX_WORKER: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 2.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETRY_SECONDS: float = 30.0
 
     class Config:
         env_file = ".env"
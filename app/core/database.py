@@ -1,10 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async drivers used by the request path for each sync backend in DATABASE_URL.
+# These are the supported backends: reservations, checkout and the outbox
+# rely on UPDATE/DELETE ... RETURNING, which MySQL does not have.
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+
+def to_async_url(url: str):
+    parsed = make_url(url)
+    if parsed.get_backend_name() not in ASYNC_DRIVERS:
+        raise ValueError(f"Unsupported database backend '{parsed.get_backend_name()}', use one of {sorted(ASYNC_DRIVERS)}")
+    if "+" not in parsed.drivername:
+        parsed = parsed.set(drivername=f"{parsed.get_backend_name()}+{ASYNC_DRIVERS[parsed.get_backend_name()]}")
+    return parsed
+
+
+# SQLite pragma sets, run on every new connection. "default" keeps SQLite's own
+# behaviour (rollback journal, so readers and the writer block each other).
+# "durable" switches to WAL: readers never block the writer, and busy_timeout
+# makes writers queue instead of failing with "database is locked".
+# "production" also relaxes synchronous to NORMAL, which under WAL can lose the
+# last commits on power loss but never corrupts, and enlarges the page cache
+# and memory-mapped reads.
+SQLITE_PROFILES = {
+    "default": {},
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": "5000",
+    },
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "5000",
+        "cache_size": "-65536",  # KiB, i.e. 64 MiB per connection
+        "mmap_size": "268435456",
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def sqlite_pragmas(profile: str = None):
+    profile = profile or settings.DB_PROFILE
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {', '.join(SQLITE_PROFILES)}")
+    return {**SQLITE_PROFILES[profile], **settings.SQLITE_PRAGMAS}
+
+
+def engine_options(url: str):
+    # SQLite connections are local files, so pool sizing, recycling and
+    # liveness checks only matter for server databases.
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict):
+    """Run `pragmas` on every new connection of a SQLite engine (sync or async)."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+# Sync engine: schema creation, migrations and command-line scripts.
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+apply_sqlite_pragmas(engine, sqlite_pragmas())
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# Async engine: every request handler, so database waits never block the event loop.
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), **engine_options(SQLALCHEMY_DATABASE_URL))
+apply_sqlite_pragmas(async_engine.sync_engine, sqlite_pragmas())
+instrument_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
+
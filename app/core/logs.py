@@ -0,0 +1,223 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import orjson
+from starlette.datastructures import MutableHeaders
+from app.core.config import settings
+
+REQUEST_ID_HEADER = "x-request-id"
+# Client-supplied request ids are kept only if they look like an id, so they
+# cannot smuggle newlines or megabytes into the log.
+VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+request_id_var = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user `extra` fields.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through at most `burst` identical warnings or errors per `window` seconds.
+
+    Records are identical when logger, level and rendered message match. The
+    first record let through after a suppressed stretch carries a `suppressed`
+    field with the number of copies dropped. Lower levels always pass.
+    """
+
+    def __init__(self, burst: int = 20, window: float = 10.0, max_keys: int = 10_000):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        self._seen = {}
+
+    def filter(self, record: logging.LogRecord):
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.levelno, record.getMessage())
+        state = self._seen.get(key)
+        if state is None or now - state[0] >= self.window:
+            # keys stay in window-start order, so the oldest is evicted first
+            self._seen.pop(key, None)
+            if len(self._seen) >= self.max_keys:
+                del self._seen[next(iter(self._seen))]
+            suppressed = state[2] if state is not None else 0
+            self._seen[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+            return True
+        if state[1] < self.burst:
+            state[1] += 1
+            return True
+        state[2] += 1
+        return False
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the id of the request being handled, if any."""
+
+    def filter(self, record: logging.LogRecord):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller and keeps exceptions structured.
+
+    When the queue is full the record is dropped and counted; the count rides
+    along on the next record that fits, as a `dropped` field.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord):
+        # Resolve args and the traceback here: they may reference objects that
+        # change or disappear before the listener thread gets to the record.
+        record = logging.makeLogRecord(vars(record))
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.dropped:
+            record.dropped = self.dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.dropped = 0
+
+
+class BlockingStopListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full when stopping; wait for room rather than fail.
+        self.queue.put(self._sentinel)
+
+
+def _file_handler():
+    if settings.LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            settings.LOG_FILE, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8", utc=True,
+        )
+    return logging.handlers.RotatingFileHandler(
+        settings.LOG_FILE, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
+def queue_pipeline(handlers: list, queue_size: int, sample_burst: int, sample_window: float):
+    """Return a (QueueHandler, QueueListener) pair feeding `handlers` from a bounded queue."""
+    queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    queue_handler.addFilter(SamplingFilter(sample_burst, sample_window))
+    queue_handler.addFilter(RequestIdFilter())
+    listener = BlockingStopListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    return queue_handler, listener
+
+
+_listener = None
+
+
+def setup_logging():
+    """Route the root logger through a queue to a JSON-lines file and the console.
+
+    Callers only format the record and put it on a bounded queue; a
+    QueueListener thread does the writing and rotation. Calling it again is a
+    no-op, so importing the app twice does not duplicate handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    if os.path.dirname(settings.LOG_FILE):
+        os.makedirs(os.path.dirname(settings.LOG_FILE), exist_ok=True)
+
+    formatter = JSONFormatter()
+    handlers = [_file_handler()]
+    if settings.LOG_CONSOLE:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler, _listener = queue_pipeline(
+        handlers, settings.LOG_QUEUE_SIZE, settings.LOG_SAMPLE_BURST, settings.LOG_SAMPLE_WINDOW_SECONDS
+    )
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(queue_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out everything still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """Gives every request an id, from X-Request-ID or a fresh one, for logs and the response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,167 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Histogram upper bounds: request latency in seconds, and SQL statements per request.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Label used for requests that matched no route, so scanners probing random
+# paths cannot create unbounded label sets.
+UNMATCHED_ROUTE = "unmatched"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+# Stats of the request being handled; SQLAlchemy runs async queries in a
+# greenlet that shares the caller's context, so the cursor hooks see it too.
+_current_request = ContextVar("metrics_request", default=None)
+
+
+class Histogram:
+    __slots__ = ("counts", "total")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, buckets, value):
+        self.counts[bisect_left(buckets, value)] += 1
+        self.total += value
+
+
+class Metrics:
+    """In-process request and query metrics, rendered in Prometheus text format.
+
+    Every series is labelled with the route template (e.g. /products/{product_id})
+    rather than the raw path, which keeps the number of series bounded. Values are
+    per process: with several workers, scrape each one or aggregate upstream.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = {}
+        self.latency = {}
+        self.queries = {}
+        self.query_seconds = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self.query_seconds[key] = 0.0
+        latency.observe(LATENCY_BUCKETS, seconds)
+        self.queries[key].observe(QUERY_COUNT_BUCKETS, stats.queries)
+        self.query_seconds[key] += stats.query_seconds
+
+    def reset(self):
+        self.__init__()
+
+    def render(self):
+        lines = [
+            "# HELP process_start_time_seconds Start time of the process since unix epoch in seconds.",
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds {self.started:.3f}",
+            "# HELP http_requests_total Requests handled, by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+        _render_histograms(lines, "http_request_duration_seconds", "Request latency in seconds, by route.",
+                           LATENCY_BUCKETS, self.latency)
+        _render_histograms(lines, "db_queries_per_request", "SQL statements executed per request, by route.",
+                           QUERY_COUNT_BUCKETS, self.queries)
+        lines += [
+            "# HELP db_query_duration_seconds_total Time spent executing SQL statements, by route.",
+            "# TYPE db_query_duration_seconds_total counter",
+        ]
+        for (method, route), seconds in sorted(self.query_seconds.items()):
+            lines.append(f'db_query_duration_seconds_total{{method="{method}",route="{_escape(route)}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _render_histograms(lines, name, help_text, buckets, histograms):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    bounds = [str(bound) for bound in buckets] + ["+Inf"]
+    for (method, route), histogram in sorted(histograms.items()):
+        labels = f'method="{method}",route="{_escape(route)}"'
+        cumulative = 0
+        for bound, count in zip(bounds, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+
+metrics = Metrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        context._metrics_started = time.perf_counter()
+    return statement, parameters
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - getattr(context, "_metrics_started", time.perf_counter())
+
+
+def instrument_engine(engine: Engine):
+    """Count and time the statements `engine` runs on behalf of HTTP requests."""
+    # retval=True skips the wrapper SQLAlchemy puts around plain listeners
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute, retval=True)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """Records count, status and latency of every HTTP request, plus its SQL statements."""
+
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            route = scope.get("route")
+            self.registry.observe(
+                scope["method"], route.path if route is not None else UNMATCHED_ROUTE, status, elapsed, stats
+            )
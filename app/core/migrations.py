@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from app.auth.models import TokenRevocation
+from app.cart import models as cart_models  # noqa: F401  (register tables for create_all)
+from app.core.database import Base, engine
+from app.inventory.models import StockReservation
+from app.orders import models as order_models  # noqa: F401
+from app.orders.snapshots import backfill_snapshots
+from app.outbox.models import EmailOutbox
+from app.products.facets import rebuild_facets
+from app.products.models import CatalogChange, CategoryFacet
+from app.products.search import create_search_index
+
+# Indexes for the query shapes the routes actually run. Fresh databases get the
+# same indexes from the model declarations; IF NOT EXISTS makes both paths agree.
+WORKLOAD_INDEXES = [
+    # get_products: category filter plus price range / price sort
+    "CREATE INDEX IF NOT EXISTS ix_products_category_price ON products (category, price)",
+    "CREATE INDEX IF NOT EXISTS ix_products_price_id ON products (price, id)",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_id ON products (name, id)",
+    # every cart call filters by (user_id, product_id); checkout by user_id
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_cart_user_product ON cart (user_id, product_id)",
+    # order history: filter_by(user_id).order_by(created_at)
+    "CREATE INDEX IF NOT EXISTS ix_orders_user_created ON orders (user_id, created_at)",
+    # order detail: items of one order
+    "CREATE INDEX IF NOT EXISTS ix_order_items_order_id ON order_items (order_id)",
+]
+
+
+def _add_workload_indexes(conn: Connection):
+    # Merge duplicate cart rows left by older code so the unique index can be built.
+    conn.execute(text("""
+        UPDATE cart SET quantity = (
+            SELECT SUM(dup.quantity) FROM cart AS dup
+            WHERE dup.user_id = cart.user_id AND dup.product_id = cart.product_id
+        )
+        WHERE id IN (SELECT MIN(id) FROM cart GROUP BY user_id, product_id HAVING COUNT(*) > 1)
+    """))
+    conn.execute(text("""
+        DELETE FROM cart WHERE id NOT IN (SELECT MIN(id) FROM cart GROUP BY user_id, product_id)
+    """))
+    for statement in WORKLOAD_INDEXES:
+        conn.execute(text(statement))
+
+
+def _add_catalog_changes(conn: Connection):
+    CatalogChange.__table__.create(conn, checkfirst=True)
+
+
+def _add_email_outbox(conn: Connection):
+    EmailOutbox.__table__.create(conn, checkfirst=True)
+
+
+def _add_stock_reservations(conn: Connection):
+    if "version" not in {column["name"] for column in inspect(conn).get_columns("products")}:
+        conn.execute(text("ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+    StockReservation.__table__.create(conn, checkfirst=True)
+
+
+def _add_category_facets(conn: Connection):
+    CategoryFacet.__table__.create(conn, checkfirst=True)
+    rebuild_facets(conn)
+
+
+def _add_order_snapshots(conn: Connection):
+    item_columns = {column["name"] for column in inspect(conn).get_columns("order_items")}
+    for column in ("product_name", "product_category"):
+        if column not in item_columns:
+            conn.execute(text(f"ALTER TABLE order_items ADD COLUMN {column} VARCHAR"))
+    if "item_count" not in {column["name"] for column in inspect(conn).get_columns("orders")}:
+        conn.execute(text("ALTER TABLE orders ADD COLUMN item_count INTEGER"))
+    backfill_snapshots(conn)
+
+
+def _add_token_revocations(conn: Connection):
+    TokenRevocation.__table__.create(conn, checkfirst=True)
+
+
+# Append-only: (version, name, step). Never edit or reorder an applied entry.
+MIGRATIONS = [
+    (1, "product search index", create_search_index),
+    (2, "workload indexes", _add_workload_indexes),
+    (3, "catalog change log", _add_catalog_changes),
+    (4, "email outbox", _add_email_outbox),
+    (5, "product versions and stock reservations", _add_stock_reservations),
+    (6, "category facets", _add_category_facets),
+    (7, "order line snapshots", _add_order_snapshots),
+    (8, "token revocations", _add_token_revocations),
+]
+
+
+def run_migrations(engine: Engine):
+    """Apply every migration newer than the database's recorded version.
+
+    Each migration runs in its own transaction together with its row in
+    schema_migrations, so a failed step leaves the version unchanged.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR NOT NULL,
+                applied_at DATETIME NOT NULL
+            )
+        """))
+        current = conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+
+    for version, name, step in MIGRATIONS:
+        if version <= current:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.now(timezone.utc)},
+            )
+
+
+def migrate(engine: Engine):
+    """Create missing tables, then apply pending migrations.
+
+    Runs once per deploy (or at startup with MIGRATE_ON_STARTUP), never from
+    every worker: DDL checks cost boot time and concurrent migrators race.
+    """
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+def main():
+    migrate(engine)
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+    print(f"database is at migration {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+        self.parameters = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(None if executemany else parameters)
+
+
+@contextmanager
+def count_queries(engine: Engine):
+    """Record every SQL statement the engine executes inside the block.
+
+    Used by the query-count checks to catch N+1 loading: an endpoint's count
+    must not grow with the number of rows it returns.
+    """
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._record)
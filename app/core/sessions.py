@@ -0,0 +1,134 @@
+import time
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.datastructures import MutableHeaders
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, apply_sqlite_pragmas, engine_options, sqlite_pragmas, to_async_url
+from app.core.metrics import instrument_engine
+
+# Cookie holding the unix time until which a client's reads stay on the primary.
+STICKY_COOKIE = "db_primary_until"
+# request.state flag set by get_write_db, read by ReadYourWritesMiddleware.
+WROTE_FLAG = "db_wrote"
+
+
+class SessionProvider:
+    """Routes sessions between the primary database and an optional read replica.
+
+    Read-write sessions always use the primary. Read-only sessions use the
+    replica while it is configured and healthy, except for clients that wrote
+    within the last `sticky_seconds`: those read from the primary so they see
+    their own writes despite replication lag. The replica is probed at most
+    every `health_interval` seconds; while a probe or a query on it fails,
+    reads fall back to the primary.
+    """
+
+    def __init__(self, primary: async_sessionmaker, replica: async_sessionmaker = None,
+                 sticky_seconds: float = 5.0, health_interval: float = 5.0):
+        self.primary = primary
+        self.replica = replica
+        self.sticky_seconds = sticky_seconds
+        self.health_interval = health_interval
+        self.replica_healthy = replica is not None
+        self._next_probe = 0.0
+
+    async def _replica_available(self):
+        if self.replica is None:
+            return False
+        now = time.monotonic()
+        if now >= self._next_probe:
+            self._next_probe = now + self.health_interval
+            try:
+                async with self.replica() as db:
+                    await db.execute(text("SELECT 1"))
+                self.replica_healthy = True
+            except (DBAPIError, OSError):
+                self.replica_healthy = False
+        return self.replica_healthy
+
+    def mark_replica_down(self):
+        self.replica_healthy = False
+        self._next_probe = time.monotonic() + self.health_interval
+
+    def is_sticky(self, request: Request):
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    async def read_sessionmaker(self, request: Request = None):
+        """The sessionmaker a read-only request should use right now."""
+        if request is not None and self.is_sticky(request):
+            return self.primary
+        if await self._replica_available():
+            return self.replica
+        return self.primary
+
+    async def dispose(self):
+        if self.replica is not None:
+            await self.replica.kw["bind"].dispose()
+
+    def sticky_cookie(self):
+        until = time.time() + self.sticky_seconds
+        return f"{STICKY_COOKIE}={until:.3f}; Max-Age={max(1, round(self.sticky_seconds))}; Path=/; HttpOnly; SameSite=Lax"
+
+
+def _build_replica():
+    if not settings.DATABASE_REPLICA_URL:
+        return None
+    replica_engine = create_async_engine(
+        to_async_url(settings.DATABASE_REPLICA_URL), **engine_options(settings.DATABASE_REPLICA_URL)
+    )
+    apply_sqlite_pragmas(replica_engine.sync_engine, sqlite_pragmas())
+    instrument_engine(replica_engine.sync_engine)
+    return async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False)
+
+
+session_provider = SessionProvider(
+    primary=AsyncSessionLocal,
+    replica=_build_replica(),
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    health_interval=settings.REPLICA_HEALTH_SECONDS,
+)
+
+
+async def get_read_db(request: Request):
+    """Dependency for routes that only read: replica when possible."""
+    factory = await session_provider.read_sessionmaker(request)
+    async with factory() as db:
+        try:
+            yield db
+        except OperationalError:
+            # unreachable or broken replica: later reads go to the primary
+            # until the next successful probe
+            if factory is session_provider.replica:
+                session_provider.mark_replica_down()
+            raise
+
+
+async def get_write_db(request: Request):
+    """Dependency for routes that write: always the primary."""
+    setattr(request.state, WROTE_FLAG, True)
+    async with session_provider.primary() as db:
+        yield db
+
+
+class ReadYourWritesMiddleware:
+    """Sets the stickiness cookie on responses to requests that used get_write_db."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or session_provider.replica is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and scope.get("state", {}).get(WROTE_FLAG):
+                MutableHeaders(scope=message).append("set-cookie", session_provider.sticky_cookie())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
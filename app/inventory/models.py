@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, UniqueConstraint
+from app.core.database import Base
+
+class StockReservation(Base):
+    """Units of a product held for one user's cart line until expires_at.
+
+    Reserving moves units out of Product.stock; checkout turns the reservation
+    into a sale by deleting it, and the sweeper hands expired ones back.
+    Whoever deletes the row owns its units, so the two can never both count it.
+    """
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "product_id", name="uq_stock_reservations_user_product"),
+        Index("ix_stock_reservations_expires_at", "expires_at"),
+    )
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.inventory.utils import release_expired
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationSweeper:
+    """Background task that returns expired reservations to stock every `interval` seconds.
+
+    A full batch is followed by the next one straight away, so a backlog
+    drains without waiting for the timer. Safe to run in several processes.
+    """
+
+    def __init__(self, interval: float = 30.0, batch_size: int = 500, session_factory=AsyncSessionLocal):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.released = 0
+        self._task = None
+        self._stop = None
+
+    def start(self):
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stop.set()
+            await self._task
+            self._task = None
+
+    async def run(self):
+        while not self._stop.is_set():
+            try:
+                released = await self.run_once()
+            except Exception:
+                logger.exception("Reservation sweep failed")
+                released = 0
+            if released < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_once(self) -> int:
+        """Release one batch of expired reservations and return how many there were."""
+        async with self.session_factory() as db:
+            released = await release_expired(db, self.batch_size)
+        self.released += released
+        return released
+
+
+reservation_sweeper = ReservationSweeper(interval=settings.RESERVATION_SWEEP_SECONDS)
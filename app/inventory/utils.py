@@ -0,0 +1,354 @@
+import asyncio
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cart.models import Cart
+from app.core.config import settings
+from app.inventory.models import StockReservation
+from app.products import facets
+from app.products.cache import catalog_cache
+from app.products.models import Product
+
+WRITE_MAX_ATTEMPTS = 5
+WRITE_BACKOFF_SECONDS = 0.01
+
+# Conflicts seen by run_with_retries, by kind; read by the contention benchmark.
+conflicts = Counter()
+
+
+class StockConflict(Exception):
+    """A product's version changed between reading and updating its stock."""
+
+
+async def run_with_retries(db: AsyncSession, work, *args, busy_detail: str = "Inventory is busy, please retry"):
+    """Run `work(db, *args)` as one transaction, retrying it on write conflicts.
+
+    A stale product version or a lock conflict ("database is locked" on SQLite,
+    serialization failures on server databases) rolls the attempt back and
+    reruns it from scratch after a jittered backoff. HTTPExceptions roll back
+    and propagate; after WRITE_MAX_ATTEMPTS conflicts the caller gets a 503.
+    """
+    for attempt in range(1, WRITE_MAX_ATTEMPTS + 1):
+        try:
+            return await work(db, *args)
+        except HTTPException:
+            await db.rollback()
+            raise
+        except (StockConflict, OperationalError) as exc:
+            conflicts["version" if isinstance(exc, StockConflict) else "lock"] += 1
+            await db.rollback()
+            if attempt == WRITE_MAX_ATTEMPTS:
+                break
+            await asyncio.sleep(WRITE_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    raise HTTPException(status_code=503, detail=busy_detail)
+
+
+async def adjust_stock(db: AsyncSession, product_id: int, delta: int):
+    """Add `delta` (negative to take units) to a product's stock by compare-and-swap on its version.
+
+    Raises 404 for an unknown product, 400 if fewer than -delta units are
+    left, and StockConflict if another writer got there first.
+    """
+    row = (await db.execute(
+        select(Product.stock, Product.version, Product.name, Product.category, Product.price)
+        .where(Product.id == product_id)
+    )).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if row.stock + delta < 0:
+        raise HTTPException(status_code=400, detail=f"Only {row.stock} items of '{row.name}' left in stock.")
+    result = await db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.version == row.version)
+        .values(stock=row.stock + delta, version=row.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise StockConflict(product_id)
+    if (row.stock > 0) != (row.stock + delta > 0):
+        # sold out, or back in stock
+        await facets.record_changes(
+            db, before=[(row.category, row.price, row.stock)], after=[(row.category, row.price, row.stock + delta)]
+        )
+    return row.stock + delta
+
+
+async def _set_cart_quantity(db: AsyncSession, user_id: int, product_id: int, quantity: int, relative: bool):
+    item = await db.scalar(select(Cart).filter_by(user_id=user_id, product_id=product_id))
+    if relative:
+        quantity += item.quantity if item else 0
+        if quantity < 1:
+            raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+    elif quantity == 0 and not item:
+        raise HTTPException(status_code=404, detail="Item not in cart")
+    reservation = await db.scalar(select(StockReservation).filter_by(user_id=user_id, product_id=product_id))
+    held = reservation.quantity if reservation else 0
+    if quantity > held:
+        await adjust_stock(db, product_id, held - quantity)
+    elif quantity < held and not await restock(db, {product_id: held - quantity}) and quantity:
+        # the product was deleted under the reservation: it can only leave the cart
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    if quantity == 0:
+        if item:
+            await db.delete(item)
+        if reservation:
+            await db.delete(reservation)
+    else:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.RESERVATION_TTL_SECONDS)
+        if item:
+            item.quantity = quantity
+        else:
+            db.add(Cart(user_id=user_id, product_id=product_id, quantity=quantity))
+        if reservation:
+            reservation.quantity = quantity
+            reservation.expires_at = expires_at
+        else:
+            db.add(StockReservation(user_id=user_id, product_id=product_id, quantity=quantity, expires_at=expires_at))
+    if quantity != held:
+        await catalog_cache.invalidate(db, [product_id], reorders=False)
+    await db.commit()
+
+
+async def set_cart_quantity(db: AsyncSession, user_id: int, product_id: int, quantity: int, relative: bool = False):
+    """Make the user's cart hold `quantity` units of a product (or that many more, if
+    `relative`), reserving or releasing stock to match.
+
+    Every call also renews the reservation for RESERVATION_TTL_SECONDS. A
+    quantity of 0 removes the line and hands its units back.
+    """
+    await run_with_retries(db, _set_cart_quantity, user_id, product_id, quantity, relative)
+
+
+class _BatchLine:
+    """One product's state while a cart batch is applied in memory."""
+
+    def __init__(self, product, cart=None):
+        self.product = product
+        self.item_id = cart.item_id if cart else None
+        self.reservation_id = cart.reservation_id if cart else None
+        self.quantity = cart.quantity if cart else 0
+        self.held = (cart.held or 0) if cart else 0
+        self.stock = product.stock if product else 0
+        self.touched = False
+
+    def target(self, operation):
+        """Cart quantity the operation asks for, or raise ValueError with the reason it can't."""
+        if self.product is None:
+            raise ValueError("Product not found")
+        if operation.op == "remove":
+            if not self.quantity:
+                raise ValueError("Item not in cart")
+            return 0
+        quantity = self.quantity + operation.quantity if operation.op == "add" else operation.quantity
+        if operation.op == "add" and quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        if quantity < 0:
+            raise ValueError("Quantity must not be negative")
+        if quantity - self.held > self.stock:
+            raise ValueError(f"Only {self.stock} items of '{self.product.name}' left in stock.")
+        return quantity
+
+
+# Compare-and-swap of many products' stock in one executemany.
+_STOCK_CAS = (
+    update(Product.__table__)
+    .where(Product.id == bindparam("b_id"), Product.version == bindparam("b_version"))
+    .values(stock=bindparam("b_stock"), version=bindparam("b_version") + 1)
+)
+
+
+async def swap_stock(db: AsyncSession, stock):
+    """Run _STOCK_CAS for each {b_id, b_version, b_stock}; raises StockConflict unless every row matched.
+
+    Drivers that report no row count for an executemany (asyncpg) get one
+    statement per row instead, since the count is the only conflict signal.
+    """
+    if db.get_bind().dialect.supports_sane_multi_rowcount:
+        matched = (await db.execute(_STOCK_CAS, stock)).rowcount
+    else:
+        matched = 0
+        for row in stock:
+            matched += (await db.execute(_STOCK_CAS, row)).rowcount
+    if matched != len(stock):
+        raise StockConflict([row["b_id"] for row in stock])
+
+
+async def take_stock(db: AsyncSession, products, quantities):
+    """Take `quantities[product_id]` units from each product with one compare-and-swap executemany.
+
+    `products` maps product ids to rows (name, stock, version, category,
+    price) read earlier in the transaction. Raises 400 if one has too few
+    units left and StockConflict if any version has moved since the read.
+    """
+    stock, before, after = [], [], []
+    for product_id, units in sorted(quantities.items()):
+        product = products[product_id]
+        left = product.stock - units
+        if left < 0:
+            raise HTTPException(status_code=400, detail=f"Only {product.stock} items of '{product.name}' left in stock.")
+        stock.append({"b_id": product_id, "b_version": product.version, "b_stock": left})
+        if (product.stock > 0) != (left > 0):
+            before.append((product.category, product.price, product.stock))
+            after.append((product.category, product.price, left))
+    if stock:
+        await swap_stock(db, stock)
+    if before:
+        await facets.record_changes(db, before=before, after=after)
+
+
+async def _apply_cart_batch(db: AsyncSession, user_id: int, operations):
+    product_ids = sorted({operation.product_id for operation in operations})
+    products = {row.id: row for row in await db.execute(
+        select(Product.id, Product.name, Product.stock, Product.version, Product.category, Product.price)
+        .where(Product.id.in_(product_ids))
+    )}
+    carts = {row.product_id: row for row in await db.execute(
+        select(Cart.product_id, Cart.id.label("item_id"), Cart.quantity,
+               StockReservation.id.label("reservation_id"), StockReservation.quantity.label("held"))
+        .outerjoin(StockReservation, (StockReservation.user_id == Cart.user_id)
+                   & (StockReservation.product_id == Cart.product_id))
+        .where(Cart.user_id == user_id, Cart.product_id.in_(product_ids))
+    )}
+    lines = {product_id: _BatchLine(products.get(product_id), carts.get(product_id)) for product_id in product_ids}
+
+    # Validate and apply every operation in memory first, in request order, so
+    # later lines see the stock earlier ones took.
+    results = []
+    for operation in operations:
+        line = lines[operation.product_id]
+        try:
+            quantity = line.target(operation)
+        except ValueError as exc:
+            results.append({"op": operation.op, "product_id": operation.product_id, "ok": False,
+                            "quantity": line.quantity, "detail": str(exc)})
+            continue
+        line.stock -= quantity - line.held
+        line.held = line.quantity = quantity
+        line.touched = True
+        results.append({"op": operation.op, "product_id": operation.product_id, "ok": True,
+                        "quantity": quantity, "detail": None})
+
+    # Then write the outcome with one statement per kind of change.
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.RESERVATION_TTL_SECONDS)
+    stock, before, after = [], [], []
+    removed, new_items, new_reservations, items, reservations = [], [], [], [], []
+    for product_id, line in lines.items():
+        if not line.touched:
+            continue
+        product = line.product
+        if line.stock != product.stock:
+            stock.append({"b_id": product_id, "b_version": product.version, "b_stock": line.stock})
+            if (product.stock > 0) != (line.stock > 0):
+                before.append((product.category, product.price, product.stock))
+                after.append((product.category, product.price, line.stock))
+        if line.quantity == 0:
+            removed.append(product_id)
+            continue
+        if line.item_id:
+            items.append({"id": line.item_id, "quantity": line.quantity})
+        else:
+            new_items.append({"user_id": user_id, "product_id": product_id, "quantity": line.quantity})
+        reservation = {"quantity": line.quantity, "expires_at": expires_at}
+        if line.reservation_id:
+            reservations.append({"id": line.reservation_id, **reservation})
+        else:
+            new_reservations.append({"user_id": user_id, "product_id": product_id, **reservation})
+
+    if stock:
+        await swap_stock(db, stock)
+    if removed:
+        for model in (Cart, StockReservation):
+            await db.execute(
+                delete(model)
+                .where(model.user_id == user_id, model.product_id.in_(removed))
+                .execution_options(synchronize_session=False)
+            )
+    for model, rows in ((Cart, items), (StockReservation, reservations)):
+        if rows:
+            await db.execute(update(model), rows)
+    for model, rows in ((Cart, new_items), (StockReservation, new_reservations)):
+        if rows:
+            await db.execute(insert(model.__table__), rows)
+    if before:
+        await facets.record_changes(db, before=before, after=after)
+    if stock:
+        await catalog_cache.invalidate(db, [row["b_id"] for row in stock], reorders=False)
+    await db.commit()
+    return results
+
+
+async def apply_cart_batch(db: AsyncSession, user_id: int, operations):
+    """Apply a list of cart operations in one transaction and return a result per operation.
+
+    Products and the user's cart lines are loaded with one IN query each and
+    every operation is validated against them in order; operations that fail
+    (unknown product, not enough stock, ...) are reported and skipped, the
+    rest commit together, with stock reserved as set_cart_quantity would.
+    """
+    return await run_with_retries(db, _apply_cart_batch, user_id, operations)
+
+
+async def claim_reservations(db: AsyncSession, user_id: int):
+    """Delete the user's reservations and return {product_id: quantity} of the units they held."""
+    rows = (await db.execute(
+        delete(StockReservation)
+        .where(StockReservation.user_id == user_id)
+        .returning(StockReservation.product_id, StockReservation.quantity)
+    )).all()
+    return {product_id: quantity for product_id, quantity in rows}
+
+
+async def release_expired(db: AsyncSession, limit: int = 500):
+    """Hand the units of up to `limit` expired reservations back to stock; returns how many were released."""
+    now = datetime.now(timezone.utc)
+    expired = select(StockReservation.id).where(StockReservation.expires_at <= now).limit(limit)
+    rows = (await db.execute(
+        delete(StockReservation)
+        .where(StockReservation.id.in_(expired), StockReservation.expires_at <= now)
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )).all()
+    released = Counter()
+    for product_id, quantity in rows:
+        released[product_id] += quantity
+    await restock(db, released)
+    if released:
+        await catalog_cache.invalidate(db, list(released), reorders=False)
+    await db.commit()
+    return len(rows)
+
+
+async def restock(db: AsyncSession, released):
+    """Hand units back to stock, {product_id: units}; returns the ids of the products that still exist.
+
+    Products deleted since their units were taken are skipped: there is no
+    stock left to return them to.
+    """
+    restocked, found = [], []
+    for product_id in sorted(released):
+        # an increment needs no compare-and-swap, it commutes with everything
+        product = (await db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(stock=Product.stock + released[product_id], version=Product.version + 1)
+            .returning(Product.stock, Product.category, Product.price)
+            .execution_options(synchronize_session=False)
+        )).one_or_none()
+        if product is None:
+            continue
+        found.append(product_id)
+        if product.stock == released[product_id]:
+            restocked.append(product)
+    if restocked:
+        await facets.record_changes(
+            db,
+            before=[(product.category, product.price, 0) for product in restocked],
+            after=[(product.category, product.price, product.stock) for product in restocked],
+        )
+    return found
@@ -1,29 +1,101 @@
-from fastapi import APIRouter, FastAPI
-from app.utils.response import create_response
-from app.utils.exception_handlers import http_exception_handler, validation_exception_handler
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from app.auth import routes as auth_routes
-from app.products import public_routes as public_routes
-from app.products import admin_routes as admin_routes
-from app.cart import routes as cart_routes
-from app.orders import routes as order_routes
-from app.core.database import engine, Base
-
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
-
-router = APIRouter(tags=["Root"])
-@app.get("/")
-async def health_check():
-    return create_response(data={"message": "Health Check is done."})
-
-app.add_exception_handler(StarletteHTTPException, http_exception_handler)
-app.add_exception_handler(RequestValidationError, validation_exception_handler)    
-
-app.include_router(auth_routes.router)
-app.include_router(public_routes.router)
-app.include_router(admin_routes.router)
-app.include_router(cart_routes.router) 
-app.include_router(order_routes.router)
\ No newline at end of file
+from app.utils.response import create_response
+from app.utils.exception_handlers import http_exception_handler, validation_exception_handler
+from app.core.config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers and pools live exactly as long as the app, and the
+    # engines are disposed on the way out so no pooled connection leaks past
+    # shutdown. Schema work is opt-in: see app.core.migrations.
+    from app.auth.hashing import password_hasher
+    from app.core.database import async_engine, engine
+    from app.core.migrations import migrate
+    from app.core.sessions import session_provider
+    from app.inventory.sweeper import reservation_sweeper
+    from app.outbox.delivery import outbox_worker
+
+    if settings.MIGRATE_ON_STARTUP:
+        await asyncio.to_thread(migrate, engine)
+    if settings.EMAIL_OUTBOX_WORKER:
+        outbox_worker.start()
+    if settings.RESERVATION_SWEEPER:
+        reservation_sweeper.start()
+    try:
+        yield
+    finally:
+        await reservation_sweeper.stop()
+        await outbox_worker.stop()
+        password_hasher.shutdown()
+        await session_provider.dispose()
+        await async_engine.dispose()
+        engine.dispose()
+
+
+def create_app() -> FastAPI:
+    """Build the application.
+
+    Serve it with `uvicorn app.main:create_app --factory`; `app.main:app`
+    works too. Run `python -m app.core.migrations` once per deploy before
+    starting workers.
+    """
+    # Subsystems are imported here and in lifespan rather than at module
+    # level: importing app.main loads FastAPI and the settings, and the
+    # engines, workers and routers are built only when an app is.
+    from app.core.admission import AdmissionMiddleware, admission
+    from app.core.logs import RequestIdMiddleware, setup_logging
+    from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+    from app.core.sessions import ReadYourWritesMiddleware
+    from app.auth import routes as auth_routes
+    from app.cart import routes as cart_routes
+    from app.orders import routes as order_routes
+    from app.products import admin_routes, public_routes
+
+    setup_logging()
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/")
+    async def health_check():
+        return create_response(data={"message": "Health Check is done."})
+
+    app.add_middleware(ReadYourWritesMiddleware)
+    if settings.ADMISSION_CONTROL:
+        # shed requests before they open a session or touch the database
+        app.add_middleware(AdmissionMiddleware, controller=admission)
+    if settings.METRICS_ENABLED:
+        # wraps the application middleware, so it times the whole request
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/metrics", include_in_schema=False)
+        async def prometheus_metrics():
+            body = metrics.render()
+            if settings.ADMISSION_CONTROL:
+                body += admission.render()
+            return Response(body, media_type=CONTENT_TYPE)
+
+    # outermost, so everything below logs with the request id
+    app.add_middleware(RequestIdMiddleware)
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+
+    app.include_router(auth_routes.router)
+    app.include_router(public_routes.router)
+    app.include_router(admin_routes.router)
+    app.include_router(cart_routes.router)
+    app.include_router(order_routes.router)
+    return app
+
+
+def __getattr__(name):
+    # `app.main:app` is built on first access, so importing this module (for
+    # create_app or the lifespan) never builds an application it won't use.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
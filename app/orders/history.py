@@ -0,0 +1,132 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.orders.models import Order, OrderItem
+
+ORDER_COLUMNS = ["id", "created_at", "total", "status", "item_count"]
+ITEM_COLUMNS = ["product_id", "product_name", "product_category", "quantity", "price"]
+
+# Orders read per export query; their lines come with one more query.
+EXPORT_CHUNK_ORDERS = 500
+
+
+def encode_order_cursor(order):
+    raw = json.dumps([order.created_at.isoformat(), order.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_order_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _orders_after(user_id: int, after=None):
+    # Newest first. (created_at, id) is unique and ix_orders_user_created
+    # (which carries the rowid) serves both the filter and the order.
+    query = select(*(Order.__table__.c[name] for name in ORDER_COLUMNS)).where(Order.user_id == user_id)
+    if after is not None:
+        query = query.where(tuple_(Order.created_at, Order.id) < tuple_(*after))
+    return query.order_by(Order.created_at.desc(), Order.id.desc())
+
+
+async def paginate_orders(db: AsyncSession, user_id: int, cursor: str = None, page_size: int = 20):
+    """Return one page of the user's orders, newest first, plus the cursor for the next page.
+
+    The page starts strictly after the (created_at, id) pair in the cursor, so
+    a deep page costs the same as the first and new orders never shift rows
+    between pages.
+    """
+    after = decode_order_cursor(cursor) if cursor else None
+    rows = (await db.execute(_orders_after(user_id, after).limit(page_size + 1))).all()
+    orders = rows[:page_size]
+    next_cursor = encode_order_cursor(orders[-1]) if len(rows) > page_size else None
+    return [row._asdict() for row in orders], next_cursor
+
+
+def _item_columns():
+    return [OrderItem.__table__.c[name] for name in ITEM_COLUMNS]
+
+
+async def get_order_detail(db: AsyncSession, user_id: int, order_id: int):
+    """The order and its lines, or None if the user has no such order.
+
+    One statement: the order by primary key, its lines through
+    ix_order_items_order_id. Lines carry their checkout snapshot, so the
+    catalog is never read and deleted products do not matter.
+    """
+    rows = (await db.execute(
+        select(*(Order.__table__.c[name] for name in ORDER_COLUMNS), *_item_columns())
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .where(Order.id == order_id, Order.user_id == user_id)
+        .order_by(OrderItem.id)
+    )).all()
+    if not rows:
+        return None
+    order = {name: getattr(rows[0], name) for name in ORDER_COLUMNS}
+    order["items"] = [{name: getattr(row, name) for name in ITEM_COLUMNS} for row in rows
+                      if row.product_id is not None]
+    return order
+
+
+async def _order_lines(db: AsyncSession, order_ids):
+    lines = {order_id: [] for order_id in order_ids}
+    rows = await db.execute(
+        select(OrderItem.order_id, *_item_columns())
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    )
+    for row in rows:
+        lines[row.order_id].append(row)
+    return lines
+
+
+def _render(orders, lines, format: str):
+    if format == "ndjson":
+        return b"".join(
+            orjson.dumps({
+                **order._asdict(),
+                "items": [{name: getattr(line, name) for name in ITEM_COLUMNS} for line in lines[order.id]],
+            }) + b"\n"
+            for order in orders
+        )
+    # CSV has no nesting: one row per order line, order columns repeated; an
+    # order without lines still gets a row, with the line columns empty.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for order in orders:
+        head = [order.id, order.created_at.isoformat(), order.total, order.status, order.item_count]
+        for line in lines[order.id] or [None]:
+            tail = [getattr(line, name) for name in ITEM_COLUMNS] if line else [""] * len(ITEM_COLUMNS)
+            writer.writerow(head + tail)
+    return buffer.getvalue().encode()
+
+
+async def export_orders(user_id: int, format: str, session_factory: async_sessionmaker):
+    """Yield all of a user's orders with their lines as NDJSON or CSV, newest first.
+
+    Orders are read EXPORT_CHUNK_ORDERS at a time by keyset, each chunk with
+    its lines in a short session of its own, so memory stays flat however
+    many orders there are and a slow download holds neither a connection nor
+    a read transaction.
+    """
+    if format == "csv":
+        yield (",".join(["order_id", *ORDER_COLUMNS[1:], *ITEM_COLUMNS]) + "\n").encode()
+    after = None
+    while True:
+        async with session_factory() as db:
+            orders = (await db.execute(_orders_after(user_id, after).limit(EXPORT_CHUNK_ORDERS))).all()
+            if not orders:
+                return
+            lines = await _order_lines(db, [order.id for order in orders])
+        after = (orders[-1].created_at, orders[-1].id)
+        yield _render(orders, lines, format)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, String, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.core.database import Base
@@ -8,18 +8,28 @@ class Order(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     total = Column(Float)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    # units across all lines, fixed at checkout
+    item_count = Column(Integer)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     status = Column(String, default="Completed")
 
     items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        Index("ix_orders_user_created", "user_id", "created_at"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
+    # unit price, name and category as they were at checkout, so order reads
+    # never depend on the live catalog (or on the product still existing)
     price = Column(Float)
+    product_name = Column(String)
+    product_category = Column(String)
 
     order = relationship("Order", back_populates="items")
     product = relationship("Product")
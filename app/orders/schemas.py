@@ -1,11 +1,14 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 class OrderItemResponse(BaseModel):
     product_id: int
-    product_name: str
+    # as at checkout; None only for lines of products deleted before the backfill
+    product_name: Optional[str]
+    product_category: Optional[str]
     quantity: int
+    price: float
     subtotal: float
 
 class OrderResponse(BaseModel):
@@ -13,6 +16,7 @@ class OrderResponse(BaseModel):
     created_at: datetime
     total: float
     status: str
+    item_count: Optional[int]
 
 class OrderDetailResponse(OrderResponse):
     items: List[OrderItemResponse]
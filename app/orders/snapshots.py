@@ -0,0 +1,79 @@
+"""Backfill of the checkout snapshots on order lines and orders.
+
+Checkout writes each line's product name and category, and each order's
+item count, itself. Rows from before that, or written by a worker still
+running older code during a deploy, are filled in from the catalog:
+
+    python -m app.orders.snapshots
+
+Lines whose product has since been deleted keep a NULL name and category;
+there is nothing left to copy.
+"""
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.engine import Connection
+from app.orders.models import Order, OrderItem
+from app.products.models import Product
+
+# Rows updated per statement (and per transaction from the command line).
+BACKFILL_BATCH_ROWS = 5_000
+
+
+def _pending_ids(conn: Connection, table, missing, after: int, batch_size: int):
+    return conn.execute(
+        select(table.c.id).where(table.c.id > after, missing).order_by(table.c.id).limit(batch_size)
+    ).scalars().all()
+
+
+def backfill_batches(conn: Connection, batch_size: int = BACKFILL_BATCH_ROWS):
+    """Fill in missing snapshots batch by batch, yielding the rows updated by each batch.
+
+    Each batch is an id range, walked once, so lines of deleted products are
+    not revisited. The caller decides where transactions end.
+    """
+    items, orders = OrderItem.__table__, Order.__table__
+    product = select(Product.name, Product.category).where(Product.id == items.c.product_id)
+    after = 0
+    while ids := _pending_ids(conn, items, items.c.product_name.is_(None), after, batch_size):
+        result = conn.execute(
+            update(items)
+            .where(and_(items.c.id >= ids[0], items.c.id <= ids[-1], items.c.product_name.is_(None)))
+            .where(product.exists())
+            .values(
+                product_name=product.with_only_columns(Product.name).scalar_subquery(),
+                product_category=product.with_only_columns(Product.category).scalar_subquery(),
+            )
+        )
+        after = ids[-1]
+        yield result.rowcount
+
+    units = select(func.coalesce(func.sum(items.c.quantity), 0)).where(items.c.order_id == orders.c.id)
+    after = 0
+    while ids := _pending_ids(conn, orders, orders.c.item_count.is_(None), after, batch_size):
+        result = conn.execute(
+            update(orders)
+            .where(and_(orders.c.id >= ids[0], orders.c.id <= ids[-1], orders.c.item_count.is_(None)))
+            .values(item_count=units.scalar_subquery())
+        )
+        after = ids[-1]
+        yield result.rowcount
+
+
+def backfill_snapshots(conn: Connection, batch_size: int = BACKFILL_BATCH_ROWS) -> int:
+    """Fill in every missing snapshot in the caller's transaction; returns the rows updated."""
+    return sum(backfill_batches(conn, batch_size))
+
+
+def main():
+    from app.core.database import engine
+
+    # a transaction per batch, so live checkouts only ever wait for one batch
+    updated = 0
+    with engine.connect() as conn:
+        for rows in backfill_batches(conn):
+            conn.commit()
+            updated += rows
+    print(f"backfilled {updated} order lines and orders")
+
+
+if __name__ == "__main__":
+    main()
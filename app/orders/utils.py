@@ -0,0 +1,72 @@
+from fastapi import HTTPException
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cart.models import Cart
+from app.inventory.utils import claim_reservations, restock, run_with_retries, take_stock
+from app.orders.models import Order, OrderItem
+from app.products.cache import catalog_cache
+from app.products.models import Product
+
+
+async def _place_order(db: AsyncSession, user_id: int) -> int:
+    # One joined read instead of lazy-loading item.product for every cart row;
+    # it also carries the stock and version the compare-and-swap below needs.
+    # Rows are written in product id order so concurrent checkouts never deadlock.
+    lines = (await db.execute(
+        select(Cart.product_id, Cart.quantity, Product.name, Product.price, Product.category,
+               Product.stock, Product.version)
+        .join(Product, Product.id == Cart.product_id)
+        .where(Cart.user_id == user_id)
+        .order_by(Cart.product_id)
+    )).all()
+    if not lines:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    # Units reserved at add-to-cart time are already out of stock; only cart
+    # lines without a (live) reservation still have to take theirs now.
+    claimed = await claim_reservations(db, user_id)
+    missing = {line.product_id: line.quantity - claimed.pop(line.product_id, 0) for line in lines}
+    await take_stock(
+        db, {line.product_id: line for line in lines},
+        {product_id: units for product_id, units in missing.items() if units > 0},
+    )
+    # units reserved beyond the cart line, and reservations for products that
+    # have since left the cart (or the catalog), go back to stock
+    for product_id, units in missing.items():
+        if units < 0:
+            claimed[product_id] = -units
+    await restock(db, claimed)
+
+    order = Order(
+        user_id=user_id,
+        total=sum(line.price * line.quantity for line in lines),
+        item_count=sum(line.quantity for line in lines),
+    )
+    db.add(order)
+    await db.flush()
+
+    await db.execute(insert(OrderItem), [
+        {
+            "order_id": order.id,
+            "product_id": line.product_id,
+            "quantity": line.quantity,
+            "price": line.price,
+            "product_name": line.name,
+            "product_category": line.category,
+        }
+        for line in lines
+    ])
+    await db.execute(delete(Cart).where(Cart.user_id == user_id))
+    # Stock changed, so cached catalog reads of these products are stale.
+    await catalog_cache.invalidate(db, [line.product_id for line in lines] + list(claimed), reorders=False)
+    await db.commit()
+    return order.id
+
+
+async def place_order(db: AsyncSession, user_id: int) -> int:
+    """Turn the user's cart into an order in a single transaction and return the order id.
+
+    Stale product versions and lock conflicts roll the whole attempt back and
+    retry it (see run_with_retries).
+    """
+    return await run_with_retries(db, _place_order, user_id, busy_detail="Checkout is busy, please retry")
@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.mime.text import MIMEText
+from sqlalchemy import select, update
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.outbox.models import EmailOutbox
+
+# Replies that concern one message; anything else (socket errors, dropped or
+# refused sessions, failed login) is treated as a session failure and retried.
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+# Idle sessions older than this are replaced, most relays drop them anyway.
+SMTP_MAX_IDLE_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+def _is_permanent(exc: Exception):
+    # A 5xx reply about the message itself will not succeed on retry.
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPDataError) and exc.smtp_code >= 500
+
+
+class SMTPConnectionPool:
+    """Reuses up to `size` open SMTP sessions across deliveries.
+
+    STARTTLS and login happen once per session instead of once per message.
+    smtplib blocks, so every session is driven from a worker thread, one
+    delivery chunk at a time.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str, sender: str,
+                 starttls: bool = True, size: int = 2, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            server.ehlo_or_helo_if_needed()
+            if self.username and server.has_extn("auth"):
+                server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                server, last_used = self._idle.pop()
+                if time.monotonic() - last_used < SMTP_MAX_IDLE_SECONDS:
+                    return server
+                self._quit(server)
+        return self._connect()
+
+    def _checkin(self, server):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self._quit(server)
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _build(self, message: dict):
+        mime = MIMEText(message["body"])
+        mime["Subject"] = message["subject"]
+        mime["From"] = self.sender
+        mime["To"] = message["to_email"]
+        return mime
+
+    def deliver(self, messages: list):
+        """Send `messages` over one session and return {id: exception or None}.
+
+        A dropped session is reopened once; if that fails too, the remaining
+        messages get the connection error and are retried later.
+        """
+        results = {}
+        server = None
+        reconnected = False
+        pending = list(messages)
+        while pending:
+            try:
+                if server is None:
+                    server = self._checkout()
+                while pending:
+                    message = pending[0]
+                    try:
+                        server.send_message(self._build(message))
+                        results[message["id"]] = None
+                    except MESSAGE_ERRORS as exc:
+                        results[message["id"]] = exc
+                    pending.pop(0)
+            except OSError as exc:  # smtplib.SMTPException is an OSError too
+                if server is not None:
+                    server.close()
+                    server = None
+                if reconnected:
+                    results.update({message["id"]: exc for message in pending})
+                    break
+                reconnected = True
+        if server is not None:
+            self._checkin(server)
+        return results
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._quit(server)
+
+
+class OutboxWorker:
+    """Background task that drains the email outbox through an SMTPConnectionPool.
+
+    Each round claims up to `batch_size` due messages, splits them across the
+    pool's sessions and records the outcome in one transaction. Failures are
+    retried with jittered exponential backoff until `max_attempts`, then left
+    with status "failed". Safe to run in several processes at once.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool, batch_size: int = 50, poll_interval: float = 2.0,
+                 max_attempts: int = 8, retry_backoff: float = 30.0, lease: float = 300.0,
+                 session_factory=AsyncSessionLocal):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease = lease
+        self.session_factory = session_factory
+        self.sent = 0
+        self.failed = 0
+        self._task = None
+        self._wake = None
+        self._stopping = False
+
+    def notify(self):
+        """Wake the worker now instead of at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self.pool.close)
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Email outbox delivery round failed")
+                claimed = 0
+            if claimed < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def run_once(self) -> int:
+        """Deliver one batch of due messages and return how many were claimed."""
+        messages = await self._claim()
+        if not messages:
+            return 0
+        size = max(1, min(self.pool.size, len(messages)))
+        chunks = [messages[i::size] for i in range(size)]
+        results = {}
+        for chunk_results in await asyncio.gather(
+            *(asyncio.to_thread(self.pool.deliver, chunk) for chunk in chunks)
+        ):
+            results.update(chunk_results)
+        await self._record(messages, results)
+        return len(messages)
+
+    async def _claim(self):
+        now = datetime.now(timezone.utc)
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(self.batch_size)
+        )
+        async with self.session_factory() as db:
+            # The outer conditions are re-checked by the UPDATE itself, so two
+            # workers racing for the same rows cannot both claim them. The claim
+            # and its rows come back in one statement with RETURNING, which is
+            # why MySQL is not among the backends in ASYNC_DRIVERS.
+            rows = (await db.execute(
+                update(EmailOutbox)
+                .where(
+                    EmailOutbox.id.in_(due),
+                    EmailOutbox.status == "pending",
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .values(next_attempt_at=now + timedelta(seconds=self.lease), attempts=EmailOutbox.attempts + 1)
+                .returning(EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject, EmailOutbox.body, EmailOutbox.attempts)
+                .execution_options(synchronize_session=False)
+            )).mappings().all()
+            await db.commit()
+        return [dict(row) for row in rows]
+
+    async def _record(self, messages, results):
+        now = datetime.now(timezone.utc)
+        sent = [message["id"] for message in messages if results.get(message["id"]) is None]
+        retries = []
+        for message in messages:
+            exc = results.get(message["id"])
+            if exc is None:
+                continue
+            gave_up = _is_permanent(exc) or message["attempts"] >= self.max_attempts
+            delay = self.retry_backoff * (2 ** (message["attempts"] - 1)) * random.uniform(0.5, 1.5)
+            retries.append({
+                "id": message["id"],
+                "status": "failed" if gave_up else "pending",
+                "next_attempt_at": now + timedelta(seconds=delay),
+                "last_error": str(exc)[:500],
+            })
+            if gave_up:
+                self.failed += 1
+                logger.error("Email %s to %s failed: %s", message["id"], message["to_email"], exc)
+
+        async with self.session_factory() as db:
+            if sent:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent))
+                    .values(status="sent", sent_at=now, last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            if retries:
+                await db.execute(update(EmailOutbox), retries)
+            await db.commit()
+        self.sent += len(sent)
+
+
+outbox_worker = OutboxWorker(
+    SMTPConnectionPool(
+        host=settings.EMAIL_HOST,
+        port=settings.EMAIL_PORT,
+        username=settings.EMAIL_USERNAME,
+        password=settings.EMAIL_PASSWORD,
+        sender=settings.EMAIL_FROM or settings.EMAIL_USERNAME,
+        starttls=settings.EMAIL_STARTTLS,
+        size=settings.EMAIL_SMTP_CONNECTIONS,
+    ),
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_backoff=settings.EMAIL_OUTBOX_RETRY_SECONDS,
+)
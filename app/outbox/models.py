@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.core.database import Base
+
+class EmailOutbox(Base):
+    """Outgoing email, written in the request's transaction and delivered later.
+
+    A row is due while status is "pending" and next_attempt_at has passed. A
+    worker claims rows by pushing next_attempt_at forward by a lease, so rows
+    held by a crashed worker become due again on their own.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.outbox.models import EmailOutbox
+
+
+def enqueue_email(db: AsyncSession, to_email: str, subject: str, body: str):
+    """Add an email to the outbox as part of the caller's transaction.
+
+    Nothing is sent until the caller commits; call outbox_worker.notify()
+    afterwards to have this process deliver it without waiting for the next poll.
+    """
+    message = EmailOutbox(to_email=to_email, subject=subject, body=body)
+    db.add(message)
+    return message
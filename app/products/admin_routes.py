@@ -1,26 +1,30 @@
-from fastapi import APIRouter,Depends,HTTPException 
-from app.utils.response import create_response
-from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from typing import Optional
+from fastapi import APIRouter,Depends,HTTPException,Query,Request
+from fastapi.responses import StreamingResponse
+from app.utils.response import FastJSONResponse, create_response
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cart.models import Cart
+from app.core.sessions import get_read_db, get_write_db, session_provider
+from app.inventory.models import StockReservation
 from app.products.schemas import ProductCreate, ProductResponse,ProductUpdate
 from app.products.models import Product
+from app.products import bulk, facets
+from app.products.utils import dump_products, paginate_by_cursor
+from app.products.cache import REORDERING_FIELDS, catalog_cache
 from app.auth.dependencies import require_admin
+from app.auth.utils import token_cache
 
 router = APIRouter(prefix="/admin", tags=["Admin Routes"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+BULK_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
 
 @router.get('/admin_health_check')
 async def admin_health_check():
     return create_response(data={"message": "Admin Health Check is done."})
 
 @router.post("/products", response_model=ProductResponse)
-async def create_product(product_data: ProductCreate, db: Session = Depends(get_db), _: dict = Depends(require_admin)):
+async def create_product(product_data: ProductCreate, db: AsyncSession = Depends(get_write_db), _: dict = Depends(require_admin)):
     # print("product data",product_data)
     product = Product(
         name=product_data.name,
@@ -31,40 +35,117 @@ async def create_product(product_data: ProductCreate, db: Session = Depends(get_
         image_url=product_data.image_url
     )
     db.add(product)
-    db.commit()
-    db.refresh(product)
-    response_model = ProductResponse.model_validate(product, from_attributes=True)
-    return create_response(data=response_model.model_dump())
+    await db.flush()
+    await facets.record_changes(db, after=[(product.category, product.price, product.stock)])
+    await catalog_cache.invalidate(db, [product.id])
+    await db.commit()
+    await db.refresh(product)
+    return create_response(data=ProductResponse.model_validate(product))
+
+@router.get("/cache/stats")
+async def cache_stats(_: dict = Depends(require_admin)):
+    return create_response(data={
+        "catalog": catalog_cache.stats(),
+        "tokens": token_cache.stats(),
+    })
 
 @router.get("/products", response_model=list[ProductResponse])
-def list_products(skip: int = 0, limit: int = 10, db: Session = Depends(get_db), _: dict = Depends(require_admin)):
-    products = db.query(Product).offset(skip).limit(limit).all()
-    return products
+async def list_products(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    sort_by: str = Query("id", enum=["id", "price", "name"]),
+    pagination: str = Query("offset", enum=["offset", "cursor"]),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    _: dict = Depends(require_admin)
+):
+    if pagination == "cursor":
+        products, next_cursor = await paginate_by_cursor(db, select(Product), sort_by, cursor, limit)
+        return create_response(data={
+            "items": dump_products(products),
+            "next_cursor": next_cursor,
+        })
+
+    products = (await db.scalars(
+        select(Product).order_by(getattr(Product, sort_by)).offset(skip).limit(limit)
+    )).all()
+    return FastJSONResponse(dump_products(products))
+
+@router.post(
+    "/products/import",
+    openapi_extra={"requestBody": {"required": True, "content": {
+        media_type: {"schema": {"type": "string", "format": "binary"}} for media_type in BULK_MEDIA_TYPES.values()
+    }}},
+)
+async def import_products(
+    request: Request,
+    format: str = Query("csv", enum=list(BULK_MEDIA_TYPES)),
+    db: AsyncSession = Depends(get_write_db),
+    _: dict = Depends(require_admin)
+):
+    # The raw body stream is parsed as it arrives; it is never buffered whole.
+    report = await bulk.import_products(db, request.stream(), format)
+    return create_response(data=report)
+
+@router.get("/products/export")
+async def export_products(
+    request: Request,
+    format: str = Query("csv", enum=list(BULK_MEDIA_TYPES)),
+    _: dict = Depends(require_admin)
+):
+    session_factory = await session_provider.read_sessionmaker(request)
+    return StreamingResponse(
+        bulk.export_products(format, session_factory),
+        media_type=BULK_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db), _: dict = Depends(require_admin)):
-    product = db.query(Product).get(product_id)
+async def get_product(product_id: int, db: AsyncSession = Depends(get_read_db), _: dict = Depends(require_admin)):
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return FastJSONResponse(ProductResponse.model_validate(product))
 
 @router.delete("/products/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db), _: dict = Depends(require_admin)):
-    product = db.query(Product).get(product_id)
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_write_db), _: dict = Depends(require_admin)):
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    db.delete(product)
-    db.commit()
+    # Nobody can buy it any more: drop it from carts along with the units they
+    # held, which leave with the product.
+    for model in (Cart, StockReservation):
+        await db.execute(
+            delete(model).where(model.product_id == product_id).execution_options(synchronize_session=False)
+        )
+    await db.delete(product)
+    await facets.record_changes(db, before=[(product.category, product.price, product.stock)])
+    await catalog_cache.invalidate(db, [product_id])
+    await db.commit()
     return create_response(data={"detail": "Product deleted"})
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
-def update_product(product_id: int, data: ProductUpdate, db: Session = Depends(get_db), _: dict = Depends(require_admin)):
-    product = db.query(Product).get(product_id)
+async def update_product(product_id: int, data: ProductUpdate, db: AsyncSession = Depends(get_write_db), _: dict = Depends(require_admin)):
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(product, field, value)
-    db.commit()
-    db.refresh(product)
-    response_model = ProductResponse.model_validate(product, from_attributes=True)
-    return create_response(data=response_model.model_dump())
\ No newline at end of file
+    changes = data.model_dump(exclude_unset=True)
+    # Compare-and-swap on the version, so a stock edit cannot silently undo a
+    # reservation or checkout that landed after the product was read.
+    result = await db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.version == product.version)
+        .values(**changes, version=product.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Product was modified concurrently, please retry")
+    facet = (product.category, product.price, product.stock)
+    await facets.record_changes(db, before=[facet], after=[(
+        changes.get("category", product.category), changes.get("price", product.price), changes.get("stock", product.stock)
+    )])
+    await catalog_cache.invalidate(db, [product_id], reorders=not REORDERING_FIELDS.isdisjoint(changes))
+    await db.commit()
+    await db.refresh(product)
+    return create_response(data=ProductResponse.model_validate(product))
\ No newline at end of file
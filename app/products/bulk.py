@@ -0,0 +1,206 @@
+import codecs
+import csv
+import io
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.products import facets
+from app.products.cache import catalog_cache
+from app.products.models import Product
+from app.products.schemas import ProductCreate
+
+PRODUCT_COLUMNS = ["id", "name", "description", "price", "stock", "category", "image_url"]
+
+# Rows validated and written per transaction, and rows read per export query.
+IMPORT_CHUNK_ROWS = 1000
+EXPORT_CHUNK_ROWS = 1000
+
+# Row errors returned in full; any beyond this are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+
+async def _lines(stream):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def _csv_records(stream):
+    # Physical lines are joined while a quoted field is still open, so every
+    # record handed to the csv module is complete. Quotes inside fields are
+    # doubled in CSV, so an odd quote count always means an open field.
+    header = None
+    record = None
+    row_number = 0
+    async for line in _lines(stream):
+        record = line if record is None else record + "\n" + line
+        if record.count('"') % 2:
+            continue
+        fields, record = next(csv.reader([record])), None
+        if not fields:
+            continue
+        if header is None:
+            header = [name.strip() for name in fields]
+            continue
+        row_number += 1
+        yield row_number, {name: value or None for name, value in zip(header, fields)}
+
+
+async def _ndjson_records(stream):
+    row_number = 0
+    async for line in _lines(stream):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield row_number, exc
+
+
+def _validate(record):
+    """Return (row dict, None) for a valid record or (None, [error, ...])."""
+    if isinstance(record, Exception):
+        return None, [f"invalid JSON: {record}"]
+    if not isinstance(record, dict):
+        return None, ["row must be a JSON object"]
+    product_id = record.get("id")
+    try:
+        data = ProductCreate.model_validate(record).model_dump()
+        if product_id is not None:
+            data["id"] = int(product_id)
+    except ValidationError as exc:
+        return None, [f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()]
+    except ValueError:
+        return None, ["id: must be an integer"]
+    return data, None
+
+
+async def _upsert(db: AsyncSession, rows):
+    ids = [row["id"] for row in rows if "id" in row]
+    existing = {}
+    if ids:
+        # facet values of the products about to be overwritten
+        existing = {row.id: (row.category, row.price, row.stock) for row in await db.execute(
+            select(Product.id, Product.category, Product.price, Product.stock).where(Product.id.in_(ids))
+        )}
+    updates = [row for row in rows if row.get("id") in existing]
+    # executemany needs the same keys in every row, so rows that bring their
+    # own id are inserted separately from rows that let the database pick one
+    new_with_id = [row for row in rows if "id" in row and row["id"] not in existing]
+    new_without_id = [row for row in rows if "id" not in row]
+    for batch in (new_with_id, new_without_id):
+        if batch:
+            await db.execute(insert(Product.__table__), batch)
+    if updates:
+        await db.execute(update(Product), updates)
+        # keeps stock writers that compare-and-swap on the version honest
+        await db.execute(
+            update(Product)
+            .where(Product.id.in_([row["id"] for row in updates]))
+            .values(version=Product.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    await facets.record_changes(
+        db,
+        before=[existing[row["id"]] for row in updates],
+        after=[(row["category"], row["price"], row["stock"]) for row in rows],
+    )
+    return len(new_with_id) + len(new_without_id), len(updates)
+
+
+async def _write_chunk(db: AsyncSession, chunk, report):
+    try:
+        created, updated = await _upsert(db, [row for _, row in chunk])
+        await catalog_cache.invalidate_all(db)
+        await db.commit()
+    except DBAPIError:
+        # Something in the batch violates a constraint: redo it row by row so
+        # only the offending rows are rejected.
+        await db.rollback()
+        created = updated = 0
+        for row_number, row in chunk:
+            try:
+                row_created, row_updated = await _upsert(db, [row])
+                await db.commit()
+            except DBAPIError as exc:
+                await db.rollback()
+                _add_error(report, row_number, [str(exc.orig)])
+                continue
+            created += row_created
+            updated += row_updated
+        await catalog_cache.invalidate_all(db)
+        await db.commit()
+    report["created"] += created
+    report["updated"] += updated
+
+
+def _add_error(report, row_number, errors):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row_number, "errors": errors})
+
+
+async def import_products(db: AsyncSession, stream, format: str):
+    """Upsert products from a CSV or NDJSON byte stream and return a per-row report.
+
+    The body is parsed as it arrives and written IMPORT_CHUNK_ROWS at a time,
+    each chunk in its own transaction, so memory stays flat however large the
+    feed is. Rows with an id update that product (or create it with that id);
+    rows without one are created. Invalid rows are skipped and reported.
+    """
+    records = _csv_records(stream) if format == "csv" else _ndjson_records(stream)
+    report = {"rows": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+    chunk = []
+    async for row_number, record in records:
+        report["rows"] += 1
+        row, errors = _validate(record)
+        if errors:
+            _add_error(report, row_number, errors)
+            continue
+        chunk.append((row_number, row))
+        if len(chunk) == IMPORT_CHUNK_ROWS:
+            await _write_chunk(db, chunk, report)
+            chunk = []
+    if chunk:
+        await _write_chunk(db, chunk, report)
+    return report
+
+
+def _render(rows, format: str):
+    if format == "ndjson":
+        return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def export_products(format: str, session_factory: async_sessionmaker):
+    """Yield the products table as CSV or NDJSON, EXPORT_CHUNK_ROWS rows at a time.
+
+    Rows are read in id order by keyset, each chunk in a short session of its
+    own, so a slow download holds neither a connection nor a read transaction.
+    """
+    table = Product.__table__
+    columns = [table.c[name] for name in PRODUCT_COLUMNS]
+    if format == "csv":
+        yield (",".join(PRODUCT_COLUMNS) + "\n").encode()
+    last_id = 0
+    while True:
+        async with session_factory() as db:
+            rows = (await db.execute(
+                select(*columns).where(table.c.id > last_id).order_by(table.c.id).limit(EXPORT_CHUNK_ROWS)
+            )).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield _render(rows, format)
@@ -0,0 +1,282 @@
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import timezone
+import orjson
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.core.change_log import ChangeLogCursor
+from app.core.config import settings
+from app.core.database import async_engine
+from app.products.models import CatalogChange
+
+# Change-log rows kept for lagging workers; one further behind flushes everything.
+CHANGE_LOG_RETAIN = 10_000
+
+# Product fields that listings and searches filter, sort or match on. A write
+# touching any of them can change which products a cached page holds.
+REORDERING_FIELDS = {"name", "description", "price", "category"}
+
+
+class LocalVersionBackend:
+    """In-process change log. Only correct with a single worker process."""
+
+    def __init__(self, retain: int = CHANGE_LOG_RETAIN):
+        # versions count from 0 in every process, so they only mean something
+        # together with the process they came from
+        self.scope = uuid.uuid4().hex
+        self.version = 0
+        self.modified_at = None
+        self._seen = 0
+        self._log = deque(maxlen=retain)
+
+    async def record(self, db: AsyncSession, product_ids, reorders: bool):
+        self.modified_at = time.time()
+        for product_id in product_ids:
+            self.version += 1
+            self._log.append((self.version, product_id, reorders))
+
+    async def poll(self):
+        seen, self._seen = self._seen, self.version
+        if self._log and seen < self._log[0][0] - 1:
+            return self.version, None
+        changes = [(product_id, reorders) for version, product_id, reorders in self._log if version > seen]
+        if any(product_id is None for product_id, _ in changes):
+            return self.version, None
+        return self.version, changes
+
+
+class DatabaseVersionBackend:
+    """Change log in the catalog_changes table, shared by every worker on the database.
+
+    Writers append rows inside their own transaction, so an invalidation is
+    published exactly when the product write commits. Versions are read
+    through a ChangeLogCursor, so one that commits after a higher version was
+    read is still applied, and the version reported includes the ones still
+    awaited. `modified_at` is the newest `changed_at` read, so every worker
+    that has read the same rows reports the same time.
+    """
+
+    def __init__(self, engine: AsyncEngine, retain: int = CHANGE_LOG_RETAIN):
+        self.engine = engine
+        self.retain = retain
+        # versions are the database's, the same in every worker
+        self.scope = "database"
+        self.modified_at = None
+        self._cursor = ChangeLogCursor()
+
+    async def record(self, db: AsyncSession, product_ids, reorders: bool):
+        await db.execute(insert(CatalogChange), [
+            {"product_id": product_id, "reorders": reorders} for product_id in product_ids
+        ])
+        newest = select(func.max(CatalogChange.version)).scalar_subquery()
+        await db.execute(delete(CatalogChange).where(CatalogChange.version < newest - self.retain))
+
+    async def poll(self):
+        seen = self._cursor.seen
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(
+                select(CatalogChange.version, CatalogChange.product_id, CatalogChange.reorders,
+                       CatalogChange.changed_at)
+                .where(self._cursor.pending(CatalogChange.version))
+                .order_by(CatalogChange.version)
+            )).all()
+            if not rows:
+                return self._cursor.position, []
+            oldest = await conn.scalar(select(func.min(CatalogChange.version)))
+        self._cursor.advance(row.version for row in rows)
+        # stored in UTC; SQLite and PostgreSQL hand it back without the zone
+        changed = [row.changed_at.replace(tzinfo=timezone.utc).timestamp() for row in rows if row.changed_at]
+        if changed:
+            self.modified_at = max(changed + [self.modified_at or 0.0])
+        if (seen and oldest > seen + 1) or any(row.product_id is None for row in rows):
+            return self._cursor.position, None
+        return self._cursor.position, [(row.product_id, row.reorders) for row in rows]
+
+
+class CatalogCache:
+    """Read-through cache for public catalog reads.
+
+    Per-product entries are dropped only when that product changes. Query
+    result pages (listings, searches) remember the products they hold: a write
+    that only touches other fields, like a stock change, drops just the pages
+    holding that product, while a write that can reorder results drops every
+    page. Entries share one LRU byte budget. Other workers' writes are picked
+    up from the backend at most every `refresh_interval` seconds, or on every
+    read for `refresh_interval` seconds after a write of this worker's own,
+    until that write shows up. `version` and `modified_at` (the time of the
+    newest change read, None before any) describe the catalog as this
+    worker last saw it, for HTTP validators.
+
+    A read that misses takes `generation` before going to the database and
+    hands it back to set_*: if anything was evicted meanwhile, the row read
+    may predate that change and is not stored. Compressed response bodies
+    are kept with their entry (set_body) and charged to the same budget.
+    """
+
+    def __init__(self, backend, max_bytes: int, refresh_interval: float = 1.0):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._products = OrderedDict()
+        self._queries = OrderedDict()
+        self._bytes = 0
+        self._next_sync = 0.0
+        self._eager_until = 0.0
+        self.modified_at = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    async def sync(self):
+        now = time.monotonic()
+        if now < self._next_sync and now >= self._eager_until:
+            return
+        self._next_sync = now + self.refresh_interval
+        version, changes = await self.backend.poll()
+        if version != self.version:
+            self._evict(changes)
+            self.version = version
+            self.modified_at = self.backend.modified_at
+            self._eager_until = 0.0
+
+    async def current_version(self):
+        """The catalog version, synced first if due; kept up even with caching disabled."""
+        await self.sync()
+        return self.version
+
+    def _evict(self, changes):
+        self.generation += 1
+        if changes is None:
+            self._products.clear()
+            self._queries.clear()
+            self._bytes = 0
+            return
+        changed = set()
+        for product_id, reorders in changes:
+            changed.add(product_id)
+            entry = self._products.pop(product_id, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+            if reorders and self._queries:
+                self._bytes -= sum(entry[1] for entry in self._queries.values())
+                self._queries.clear()
+        for key in [key for key, entry in self._queries.items() if not changed.isdisjoint(entry[2])]:
+            self._bytes -= self._queries.pop(key)[1]
+
+    def _lookup(self, entries, key):
+        entry = entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def _store(self, entries, key, value, product_ids=()):
+        size = len(orjson.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        old = entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        # value, bytes charged, products held, response bodies by content-coding
+        entries[key] = [value, size, frozenset(product_ids), {}]
+        self._bytes += size
+        self._shrink()
+
+    def _shrink(self):
+        while self._bytes > self.max_bytes:
+            victims = self._queries or self._products
+            self._bytes -= victims.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    async def get_product(self, product_id: int):
+        if not self.enabled:
+            return None
+        await self.sync()
+        return self._lookup(self._products, product_id)
+
+    def set_product(self, product_id: int, value, generation: int):
+        if self.enabled and generation == self.generation:
+            self._store(self._products, product_id, value)
+
+    async def get_query(self, key: tuple):
+        if not self.enabled:
+            return None
+        await self.sync()
+        return self._lookup(self._queries, key)
+
+    def set_query(self, key: tuple, value, product_ids, generation: int):
+        if self.enabled and generation == self.generation:
+            self._store(self._queries, key, value, product_ids)
+
+    def _entries(self, kind: str):
+        return self._products if kind == "product" else self._queries
+
+    def get_body(self, kind: str, key, encoding: str):
+        """The cached `kind` ("product" or "query") entry's response body as compressed with `encoding`, if kept."""
+        entry = self._entries(kind).get(key)
+        return entry[3].get(encoding) if entry is not None else None
+
+    def set_body(self, kind: str, key, encoding: str, body: bytes, generation: int):
+        """Keep a compressed response body with the cached entry it was rendered from.
+
+        `generation` is the one the entry was read or stored with; if it has
+        moved, the entry may not be the one the body came from.
+        """
+        entry = self._entries(kind).get(key)
+        if entry is None or encoding in entry[3] or generation != self.generation or len(body) > self.max_bytes:
+            return
+        entry[3][encoding] = body
+        entry[1] += len(body)
+        self._bytes += len(body)
+        self._shrink()
+
+    async def invalidate(self, db: AsyncSession, product_ids, reorders: bool = True):
+        """Publish a change to `product_ids` as part of the caller's transaction.
+
+        Pass reorders=False only when no field in REORDERING_FIELDS changed.
+        """
+        await self.backend.record(db, product_ids, reorders)
+        self._evict([(product_id, reorders) for product_id in product_ids])
+        self._eager_until = time.monotonic() + self.refresh_interval
+
+    async def invalidate_all(self, db: AsyncSession):
+        """Publish a change to the whole catalog, for writes too large to list."""
+        await self.backend.record(db, [None], True)
+        self._evict(None)
+        self._eager_until = time.monotonic() + self.refresh_interval
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "products": len(self._products),
+            "queries": len(self._queries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def _build_backend():
+    if settings.CATALOG_CACHE_BACKEND == "local":
+        return LocalVersionBackend()
+    return DatabaseVersionBackend(async_engine)
+
+
+catalog_cache = CatalogCache(
+    backend=_build_backend(),
+    max_bytes=settings.CATALOG_CACHE_MAX_BYTES,
+    refresh_interval=settings.CATALOG_CACHE_REFRESH_SECONDS,
+)
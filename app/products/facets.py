@@ -0,0 +1,118 @@
+"""Catalog facets: product counts and price range per category.
+
+Served from the category_facets summary table instead of a GROUP BY over
+products on every page view. Product writers report what they changed with
+record_changes, in their own transaction; rebuild_facets recomputes the whole
+table for recovery:
+
+    python -m app.products.facets
+"""
+from collections import Counter, defaultdict
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.products.models import CategoryFacet, Product
+
+FACET_COLUMNS = ["category", "product_count", "in_stock_count", "min_price", "max_price"]
+
+
+def aggregate_facets():
+    """The facets computed straight from products; the summary table's source of truth."""
+    return select(
+        Product.category,
+        func.count(Product.id),
+        func.sum(case((Product.stock > 0, 1), else_=0)),
+        func.min(Product.price),
+        func.max(Product.price),
+    ).group_by(Product.category)
+
+
+def rebuild_facets(conn: Connection) -> int:
+    """Recompute every facet from the products table; returns the number of categories."""
+    conn.execute(delete(CategoryFacet))
+    conn.execute(insert(CategoryFacet).from_select(FACET_COLUMNS, aggregate_facets()))
+    return conn.execute(select(func.count()).select_from(CategoryFacet)).scalar()
+
+
+async def get_facets(db: AsyncSession):
+    rows = (await db.execute(select(CategoryFacet).order_by(CategoryFacet.category))).scalars()
+    return [{column: getattr(row, column) for column in FACET_COLUMNS} for row in rows]
+
+
+def _price_bound(column, category, added, removed, lowest: bool):
+    # Added prices can only widen the range. Removing a price at (or beyond)
+    # the current bound may narrow it, which only the products table can tell,
+    # so that case re-reads the bound through ix_products_category_price.
+    expression = column
+    if added is not None:
+        widens = column > added if lowest else column < added
+        expression = case((column.is_(None) | widens, added), else_=column)
+    if removed is not None:
+        narrows = column >= removed if lowest else column <= removed
+        bound = func.min(Product.price) if lowest else func.max(Product.price)
+        current = select(bound).where(Product.category == category).scalar_subquery()
+        expression = case((narrows, current), else_=expression)
+    return expression
+
+
+async def record_changes(db: AsyncSession, before=(), after=()):
+    """Apply a product write to the facets, in the caller's transaction.
+
+    `before` lists (category, price, stock) of the products as they were
+    (deleted or updated ones), `after` as they are now (created or updated
+    ones). Call it once the product write itself has been executed.
+    """
+    before = Counter((category, price, stock > 0) for category, price, stock in before)
+    after = Counter((category, price, stock > 0) for category, price, stock in after)
+    unchanged = before & after
+    before, after = before - unchanged, after - unchanged
+    if not before and not after:
+        return
+
+    deltas = defaultdict(lambda: {"count": 0, "in_stock": 0, "added": [], "removed": []})
+    for sign, products in ((-1, before), (1, after)):
+        for (category, price, in_stock), times in products.items():
+            delta = deltas[category]
+            delta["count"] += sign * times
+            delta["in_stock"] += sign * times * in_stock
+            delta["added" if sign > 0 else "removed"].append(price)
+
+    await db.flush()
+    for category in sorted(deltas):
+        delta = deltas[category]
+        result = await db.execute(
+            update(CategoryFacet)
+            .where(CategoryFacet.category == category)
+            .values(
+                product_count=CategoryFacet.product_count + delta["count"],
+                in_stock_count=CategoryFacet.in_stock_count + delta["in_stock"],
+                min_price=_price_bound(CategoryFacet.min_price, category, min(delta["added"], default=None),
+                                       min(delta["removed"], default=None), lowest=True),
+                max_price=_price_bound(CategoryFacet.max_price, category, max(delta["added"], default=None),
+                                       max(delta["removed"], default=None), lowest=False),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            # a new category (or one missing after a crash): compute it outright
+            await db.execute(insert(CategoryFacet).from_select(
+                FACET_COLUMNS, aggregate_facets().where(Product.category == category)
+            ))
+        elif delta["count"] < 0:
+            await db.execute(
+                delete(CategoryFacet)
+                .where(CategoryFacet.category == category, CategoryFacet.product_count <= 0)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def main():
+    from app.core.database import engine
+
+    with engine.begin() as conn:
+        categories = rebuild_facets(conn)
+    print(f"rebuilt facets for {categories} categories")
+
+
+if __name__ == "__main__":
+    main()
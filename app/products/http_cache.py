@@ -0,0 +1,130 @@
+"""HTTP validators and compression for the public catalog routes.
+
+A catalog read is identified by its query (route and parameters) and the
+catalog version, so the ETag is computed from those two before any query
+runs. A matching If-None-Match is answered with 304 without touching the
+database (the version comes from catalog_cache, synced at most every
+CATALOG_CACHE_REFRESH_SECONDS). Within that window a worker may tag a page
+read fresh from the database with the version it has not yet seen change;
+clients then revalidate into the new page once the version moves, the same
+staleness bound the catalog cache itself has.
+
+Bodies of at least CATALOG_COMPRESS_MIN_BYTES are compressed with brotli,
+when the optional `brotli` package is installed and the client accepts it,
+else gzip. Each encoding is a representation of its own with its own strong
+ETag ("<hash>-gzip"); revalidating any of them is answered with 304. The
+compressed bytes of a response served from (or just stored in) the catalog
+cache are kept with the cache entry, so a hit compresses nothing.
+
+If-None-Match: * matches only a representation that exists, so it is
+answered once the route has found one (in finish), never ahead of a 404.
+
+Last-Modified is the time of the newest catalog change, rounded up to the
+second, taken from the change log so every worker sends the same one.
+If-Modified-Since is not answered with 304: a date to the second cannot
+tell apart two changes within one second, an ETag can.
+"""
+import gzip
+import hashlib
+import math
+from email.utils import formatdate
+from typing import Optional
+import orjson
+from fastapi import Request, Response
+from app.core.config import settings
+from app.products.cache import catalog_cache
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Preferred first; only what this process can produce.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def accepted_encoding(header: str) -> Optional[str]:
+    """The preferred encoding in ENCODINGS that an Accept-Encoding header allows, if any."""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CatalogValidators:
+    """ETag and Last-Modified of one catalog read, and the request's conditionals against them."""
+
+    def __init__(self, request: Request, kind: str, key, scope: str, version, modified_at: Optional[float]):
+        self.request = request
+        self.kind = kind
+        self.key = key
+        self.tag = hashlib.blake2b(orjson.dumps([scope, version, kind, key], default=str), digest_size=12).hexdigest()
+        self.last_modified = formatdate(math.ceil(modified_at), usegmt=True) if modified_at is not None else None
+
+    @classmethod
+    async def for_request(cls, request: Request, kind: str, key):
+        """Validators for the catalog_cache entry `key` of `kind` ("product" or "query")."""
+        version = await catalog_cache.current_version()
+        return cls(request, kind, key, catalog_cache.backend.scope, version, catalog_cache.modified_at)
+
+    def _headers(self, encoding: Optional[str]):
+        headers = {
+            "ETag": f'"{self.tag}-{encoding}"' if encoding else f'"{self.tag}"',
+            "Cache-Control": settings.CATALOG_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if self.last_modified is not None:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+    def not_modified(self) -> Optional[Response]:
+        """A 304 if the client's copy is current, else None."""
+        # weak comparison, as RFC 9110 has it for If-None-Match
+        for candidate in self.request.headers.get("if-none-match", "").split(","):
+            candidate = candidate.strip().removeprefix("W/").strip('"')
+            tag, _, encoding = candidate.partition("-")
+            if tag == self.tag and encoding in ("", "br", "gzip"):
+                return Response(status_code=304, headers=self._headers(encoding or None))
+        return None
+
+    def finish(self, response: Response, generation: int) -> Response:
+        """Add the validators to a 200 response, compressing its body if it is worth it.
+
+        `generation` is the catalog_cache generation the body was read or
+        stored with, so its compressed bytes are kept with that entry only.
+        """
+        encoding = None
+        if len(response.body) >= settings.CATALOG_COMPRESS_MIN_BYTES:
+            encoding = accepted_encoding(self.request.headers.get("accept-encoding", ""))
+        if "*" in {candidate.strip() for candidate in self.request.headers.get("if-none-match", "").split(",")}:
+            return Response(status_code=304, headers=self._headers(encoding))
+        if encoding is not None:
+            body = catalog_cache.get_body(self.kind, self.key, encoding)
+            if body is None:
+                body = _compress(response.body, encoding)
+                catalog_cache.set_body(self.kind, self.key, encoding, body, generation)
+            response.body = body
+            response.headers["Content-Length"] = str(len(response.body))
+            response.headers["Content-Encoding"] = encoding
+        response.headers.update(self._headers(encoding))
+        return response
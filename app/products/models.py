@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Text
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Float, Text, Index, DateTime, Boolean
 from app.core.database import Base
 
 class Product(Base):
@@ -8,6 +9,46 @@ class Product(Base):
     name = Column(String, nullable=False)
     description = Column(Text)
     price = Column(Float, nullable=False)
+    # Units neither sold nor held by a cart reservation.
     stock = Column(Integer, nullable=False)
+    # Bumped by every stock change; writers compare-and-swap on it.
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     category = Column(String, nullable=False)
-    image_url = Column(String)
\ No newline at end of file
+    image_url = Column(String)
+
+    # Composite (sort key, id) indexes back keyset pagination on price and name;
+    # (category, price) backs the catalog filters.
+    __table_args__ = (
+        Index("ix_products_category_price", "category", "price"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_name_id", "name", "id"),
+    )
+
+class CatalogChange(Base):
+    """Append-only log of catalog writes; each row bumps the catalog version.
+
+    Workers poll it to invalidate their in-process catalog caches. product_id
+    has no foreign key so deletions can be logged too; NULL stands for the
+    whole catalog. `reorders` marks writes that can move a product into, out
+    of or within a listing or search result.
+    """
+    __tablename__ = "catalog_changes"
+
+    version = Column(Integer, primary_key=True)
+    product_id = Column(Integer)
+    reorders = Column(Boolean, nullable=False, default=True)
+    changed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class CategoryFacet(Base):
+    """Per-category product counts and price range, kept in step with every product write.
+
+    Maintained incrementally by app.products.facets; `python -m
+    app.products.facets` rebuilds it from the products table.
+    """
+    __tablename__ = "category_facets"
+
+    category = Column(String, primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    in_stock_count = Column(Integer, nullable=False, default=0)
+    min_price = Column(Float)
+    max_price = Column(Float)
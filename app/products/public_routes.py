@@ -1,49 +1,111 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
-from app.auth.routes import get_db
+from fastapi import APIRouter, Depends, Query, Request
+from app.core.sessions import get_read_db
 from app.products.schemas import ProductResponse
-from app.utils.response import create_response
-from sqlalchemy.orm import Session
+from app.utils.response import FastJSONResponse, create_response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.products.models import Product
+from app.products import facets, search
+from app.products.cache import catalog_cache
+from app.products.http_cache import CatalogValidators
+from app.products.utils import dump_products, paginate_by_cursor
 from fastapi.exceptions import HTTPException
 
 router = APIRouter(tags=["Public Routes"])
 
 @router.get('/public_product_health_check')
-def health_check():
+async def health_check():
     return create_response(data={"message": "Health Check is done."})
 
 @router.get("/products", response_model=list[ProductResponse])
-def get_products(
+async def get_products(
+    request: Request,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     sort_by: Optional[str] = Query("id", enum=["id", "price", "name"]),
-    page: int = 1,
-    page_size: int = 10,
-    db: Session = Depends(get_db)
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    pagination: str = Query("offset", enum=["offset", "cursor"]),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Product)
+    cache_key = ("products", category, min_price, max_price, sort_by, page, page_size, pagination, cursor)
+    validators = await CatalogValidators.for_request(request, "query", cache_key)
+    if (not_modified := validators.not_modified()) is not None:
+        return not_modified
+    cached = await catalog_cache.get_query(cache_key)
+    generation = catalog_cache.generation
+    if cached is not None:
+        response = create_response(data=cached) if pagination == "cursor" else FastJSONResponse(cached)
+        return validators.finish(response, generation)
+
+    query = select(Product)
 
     if category:
-        query = query.filter(Product.category == category)
+        query = query.where(Product.category == category)
     if min_price is not None:
-        query = query.filter(Product.price >= min_price)
+        query = query.where(Product.price >= min_price)
     if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+        query = query.where(Product.price <= max_price)
+
+    if pagination == "cursor":
+        products, next_cursor = await paginate_by_cursor(db, query, sort_by, cursor, page_size)
+        data = {
+            "items": dump_products(products),
+            "next_cursor": next_cursor,
+        }
+        catalog_cache.set_query(cache_key, data, [product.id for product in products], generation)
+        return validators.finish(create_response(data=data), generation)
 
     query = query.order_by(getattr(Product, sort_by))
-    products = query.offset((page - 1) * page_size).limit(page_size).all()
-    return products
+    products = (await db.scalars(query.offset((page - 1) * page_size).limit(page_size))).all()
+    data = dump_products(products)
+    catalog_cache.set_query(cache_key, data, [product.id for product in products], generation)
+    return validators.finish(FastJSONResponse(data), generation)
 
 @router.get("/products/search", response_model=list[ProductResponse])
-def search_products(search_word: str, db: Session = Depends(get_db)):
-    products = db.query(Product).filter(Product.name.ilike(f"%{search_word}%")).all()
-    return products
+async def search_products(
+    request: Request,
+    search_word: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    cache_key = ("search", search_word, page, page_size)
+    validators = await CatalogValidators.for_request(request, "query", cache_key)
+    if (not_modified := validators.not_modified()) is not None:
+        return not_modified
+    cached = await catalog_cache.get_query(cache_key)
+    generation = catalog_cache.generation
+    if cached is not None:
+        return validators.finish(FastJSONResponse(cached), generation)
+
+    products = await search.search_products(db, search_word, page, page_size)
+    data = dump_products(products)
+    catalog_cache.set_query(cache_key, data, [product.id for product in products], generation)
+    return validators.finish(FastJSONResponse(data), generation)
+
+@router.get("/products/facets")
+async def product_facets(db: AsyncSession = Depends(get_read_db)):
+    # Product count, in-stock count and price range per category, for the
+    # storefront filters; read from the category_facets summary table.
+    return create_response(data=await facets.get_facets(db))
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
-def product_detail(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).get(product_id)
+async def product_detail(request: Request, product_id: int, db: AsyncSession = Depends(get_read_db)):
+    validators = await CatalogValidators.for_request(request, "product", product_id)
+    if (not_modified := validators.not_modified()) is not None:
+        return not_modified
+    cached = await catalog_cache.get_product(product_id)
+    generation = catalog_cache.generation
+    if cached is not None:
+        return validators.finish(FastJSONResponse(cached), generation)
+
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    data = ProductResponse.model_validate(product).model_dump()
+    catalog_cache.set_product(product_id, data, generation)
+    return validators.finish(FastJSONResponse(data), generation)
@@ -0,0 +1,104 @@
+import re
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.products.models import Product
+
+# External-content FTS5 index over the products table. The unicode61 tokenizer
+# folds case and diacritics; prefix indexes keep "wid*" style lookups cheap.
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+]
+
+# bm25 column weights: name matches outrank category, which outranks description.
+# Stored as the index's default rank so "ORDER BY rank" uses FTS5's fast path.
+SEARCH_RANK = "bm25(10.0, 1.0, 4.0)"
+
+# Rank and page inside the FTS index first, then join only the page of hits.
+SEARCH_QUERY = text("""
+    SELECT products.* FROM (
+        SELECT rowid, rank FROM products_fts
+        WHERE products_fts MATCH :match
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    ) AS hits
+    JOIN products ON products.id = hits.rowid
+    ORDER BY hits.rank
+""")
+
+
+def create_search_index(conn: Connection):
+    """Create the FTS index and its sync triggers, backfilling it on first creation.
+
+    The triggers keep the index in step with every insert, update and delete on
+    products, so the admin routes need no search-specific code. SQLite only.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+    ).first()
+    for statement in SEARCH_INDEX_DDL:
+        conn.execute(text(statement))
+    if not exists:
+        conn.execute(
+            text("INSERT INTO products_fts(products_fts, rank) VALUES ('rank', :rank)"),
+            {"rank": SEARCH_RANK},
+        )
+        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+
+def build_match_expression(search_word: str):
+    # Quote every term so user input can never inject FTS operators, and make
+    # each one a prefix query so partially typed words still match.
+    terms = re.findall(r"\w+", search_word.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+async def search_products(db: AsyncSession, search_word: str, page: int, page_size: int):
+    limit = page_size
+    offset = (page - 1) * page_size
+
+    if db.get_bind().dialect.name != "sqlite":
+        return (await db.scalars(
+            select(Product)
+            .where(Product.name.ilike(f"%{search_word}%"))
+            .order_by(Product.id)
+            .offset(offset)
+            .limit(limit)
+        )).all()
+
+    match = build_match_expression(search_word)
+    if not match:
+        return []
+    return (await db.scalars(
+        select(Product).from_statement(SEARCH_QUERY),
+        {"match": match, "limit": limit, "offset": offset},
+    )).all()
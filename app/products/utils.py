@@ -0,0 +1,60 @@
+import base64
+import json
+from fastapi import HTTPException
+from pydantic import TypeAdapter
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.products.models import Product
+from app.products.schemas import ProductResponse
+
+PRODUCT_LIST = TypeAdapter(list[ProductResponse])
+
+
+def dump_products(products):
+    # One validation pass over the whole list; the dicts are ready to render or cache.
+    return PRODUCT_LIST.dump_python(PRODUCT_LIST.validate_python(products, from_attributes=True))
+
+
+def encode_cursor(sort_by: str, product: Product):
+    raw = json.dumps([sort_by, getattr(product, sort_by), product.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # the values go into SQL comparisons, so only the scalars encode_cursor writes
+    if (
+        not isinstance(value, (str, int, float)) or isinstance(value, bool)
+        or not isinstance(last_id, int) or isinstance(last_id, bool)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort_by:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by")
+    return value, last_id
+
+
+async def paginate_by_cursor(db: AsyncSession, query: Select, sort_by: str, cursor: str = None, page_size: int = 10):
+    """Return one page of products after `cursor` plus the cursor for the next page.
+
+    Rows are ordered by (sort_by, id) and the page starts strictly after the
+    (value, id) pair in the cursor, so the cost of a page does not depend on how
+    deep it is and concurrent inserts never shift rows between pages.
+    """
+    sort_column = getattr(Product, sort_by)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by)
+        if sort_by == "id":
+            query = query.where(Product.id > last_id)
+        else:
+            query = query.where(tuple_(sort_column, Product.id) > tuple_(value, last_id))
+
+    order = [Product.id] if sort_by == "id" else [sort_column, Product.id]
+    rows = (await db.scalars(query.order_by(*order).limit(page_size + 1))).all()
+
+    products = rows[:page_size]
+    next_cursor = encode_cursor(sort_by, products[-1]) if len(rows) > page_size else None
+    return products, next_cursor
@@ -1,35 +1,32 @@
-import os
 import logging
 from fastapi import Request
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.utils.response import create_response
 
-os.makedirs("logs", exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("logs/logs.txt"),
-        logging.StreamHandler()
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
-    logger.error(f"HTTPException: {exc.detail} | Status Code: {exc.status_code} | Path: {request.url.path}")
+    # The path goes in a field rather than the message, so a flood of 404s on
+    # random paths is still sampled as one repeated error.
+    logger.log(
+        logging.ERROR if exc.status_code >= 500 else logging.WARNING,
+        "HTTPException: %s | Status Code: %s", exc.detail, exc.status_code,
+        extra={"path": request.url.path, "method": request.method},
+    )
     return create_response(
         message=exc.detail,
-        code=exc.status_code,
-        error=True
+        status_code=exc.status_code,
+        error=True,
+        headers=getattr(exc, "headers", None)
     )
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    logger.error(f"ValidationError on {request.url.path}: {exc.errors()}")
+    errors = exc.errors()
+    logger.warning("ValidationError", extra={"path": request.url.path, "method": request.method, "errors": errors})
     return create_response(
         message="Validation error",
-        code=422,
+        status_code=422,
         error=True,
-        data=exc.errors()
+        data=errors
     )
@@ -1,8 +1,25 @@
+import orjson
 from fastapi.responses import JSONResponse
+from pydantic_core import to_jsonable_python
 
-def create_response(data=None, message="Success", status_code=200, code=None,error=False):
-    return JSONResponse(
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    Values orjson does not handle natively, such as pydantic models, are
+    converted by pydantic-core, so routes can return validated models as-is.
+    Returning a Response also skips FastAPI's response_model re-validation;
+    routes keep response_model for the OpenAPI schema only.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+
+
+def create_response(data=None, message="Success", status_code=200, code=None,error=False, headers=None):
+    return FastJSONResponse(
         status_code=status_code,
+        headers=headers,
         content={
             "error": error,
             "message": message,
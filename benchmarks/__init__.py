@@ -0,0 +1,29 @@
+"""Benchmark scripts, run as modules from the repo root, e.g.
+
+    python -m benchmarks.checkout_concurrency --buyers 500
+
+Each script works against its own throwaway SQLite file unless DATABASE_URL is
+already set, so benchmarks never touch python_cap.db.
+"""
+import logging
+import os
+import tempfile
+
+BENCH_DB_PATH = os.path.join(tempfile.gettempdir(), "python_cap_bench.db")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB_PATH}")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_DAYS", "7")
+os.environ.setdefault("EMAIL_HOST", "localhost")
+os.environ.setdefault("EMAIL_PORT", "1025")
+os.environ.setdefault("EMAIL_USERNAME", "bench")
+os.environ.setdefault("EMAIL_PASSWORD", "bench")
+os.environ.setdefault("EMAIL_FROM", "bench@example.com")
+# In-process clients all share one address, so per-client rate limits would
+# throttle the benchmarks themselves; benchmarks.overload turns them on.
+os.environ.setdefault("ADMISSION_CONTROL", "false")
+
+# The app logs at INFO; per-request client lines would drown benchmark output.
+logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -0,0 +1,57 @@
+"""Throughput and p99 latency: async session routes vs the old threadpool model.
+
+Serves the same catalog reads two ways, the real async routes and the previous
+sync handlers from benchmarks/legacy.py, and drives both in-process at high
+concurrency through httpx.
+"""
+import argparse
+import asyncio
+import httpx
+from benchmarks.common import Timer, percentile, reset_database
+from benchmarks.legacy import legacy_app
+from benchmarks.search import load_catalog
+from app.main import app
+
+
+async def drive(target, requests, concurrency, rows):
+    transport = httpx.ASGITransport(app=target, raise_app_exceptions=False)
+    latencies = []
+    errors = 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(client, i):
+        nonlocal errors
+        url = f"/products/{i % rows + 1}" if i % 2 else f"/products?category=home&sort_by=price&page={i % 50 + 1}"
+        async with gate:
+            with Timer() as timer:
+                response = await client.get(url)
+            latencies.append(timer.elapsed * 1000)
+            errors += response.status_code != 200
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with Timer() as total:
+            await asyncio.gather(*(one(client, i) for i in range(requests)))
+    return requests / total.elapsed, percentile(latencies, 50), percentile(latencies, 99), errors
+
+
+async def run(rows, requests, levels):
+    for concurrency in levels:
+        for label, target in (("threadpool", legacy_app), ("async", app)):
+            rps, p50, p99, errors = await drive(target, requests, concurrency, rows)
+            print(f"{label:10} concurrency={concurrency:<4} rps={rps:8.1f} p50={p50:7.2f}ms p99={p99:7.2f}ms errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    reset_database()
+    load_catalog(args.rows)
+    asyncio.run(run(args.rows, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
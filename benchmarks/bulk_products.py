@@ -0,0 +1,139 @@
+"""Bulk product import/export: rows per second and peak RSS.
+
+Writes a synthetic supplier feed (500k rows by default) to a temp file,
+streams it to POST /admin/products/import, then streams GET
+/admin/products/export back out, discarding the body as it arrives. The old
+path, one POST /admin/products per product, is timed first on a small sample
+whose rows are then part of the export. Exits non-zero if any row is lost on the way in or out.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import httpx
+import orjson
+from benchmarks.common import Timer, reset_database
+from benchmarks.search import CATEGORIES, NOUNS, WORDS
+from app.auth.utils import create_access_token
+from app.main import app
+
+HEADERS = {"Authorization": "Bearer " + create_access_token(data={"id": 1, "email": "bench@example.com", "role": "admin"})}
+FIELDS = ["name", "description", "price", "stock", "category", "image_url"]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def feed_rows(rows):
+    rng = random.Random(42)
+    for i in range(rows):
+        yield {
+            "name": f"{rng.choice(WORDS)} {rng.choice(NOUNS)} {i}",
+            "description": f"A {rng.choice(WORDS)} {rng.choice(NOUNS)}, for everyday use",
+            "price": round(rng.uniform(1, 500), 2),
+            "stock": rng.randint(0, 100),
+            "category": rng.choice(CATEGORIES),
+            "image_url": None,
+        }
+
+
+def write_feed(path, rows, format):
+    if format == "ndjson":
+        with open(path, "wb") as out:
+            for row in feed_rows(rows):
+                out.write(orjson.dumps(row) + b"\n")
+        return
+    with open(path, "w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(feed_rows(rows))
+
+
+async def read_file(path, chunk_size=64 * 1024):
+    with open(path, "rb") as feed:
+        while chunk := feed.read(chunk_size):
+            yield chunk
+
+
+async def export(format):
+    # Drive the ASGI app directly: httpx's ASGI transport buffers whole
+    # response bodies, which would hide whether the export streams.
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/admin/products/export", "raw_path": b"/admin/products/export",
+        "query_string": f"format={format}".encode(), "root_path": "", "server": ("bench", 80),
+        "client": ("bench", 1), "headers": [(b"authorization", HEADERS["Authorization"].encode())],
+    }
+    lines = 0
+    status = None
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # the client never disconnects
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal lines, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+
+    await app(scope, receive, send)
+    return status, lines - (format == "csv")
+
+
+async def run(args, path):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        with Timer() as legacy:
+            for row in feed_rows(args.baseline):
+                await client.post("/admin/products", json=row, headers=HEADERS)
+
+        with Timer() as imported:
+            response = await client.post(
+                f"/admin/products/import?format={args.format}", content=read_file(path), headers=HEADERS
+            )
+        report = response.json()["data"]
+        import_rss = peak_rss_mb()
+
+    with Timer() as exported:
+        status, lines = await export(args.format)
+    return args.baseline / legacy.elapsed, report, imported.elapsed, import_rss, status, lines, exported.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--baseline", type=int, default=1_000, help="rows created one request each")
+    args = parser.parse_args()
+
+    reset_database()
+    path = os.path.join(tempfile.gettempdir(), f"python_cap_feed.{args.format}")
+    write_feed(path, args.rows, args.format)
+    start_rss = peak_rss_mb()
+
+    legacy_rps, report, import_s, import_rss, status, lines, export_s = asyncio.run(run(args, path))
+    export_rss = peak_rss_mb()
+    os.remove(path)
+
+    print(f"feed: {args.rows} rows, {args.format}, peak RSS before import {start_rss:.0f} MB")
+    print(f"per-product POST: {legacy_rps:9.1f} rows/s")
+    print(f"bulk import:      {args.rows / import_s:9.1f} rows/s  peak RSS {import_rss:.0f} MB  "
+          f"created={report['created']} updated={report['updated']} failed={report['failed']}")
+    print(f"streaming export: {lines / export_s:9.1f} rows/s  peak RSS {export_rss:.0f} MB  rows={lines}")
+    ok = report["created"] == args.rows and status == 200 and lines == args.rows + args.baseline
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Offline cart sync: one POST /cart/batch against one POST /cart/ per line.
+
+Each round syncs --lines cart lines for a fresh user through the in-process
+app, once as single calls and once as a single batch, and reports the wall
+time and the number of SQL statements of both. Exits non-zero if the two
+leave different carts or stock behind.
+
+    python -m benchmarks.cart_batch --lines 100
+"""
+import argparse
+import asyncio
+import sys
+import httpx
+from sqlalchemy import func
+from benchmarks.common import Timer, percentile, reset_database
+from app.auth.models import User, UserRole
+from app.auth.utils import create_access_token
+from app.cart.models import Cart
+from app.core.database import SessionLocal, async_engine, engine
+from app.core.query_counter import count_queries
+from app.main import app
+from app.products.models import Product
+
+
+def seed(lines: int, users: int):
+    reset_database()
+    with SessionLocal() as db:
+        db.add_all(Product(name=f"sync item {i}", description="", price=1.0 + i, stock=10_000, category="home")
+                   for i in range(lines))
+        accounts = [User(name=f"sync{i}", email=f"sync{i}@example.com", hashed_password="x", role=UserRole.user)
+                    for i in range(users)]
+        db.add_all(accounts)
+        db.commit()
+        tokens = [create_access_token(data={"id": user.id, "email": user.email, "role": "user"}) for user in accounts]
+    engine.dispose()
+    return tokens
+
+
+async def single_calls(http, headers, lines):
+    for product_id in range(1, lines + 1):
+        response = await http.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=headers)
+        response.raise_for_status()
+
+
+async def batch_call(http, headers, lines):
+    operations = [{"op": "add", "product_id": product_id, "quantity": 1} for product_id in range(1, lines + 1)]
+    response = await http.post("/cart/batch", json={"operations": operations}, headers=headers)
+    response.raise_for_status()
+    assert response.json()["data"]["failed"] == 0, response.text
+
+
+async def run(args, tokens):
+    samples = {"single": [], "batch": []}
+    queries = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for round_number in range(args.rounds):
+            for offset, (name, sync) in enumerate((("single", single_calls), ("batch", batch_call))):
+                headers = {"Authorization": "Bearer " + tokens[2 * round_number + offset]}
+                with count_queries(async_engine.sync_engine) as counter, Timer() as timer:
+                    await sync(http, headers, args.lines)
+                samples[name].append(timer.elapsed * 1000)
+                queries[name] = counter.count
+    await async_engine.dispose()
+    return samples, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    tokens = seed(args.lines, 2 * args.rounds)
+    samples, queries = asyncio.run(run(args, tokens))
+
+    print(f"{args.lines} lines, {args.rounds} rounds")
+    for name in ("single", "batch"):
+        print(f"{name:7} p50={percentile(samples[name], 50):8.1f}ms p95={percentile(samples[name], 95):8.1f}ms "
+              f"queries={queries[name]}")
+    print(f"speedup {percentile(samples['single'], 50) / percentile(samples['batch'], 50):.1f}x")
+
+    with SessionLocal() as db:
+        per_user = db.query(Cart.user_id, func.sum(Cart.quantity)).group_by(Cart.user_id).all()
+        stock = db.query(func.sum(Product.stock)).scalar()
+    expected_stock = args.lines * 10_000 - 2 * args.rounds * args.lines
+    if sorted(total for _, total in per_user) != [args.lines] * (2 * args.rounds) or stock != expected_stock:
+        print("FAIL: single calls and batches left different carts or stock")
+        sys.exit(1)
+    print("PASS: both paths leave the same carts and reservations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Catalog read throughput with and without the read-through catalog cache.
+
+Drives a read-mostly mix (product detail over a hot set, listing pages and
+searches) with a small share of stock writes that go through the same
+invalidation path as checkout. After each run every cached product is compared
+with the database; any stale entry fails the run.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import httpx
+from sqlalchemy import update
+from benchmarks.common import Timer, percentile, reset_database
+from benchmarks.search import load_catalog
+from app.core.database import AsyncSessionLocal
+from app.main import app
+from app.products.cache import catalog_cache
+from app.products.models import Product
+
+
+async def write(product_id):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Product).where(Product.id == product_id).values(stock=Product.stock - 1))
+        await catalog_cache.invalidate(db, [product_id])
+        await db.commit()
+
+
+async def drive(requests, concurrency, hot, write_ratio):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    latencies = []
+    errors = 0
+    gate = asyncio.Semaphore(concurrency)
+    rng = random.Random(42)
+    plan = [rng.random() for _ in range(requests)]
+
+    async def one(client, i):
+        nonlocal errors
+        product_id = rng.randint(1, hot)
+        async with gate:
+            with Timer() as timer:
+                if plan[i] < write_ratio:
+                    await write(product_id)
+                    status = 200
+                elif plan[i] < 0.7:
+                    status = (await client.get(f"/products/{product_id}")).status_code
+                elif plan[i] < 0.9:
+                    status = (await client.get(f"/products?category=home&sort_by=price&page={i % 20 + 1}")).status_code
+                else:
+                    status = (await client.get("/products/search", params={"search_word": "lamp"})).status_code
+            latencies.append(timer.elapsed * 1000)
+            errors += status != 200
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with Timer() as total:
+            await asyncio.gather(*(one(client, i) for i in range(requests)))
+    return requests / total.elapsed, percentile(latencies, 50), percentile(latencies, 99), errors
+
+
+async def stale_entries():
+    cached = [entry[0] for entry in catalog_cache._products.values()]
+    for entry in catalog_cache._queries.values():
+        cached.extend(entry[0]["items"] if isinstance(entry[0], dict) else entry[0])
+    stale = 0
+    async with AsyncSessionLocal() as db:
+        for item in cached:
+            product = await db.get(Product, item["id"])
+            stale += product is None or item["stock"] != product.stock
+    return stale
+
+
+async def run(args):
+    failed = False
+    for label, max_bytes in (("no cache", 0), ("cache", args.max_bytes)):
+        catalog_cache.max_bytes = max_bytes
+        catalog_cache.hits = catalog_cache.misses = 0
+        rps, p50, p99, errors = await drive(args.requests, args.concurrency, args.hot, args.write_ratio)
+        stats = catalog_cache.stats()
+        stale = await stale_entries()
+        failed |= bool(stale or errors)
+        print(
+            f"{label:8} rps={rps:8.1f} p50={p50:7.2f}ms p99={p99:7.2f}ms errors={errors} "
+            f"hit_ratio={stats['hit_ratio']:.2f} stale={stale}"
+        )
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--hot", type=int, default=1_000, help="product ids 1..hot receive the traffic")
+    parser.add_argument("--write-ratio", type=float, default=0.02)
+    parser.add_argument("--max-bytes", type=int, default=64 * 1024 * 1024)
+    args = parser.parse_args()
+
+    reset_database()
+    load_catalog(args.rows)
+    sys.exit(1 if asyncio.run(run(args)) else 0)
+
+
+if __name__ == "__main__":
+    main()
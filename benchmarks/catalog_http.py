@@ -0,0 +1,155 @@
+"""Public catalog reads over HTTP: bytes on the wire and revalidation.
+
+Loads --rows products, then for a listing page, a search page and a product
+detail reports the body size sent uncompressed and with each encoding the
+app can produce (gzip, and brotli when installed), and checks that every
+encoding decodes to the same JSON. Bodies under CATALOG_COMPRESS_MIN_BYTES
+are sent uncompressed. It then times --requests full 200 reads
+(served from the catalog cache) against the same reads revalidated with
+If-None-Match, counting SQL statements per read. Finally it writes each
+page's products and revalidates once more, and sends If-None-Match: * for a
+product that exists and one that does not. Exits non-zero if a 304 runs a
+query beyond the catalog version sync, if a revalidation after a write is
+still answered with 304, or if * is answered with 304 for a missing product.
+
+    python -m benchmarks.catalog_http --rows 50000
+"""
+import argparse
+import asyncio
+import gzip
+import sys
+import httpx
+import orjson
+from sqlalchemy import update
+from benchmarks.common import Timer, percentile, reset_database
+from benchmarks.search import load_catalog
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.core.query_counter import count_queries
+from app.main import app
+from app.products.cache import catalog_cache
+from app.products.http_cache import ENCODINGS, brotli
+from app.products.models import Product
+
+PAGES = (
+    ("listing", "/products", {"category": "home", "sort_by": "price", "page_size": 100}),
+    ("search", "/products/search", {"search_word": "lamp", "page_size": 50}),
+    ("detail", "/products/7", {}),
+)
+
+
+def decode(response):
+    encoding = response.headers.get("content-encoding")
+    body = response.raw
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "br":
+        body = brotli.decompress(body)
+    return orjson.loads(body)
+
+
+async def get(http, path, params, **headers):
+    # the raw stream: bytes as sent, not as httpx would decode them
+    headers = {name.replace("_", "-"): value for name, value in headers.items()}
+    async with http.stream("GET", path, params=params, headers=headers) as response:
+        response.raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response
+
+
+async def wire_sizes(http):
+    ok = True
+    print(f"{'page':8} {'identity':>9} " + " ".join(f"{encoding:>9}" for encoding in ENCODINGS))
+    for label, path, params in PAGES:
+        plain = await get(http, path, params, accept_encoding="identity")
+        sizes = [len(plain.raw)]
+        for encoding in ENCODINGS:
+            response = await get(http, path, params, accept_encoding=encoding)
+            sizes.append(len(response.raw))
+            # bodies under the threshold go out as they are
+            expected = encoding if sizes[0] >= settings.CATALOG_COMPRESS_MIN_BYTES else None
+            if response.headers.get("content-encoding") != expected or decode(response) != decode(plain):
+                print(f"FAIL: {label} sent with {encoding} does not decode to the uncompressed body")
+                ok = False
+        print(f"{label:8} " + " ".join(f"{size:9}" for size in sizes))
+    return ok
+
+
+async def revalidation(http, requests):
+    ok = True
+    print(f"{'page':8} {'status':>6} {'p50 ms':>8} {'p99 ms':>8} {'queries/read':>13}")
+    for label, path, params in PAGES:
+        etag = (await get(http, path, params, accept_encoding="gzip")).headers["etag"]
+        for status, headers in ((200, {}), (304, {"if_none_match": etag})):
+            samples = []
+            with count_queries(async_engine.sync_engine) as counter, Timer() as total:
+                for _ in range(requests):
+                    with Timer() as timer:
+                        response = await get(http, path, params, accept_encoding="gzip", **headers)
+                    samples.append(timer.elapsed * 1000)
+                    if response.status_code != status:
+                        print(f"FAIL: {label} answered {response.status_code}, expected {status}")
+                        ok = False
+            print(f"{label:8} {status:6} {percentile(samples, 50):8.3f} {percentile(samples, 99):8.3f} "
+                  f"{counter.count / requests:13.3f}")
+            # one catalog version sync per refresh interval is the only query a 304 may run
+            syncs = total.elapsed / catalog_cache.refresh_interval + 1
+            if status == 304 and counter.count > syncs:
+                print(f"FAIL: {label} 304s ran {counter.count} queries, at most {syncs:.0f} version syncs expected")
+                ok = False
+    return ok
+
+
+async def after_writes(http):
+    ok = True
+    for label, path, params in PAGES:
+        response = await get(http, path, params, accept_encoding="gzip")
+        product_id = decode(response)["id"] if label == "detail" else decode(response)[0]["id"]
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Product).where(Product.id == product_id).values(stock=Product.stock + 1))
+            await catalog_cache.invalidate(db, [product_id])
+            await db.commit()
+        again = await get(http, path, params, accept_encoding="gzip", if_none_match=response.headers["etag"])
+        if again.status_code != 200 or again.headers["etag"] == response.headers["etag"]:
+            print(f"FAIL: {label} revalidated as {again.status_code} after product {product_id} changed")
+            ok = False
+    print("after a write: every page revalidates into a new ETag" if ok else "after a write: stale 304s")
+    return ok
+
+
+async def any_tag(http, rows):
+    # RFC 9110: If-None-Match: * matches only a representation that exists
+    present = await get(http, "/products/1", {}, if_none_match="*")
+    missing = await get(http, f"/products/{rows + 1}", {}, if_none_match="*")
+    print(f"If-None-Match: * -> {present.status_code} for a product, {missing.status_code} for a missing one")
+    if (present.status_code, missing.status_code) != (304, 404):
+        print("FAIL: If-None-Match: * must be 304 only for a product that exists")
+        return False
+    return True
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        ok = await wire_sizes(http)
+        ok &= await revalidation(http, args.requests)
+        ok &= await after_writes(http)
+        ok &= await any_tag(http, args.rows)
+    await async_engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=1_000, help="reads per page and status")
+    args = parser.parse_args()
+
+    reset_database()
+    load_catalog(args.rows)
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+    print("PASS: 304s skip the database and writes change the ETag")
+
+
+if __name__ == "__main__":
+    main()
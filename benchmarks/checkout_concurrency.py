@@ -0,0 +1,90 @@
+"""Flash-sale checkout benchmark: many buyers, one hot product.
+
+Every buyer has the hot product in their cart and checks out concurrently.
+The run fails (exit code 1) if more units were sold than were in stock, or if
+stock and order lines disagree.
+"""
+import argparse
+import asyncio
+import sys
+from fastapi import HTTPException
+from sqlalchemy import func
+from benchmarks.common import Timer, reset_database
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.auth.models import User, UserRole
+from app.cart.models import Cart
+from app.orders.models import Order, OrderItem
+from app.products.models import Product
+from app.orders.utils import place_order
+
+
+def seed(buyers: int, stock: int, quantity: int) -> int:
+    db = SessionLocal()
+    product = Product(name="Hot item", description="Flash sale", price=9.99, stock=stock, category="sale")
+    db.add(product)
+    db.add_all(
+        User(name=f"buyer{i}", email=f"buyer{i}@example.com", hashed_password="x", role=UserRole.user)
+        for i in range(buyers)
+    )
+    db.flush()
+    user_ids = [row.id for row in db.query(User.id).all()]
+    db.add_all(Cart(user_id=uid, product_id=product.id, quantity=quantity) for uid in user_ids)
+    db.commit()
+    product_id = product.id
+    db.close()
+    return product_id
+
+
+async def buy(user_id: int, gate: asyncio.Semaphore) -> str:
+    async with gate, AsyncSessionLocal() as db:
+        try:
+            await place_order(db, user_id)
+            return "ok"
+        except HTTPException as exc:
+            return "sold_out" if exc.status_code == 400 else "busy"
+
+
+async def run_buyers(user_ids, workers):
+    gate = asyncio.Semaphore(workers)
+    return await asyncio.gather(*(buy(uid, gate) for uid in user_ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    reset_database()
+    product_id = seed(args.buyers, args.stock, args.quantity)
+
+    db = SessionLocal()
+    user_ids = [row.id for row in db.query(User.id).all()]
+    db.close()
+
+    with Timer() as timer:
+        outcomes = asyncio.run(run_buyers(user_ids, args.workers))
+
+    db = SessionLocal()
+    final_stock = db.query(Product.stock).filter(Product.id == product_id).scalar()
+    sold = db.query(func.coalesce(func.sum(OrderItem.quantity), 0)).filter(OrderItem.product_id == product_id).scalar()
+    orders = db.query(func.count(Order.id)).scalar()
+    db.close()
+
+    succeeded = outcomes.count("ok")
+    print(f"buyers={args.buyers} stock={args.stock} workers={args.workers}")
+    print(f"ok={succeeded} sold_out={outcomes.count('sold_out')} busy={outcomes.count('busy')}")
+    print(f"orders={orders} units_sold={sold} final_stock={final_stock}")
+    print(f"elapsed={timer.elapsed:.3f}s checkouts_per_sec={succeeded / timer.elapsed:.1f}")
+
+    consistent = final_stock >= 0 and sold + final_stock == args.stock and orders == succeeded
+    if not consistent:
+        print("FAIL: inventory is inconsistent (oversold or lost updates)")
+        sys.exit(1)
+    print("PASS: no overselling")
+
+
+if __name__ == "__main__":
+    main()
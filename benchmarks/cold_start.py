@@ -0,0 +1,121 @@
+"""Worker cold start: import time, app build, lifespan startup and first request.
+
+Each sample is a fresh interpreter, as a new uvicorn worker would be. --workers
+of them start at the same moment, as a scaling event would start them. The
+"factory" mode is the default deploy: the schema was migrated beforehand and
+workers only build the app. The "migrate" mode sets MIGRATE_ON_STARTUP, so
+every worker repeats create_all and the migration check, as every worker
+used to do at import. Then uvicorn itself is started and polled until it
+serves its first request.
+
+    python -m benchmarks.cold_start --rounds 5 --workers 4
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import orjson
+from benchmarks.common import percentile, reset_database
+
+STEPS = ["import", "build", "startup", "first_request", "total"]
+
+# Runs in the child interpreter; each step is timed separately.
+PROBE = """
+import time
+started = time.perf_counter()
+import asyncio, orjson, httpx
+marks = {}
+def mark(step):
+    marks[step] = time.perf_counter()
+from app.main import create_app
+mark("import")
+app = create_app()
+mark("build")
+async def serve():
+    async with app.router.lifespan_context(app):
+        mark("startup")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://probe") as client:
+            (await client.get("/")).raise_for_status()
+        mark("first_request")
+asyncio.run(serve())
+previous, timings = started, {}
+for step, at in marks.items():
+    timings[step], previous = (at - previous) * 1000, at
+timings["total"] = (previous - started) * 1000
+print(orjson.dumps(timings).decode())
+"""
+
+
+def probe_env(mode):
+    env = {**os.environ, "LOG_CONSOLE": "false", "EMAIL_OUTBOX_WORKER": "false", "RESERVATION_SWEEPER": "false"}
+    env["MIGRATE_ON_STARTUP"] = "true" if mode == "migrate" else "false"
+    return env
+
+
+def probe(mode):
+    result = subprocess.run([sys.executable, "-c", PROBE], env=probe_env(mode), capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr)
+    return orjson.loads(result.stdout.splitlines()[-1])
+
+
+def measure(mode, rounds, workers):
+    samples = {step: [] for step in STEPS}
+    with ThreadPoolExecutor(workers) as pool:
+        for _ in range(rounds):
+            for timings in pool.map(probe, [mode] * workers):
+                for step in STEPS:
+                    samples[step].append(timings[step])
+    return samples
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def uvicorn_first_response(workers, timeout=60.0):
+    """Seconds from launching uvicorn until it answers GET / with 200."""
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "app.main:create_app", "--factory", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    started = time.perf_counter()
+    server = subprocess.Popen(command, env=probe_env("factory"), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                time.sleep(0.01)
+        raise RuntimeError("uvicorn did not answer in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4, help="interpreters started at once per round")
+    args = parser.parse_args()
+
+    reset_database()
+    print(f"{args.rounds} rounds of {args.workers} concurrent workers, p50 / p95 ms")
+    print(f"{'mode':8} " + " ".join(f"{step:>17}" for step in STEPS))
+    for mode in ("factory", "migrate"):
+        samples = measure(mode, args.rounds, args.workers)
+        print(f"{mode:8} " + " ".join(
+            f"{percentile(samples[step], 50):8.1f}/{percentile(samples[step], 95):8.1f}" for step in STEPS
+        ))
+    print(f"uvicorn --workers {args.workers}: first 200 after {uvicorn_first_response(args.workers):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
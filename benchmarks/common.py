@@ -0,0 +1,49 @@
+import os
+import time
+from app.core.database import Base, engine
+from app.core.migrations import migrate
+from app.auth import models as auth_models  # noqa: F401  (register tables)
+from app.cart import models as cart_models  # noqa: F401
+from app.inventory import models as inventory_models  # noqa: F401
+from app.orders import models as order_models  # noqa: F401
+from app.outbox import models as outbox_models  # noqa: F401
+from app.products import models as product_models  # noqa: F401
+
+
+def reset_database():
+    """Recreate the benchmark database from scratch.
+
+    SQLite files are deleted outright so the FTS index, triggers and migration
+    history, which live outside the ORM metadata, are rebuilt too.
+    """
+    engine.dispose()
+    if engine.dialect.name == "sqlite" and engine.url.database:
+        remove_sqlite_files(engine.url.database)
+    else:
+        Base.metadata.drop_all(bind=engine)
+    migrate(engine)
+
+
+def remove_sqlite_files(path: str):
+    # WAL mode keeps -wal and -shm files next to the database; a stale pair
+    # must never meet a new file of the same name.
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,74 @@
+"""Compare two benchmarks.scenarios reports.
+
+    python -m benchmarks.compare benchmarks/reports/base.json benchmarks/reports/new.json
+
+Prints throughput and p50/p95/p99 for every scenario and endpoint present in
+both, with the relative change. Exits non-zero if any p95 or p99 got slower,
+or any throughput dropped, by more than --threshold percent, so it can gate
+a CI job.
+"""
+import argparse
+import sys
+import orjson
+
+# metric -> True when a larger value is worse
+METRICS = {"throughput_rps": False, "p50": True, "p95": True, "p99": True}
+GATED = {"throughput_rps", "p95", "p99"}
+
+
+def load(path):
+    with open(path, "rb") as report_file:
+        return orjson.loads(report_file.read())
+
+
+def values(summary):
+    return {"throughput_rps": summary["throughput_rps"], **summary["latency_ms"]}
+
+
+def change(base, new):
+    return (new - base) / base * 100 if base else 0.0
+
+
+def compare(base, new, threshold):
+    regressions = []
+    for name, scenario in base["scenarios"].items():
+        if name not in new["scenarios"]:
+            continue
+        rows = [(name, scenario, new["scenarios"][name])]
+        rows += [
+            (f"  {label}", summary, new["scenarios"][name]["endpoints"][label])
+            for label, summary in scenario["endpoints"].items()
+            if label in new["scenarios"][name]["endpoints"]
+        ]
+        for label, before, after in rows:
+            before, after = values(before), values(after)
+            cells = []
+            for metric, higher_is_worse in METRICS.items():
+                delta = change(before[metric], after[metric])
+                worse = delta if higher_is_worse else -delta
+                flag = "!" if metric in GATED and worse > threshold else " "
+                if flag == "!":
+                    regressions.append(f"{label.strip()} {metric} {delta:+.1f}%")
+                cells.append(f"{metric.split('_')[0]} {after[metric]:9.2f} ({delta:+6.1f}%){flag}")
+            print(f"{label:26} " + "  ".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression, in percent")
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f"base: {base['meta']['commit']} {base['meta']['started_at']}  new: {new['meta']['commit']} "
+          f"{new['meta']['started_at']}")
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print(f"regressions over {args.threshold:.0f}%: " + ", ".join(regressions))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Seeded synthetic dataset: users, products, carts and orders.
+
+Recreates the benchmark database and bulk-loads it with core executemany
+inserts; on SQLite most of the load time goes to the product search index
+(about 80 µs per product). The same --seed always produces the same rows.
+Every user shares PASSWORD, so scenarios can sign in as anyone:
+
+    python -m benchmarks.dataset --products 1000000 --users 10000 --orders 100000
+
+Point DATABASE_URL at the database a local uvicorn serves to load it for
+benchmarks.scenarios --base-url.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+from benchmarks.common import Timer, reset_database
+from benchmarks.search import CATEGORIES, NOUNS, WORDS
+from app.auth.models import User, UserRole
+from app.auth.utils import hash_password
+from app.cart.models import Cart
+from app.core.database import engine
+from app.orders.models import Order, OrderItem
+from app.orders.snapshots import backfill_snapshots
+from app.products.facets import rebuild_facets
+from app.products.models import Product
+
+PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "admin@example.com"
+BATCH_ROWS = 50_000
+
+
+def user_email(number: int):
+    """Email of the n-th generated user, 1-based."""
+    return f"user{number}@example.com"
+
+
+def _insert(conn, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_ROWS:
+            conn.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+
+
+def _users(count, hashed):
+    yield {"id": 1, "name": "admin", "email": ADMIN_EMAIL, "hashed_password": hashed, "role": UserRole.admin}
+    for number in range(1, count + 1):
+        yield {"id": number + 1, "name": f"user{number}", "email": user_email(number),
+               "hashed_password": hashed, "role": UserRole.user}
+
+
+def _products(rng, count, prices):
+    for number in range(1, count + 1):
+        price = round(rng.uniform(1, 500), 2)
+        prices.append(price)
+        yield {
+            "id": number,
+            "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(NOUNS)} {number}",
+            "description": f"A {rng.choice(WORDS)} {rng.choice(NOUNS)} for everyday use",
+            "price": price,
+            "stock": rng.randint(100, 1000),
+            "category": rng.choice(CATEGORIES),
+            "image_url": None,
+        }
+
+
+def _carts(rng, users, products, carts, items):
+    for user_id in rng.sample(range(2, users + 2), min(carts, users)):
+        for product_id in rng.sample(range(1, products + 1), min(items, products)):
+            yield {"user_id": user_id, "product_id": product_id, "quantity": rng.randint(1, 3)}
+
+
+def _orders(rng, users, products, orders, prices, order_items):
+    now = datetime.now(timezone.utc)
+    for order_id in range(1, orders + 1):
+        lines = [
+            {"order_id": order_id, "product_id": product_id, "quantity": rng.randint(1, 3),
+             "price": prices[product_id - 1]}
+            for product_id in rng.sample(range(1, products + 1), min(rng.randint(1, 4), products))
+        ]
+        order_items.extend(lines)
+        yield {
+            "id": order_id,
+            "user_id": rng.randint(2, users + 1),
+            "total": round(sum(line["price"] * line["quantity"] for line in lines), 2),
+            "created_at": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+            "status": "Completed",
+        }
+
+
+def generate(users: int = 1_000, products: int = 100_000, carts: int = 500, cart_items: int = 3,
+             orders: int = 10_000, seed: int = 42):
+    """Recreate the database and load it; returns the row counts per table."""
+    rng = random.Random(seed)
+    reset_database()
+    prices = []
+    order_items = []
+    with engine.begin() as conn:
+        _insert(conn, User.__table__, _users(users, hash_password(PASSWORD)))
+        _insert(conn, Product.__table__, _products(rng, products, prices))
+        if products:
+            _insert(conn, Cart.__table__, _carts(rng, users, products, carts, cart_items))
+            _insert(conn, Order.__table__, _orders(rng, users, products, orders, prices, order_items))
+            _insert(conn, OrderItem.__table__, order_items)
+        # core inserts bypass the incremental facet upkeep and the checkout snapshots
+        rebuild_facets(conn)
+        backfill_snapshots(conn)
+    return {
+        "users": users + 1,
+        "products": products,
+        "cart_rows": min(carts, users) * min(cart_items, products) if products else 0,
+        "orders": orders if products else 0,
+        "order_items": len(order_items),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--carts", type=int, default=500, help="users with a non-empty cart")
+    parser.add_argument("--cart-items", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with Timer() as timer:
+        counts = generate(args.users, args.products, args.carts, args.cart_items, args.orders, args.seed)
+    print(" ".join(f"{table}={count}" for table, count in counts.items()) + f" loaded in {timer.elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
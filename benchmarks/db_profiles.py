@@ -0,0 +1,107 @@
+"""Concurrent cart writes and catalog reads under each SQLite profile.
+
+For every profile in SQLITE_PROFILES a fresh database file is created, then
+writer tasks run the add-to-cart read-modify-write while reader tasks page
+through the catalog, for a fixed duration. Reports throughput, p99 latency
+and "database is locked" failures per profile.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from benchmarks.common import percentile, remove_sqlite_files
+from app.core.database import Base, SQLITE_PROFILES, apply_sqlite_pragmas, to_async_url
+from app.cart.models import Cart
+from app.products.models import Product
+
+
+def create_database(url, pragmas, products):
+    engine = create_engine(url)
+    apply_sqlite_pragmas(engine, pragmas)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Product.__table__.insert(), [
+            {"name": f"product {i}", "description": "", "price": 1.0 + i % 500, "stock": 1_000_000, "category": "home"}
+            for i in range(products)
+        ])
+    engine.dispose()
+
+
+async def workload(url, pragmas, args):
+    engine = create_async_engine(to_async_url(url))
+    apply_sqlite_pragmas(engine.sync_engine, pragmas)
+    Session = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    stats = {"write": [], "read": [], "locked": 0}
+    deadline = time.perf_counter() + args.duration
+
+    async def add_to_cart(rng, user_id):
+        # Same read-modify-write as POST /cart/
+        async with Session() as db:
+            product_id = rng.randint(1, args.products)
+            await db.get(Product, product_id)
+            existing = await db.scalar(select(Cart).filter_by(user_id=user_id, product_id=product_id))
+            if existing:
+                existing.quantity += 1
+            else:
+                db.add(Cart(user_id=user_id, product_id=product_id, quantity=1))
+            await db.commit()
+
+    async def browse(rng, _):
+        async with Session() as db:
+            (await db.scalars(
+                select(Product).order_by(Product.price).offset(rng.randint(0, 50) * 10).limit(10)
+            )).all()
+
+    async def client(kind, action, seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await action(rng, seed)
+            except OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                stats["locked"] += 1
+                continue
+            stats[kind].append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(
+        *(client("write", add_to_cart, i) for i in range(args.writers)),
+        *(client("read", browse, args.writers + i) for i in range(args.readers)),
+    )
+    await engine.dispose()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--products", type=int, default=5_000)
+    args = parser.parse_args()
+
+    for profile in args.profiles:
+        path = os.path.join(tempfile.gettempdir(), f"python_cap_profile_{profile}.db")
+        remove_sqlite_files(path)
+        url = f"sqlite:///{path}"
+        pragmas = SQLITE_PROFILES[profile]
+        create_database(url, pragmas, args.products)
+        stats = asyncio.run(workload(url, pragmas, args))
+        remove_sqlite_files(path)
+        print(
+            f"{profile:10} writes/s={len(stats['write']) / args.duration:8.1f} "
+            f"write p99={percentile(stats['write'], 99):8.2f}ms  "
+            f"reads/s={len(stats['read']) / args.duration:8.1f} "
+            f"read p99={percentile(stats['read'], 99):8.2f}ms  locked={stats['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Password-reset email throughput: queued outbox delivery vs one SMTP session per message.
+
+Runs a local aiosmtpd server (pip install aiosmtpd), queues password resets
+through POST /auth/forgot-password, then drains the outbox with an
+OutboxWorker over pooled sessions. The baseline opens a fresh session for
+every message, as the old inline send did. Exits non-zero unless every queued
+message reaches the server exactly once.
+"""
+import argparse
+import asyncio
+import logging
+import smtplib
+import socket
+import sys
+from email.mime.text import MIMEText
+import httpx
+from aiosmtpd.controller import Controller
+from sqlalchemy import func, select
+from benchmarks.common import Timer, percentile, reset_database
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.auth.models import User, UserRole
+from app.main import app
+from app.outbox.delivery import OutboxWorker, SMTPConnectionPool
+from app.outbox.models import EmailOutbox
+
+EMAIL = "reset@example.com"
+
+logging.getLogger("mail.log").setLevel(logging.WARNING)
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def one_session_per_message(port, count):
+    with Timer() as timer:
+        for i in range(count):
+            message = MIMEText("baseline")
+            message["Subject"], message["From"], message["To"] = "Password Reset Request", "bench@example.com", EMAIL
+            with smtplib.SMTP("127.0.0.1", port) as server:
+                server.send_message(message)
+    return count / timer.elapsed
+
+
+async def enqueue(resets, concurrency):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    latencies, errors = [], 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(client):
+        nonlocal errors
+        async with gate:
+            with Timer() as timer:
+                response = await client.post("/auth/forgot-password", json={"email": EMAIL})
+            latencies.append(timer.elapsed * 1000)
+            errors += response.status_code != 200
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with Timer() as total:
+            await asyncio.gather(*(one(client) for _ in range(resets)))
+    return resets / total.elapsed, percentile(latencies, 50), percentile(latencies, 99), errors
+
+
+async def drain(worker):
+    with Timer() as timer:
+        while await worker.run_once():
+            pass
+    await asyncio.to_thread(worker.pool.close)
+    async with AsyncSessionLocal() as db:
+        pending = await db.scalar(select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status != "sent"))
+    return timer.elapsed, pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resets", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--baseline", type=int, default=500, help="messages sent one session each")
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        db.add(User(name="reset", email=EMAIL, hashed_password="x", role=UserRole.user))
+        db.commit()
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        baseline = one_session_per_message(controller.port, args.baseline)
+        handler.received = 0
+
+        pool = SMTPConnectionPool("127.0.0.1", controller.port, username="", password="",
+                                  sender="bench@example.com", starttls=False, size=args.connections)
+        worker = OutboxWorker(pool, batch_size=args.batch_size)
+
+        async def run():
+            enqueued = await enqueue(args.resets, args.concurrency)
+            return enqueued, await drain(worker)
+
+        (rps, p50, p99, errors), (elapsed, pending) = asyncio.run(run())
+    finally:
+        controller.stop()
+
+    print(f"enqueue:  {rps:8.1f} requests/s  p50={p50:.2f}ms p99={p99:.2f}ms errors={errors}")
+    print(f"baseline: {baseline:8.1f} messages/s  (new SMTP session per message)")
+    print(f"outbox:   {args.resets / elapsed:8.1f} messages/s  ({args.connections} pooled sessions, "
+          f"batches of {args.batch_size})")
+    print(f"received={handler.received} not_sent={pending}")
+    sys.exit(0 if handler.received == args.resets and not pending and not errors else 1)
+
+
+if __name__ == "__main__":
+    main()
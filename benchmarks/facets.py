@@ -0,0 +1,109 @@
+"""Catalog facets: the category_facets summary table vs GROUP BY over products.
+
+Loads a catalog with benchmarks.dataset and times both reads. Then it sends a
+mix of writes through the app: admin creates, updates and deletes, a bulk
+import, and a cart plus checkout that sells a product out. After that it
+checks that the summary table still matches the aggregate. Exits non-zero on
+any mismatch.
+
+    python -m benchmarks.facets --products 200000
+"""
+import argparse
+import asyncio
+import sys
+import httpx
+from benchmarks.common import Timer, percentile
+from benchmarks.dataset import ADMIN_EMAIL, generate
+from app.auth.utils import create_access_token
+from app.core.database import AsyncSessionLocal, async_engine
+from app.main import app
+from app.products.facets import aggregate_facets, get_facets
+
+
+async def aggregated(db):
+    return [
+        {"category": category, "product_count": count, "in_stock_count": in_stock,
+         "min_price": low, "max_price": high}
+        for category, count, in_stock, low, high in await db.execute(aggregate_facets().order_by("category"))
+    ]
+
+
+async def measure(fn, iterations):
+    samples = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(iterations):
+            with Timer() as timer:
+                await fn(db)
+            samples.append(timer.elapsed * 1000)
+    return percentile(samples, 50), percentile(samples, 95)
+
+
+async def write_mix(http, admin, buyer):
+    async def call(method, url, **kwargs):
+        response = await http.request(method, url, **kwargs)
+        assert response.status_code == 200, (method, url, response.status_code, response.text)
+        return response.json()
+
+    product = {"name": "Facet lamp", "description": "", "price": 0.5, "stock": 1, "category": "lighting",
+               "image_url": None}
+    lamp = (await call("POST", "/admin/products", json=product, headers=admin))["data"]["id"]
+    cheap = (await call("POST", "/admin/products", json={**product, "category": "home", "price": 0.01},
+                        headers=admin))["data"]["id"]
+    await call("PUT", "/admin/products/1", json={"price": 9999.0, "category": "lighting"}, headers=admin)
+    await call("PUT", f"/admin/products/{cheap}", json={"price": 750.0}, headers=admin)
+    await call("DELETE", "/admin/products/2", headers=admin)
+    # a category's only product goes, and so must the category
+    gone = (await call("POST", "/admin/products", json={**product, "category": "clearance"}, headers=admin))
+    await call("DELETE", f"/admin/products/{gone['data']['id']}", headers=admin)
+    await call("PUT", "/admin/products/3", json={"name": "Sold out", "stock": 0}, headers=admin)
+    feed = b'{"id": 4, "name": "Imported", "description": null, "price": 0.02, "stock": 0, ' \
+           b'"category": "outdoor", "image_url": null}\n' \
+           b'{"name": "New import", "description": null, "price": 3.0, "stock": 5, "category": "office", ' \
+           b'"image_url": null}\n'
+    await call("POST", "/admin/products/import?format=ndjson", content=feed, headers=admin)
+    # the last unit goes into a cart, then through checkout
+    await call("POST", "/cart/", json={"product_id": lamp, "quantity": 1}, headers=buyer)
+    await call("POST", "/orders/checkout", headers=buyer)
+
+
+async def run(args):
+    print(f"{'read':10} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, fn in (("group_by", aggregated), ("summary", get_facets)):
+        p50, p95 = await measure(fn, args.iterations)
+        print(f"{name:10} {p50:9.3f} {p95:9.3f}")
+
+    admin = {"Authorization": "Bearer " + create_access_token(data={"id": 1, "email": ADMIN_EMAIL, "role": "admin"})}
+    buyer = {"Authorization": "Bearer " + create_access_token(data={"id": 2, "email": "user1@example.com",
+                                                                    "role": "user"})}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        await write_mix(http, admin, buyer)
+
+    async with AsyncSessionLocal() as db:
+        expected, actual = await aggregated(db), await get_facets(db)
+    await async_engine.dispose()
+    for row in expected:
+        if row not in actual:
+            print(f"FAIL: expected {row}")
+    for row in actual:
+        if row not in expected:
+            print(f"FAIL: summary has {row}")
+    return expected == actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    with Timer() as timer:
+        generate(users=10, products=args.products, carts=0, orders=0)
+    print(f"loaded {args.products} products in {timer.elapsed:.1f}s")
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+    print("PASS: summary table matches the aggregate after the write mix")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Hot-SKU contention: many buyers add one product to their cart, then check out.
+
+Runs twice against the in-process app. The "legacy" phase seeds every cart
+directly, without reservations, as carts were filled before the inventory
+subsystem, so stock is only taken at checkout and buyers who lose the race
+find out late. The "reserve" phase goes through POST /cart/, which takes the
+units at add-to-cart time: buyers are turned away at the cart while stock
+lasts, and checkout never fails for lack of it.
+
+Exits non-zero if more units were sold than were in stock, or if any
+reservation is left behind.
+"""
+import argparse
+import asyncio
+import sys
+import httpx
+from sqlalchemy import func
+from benchmarks.common import Timer, reset_database
+from app.auth.models import User, UserRole
+from app.auth.utils import create_access_token
+from app.cart.models import Cart
+from app.core.database import SessionLocal, async_engine, engine
+from app.inventory import utils as inventory
+from app.inventory.models import StockReservation
+from app.main import app
+from app.orders.models import OrderItem
+from app.products.models import Product
+
+
+def seed(buyers: int, stock: int, quantity: int, legacy_carts: bool):
+    reset_database()
+    with SessionLocal() as db:
+        product = Product(name="Hot item", description="Flash sale", price=9.99, stock=stock, category="sale")
+        users = [User(name=f"buyer{i}", email=f"buyer{i}@example.com", hashed_password="x", role=UserRole.user)
+                 for i in range(buyers)]
+        db.add_all([product, *users])
+        db.flush()
+        if legacy_carts:
+            db.add_all(Cart(user_id=user.id, product_id=product.id, quantity=quantity) for user in users)
+        db.commit()
+        tokens = [create_access_token(data={"id": user.id, "email": user.email, "role": "user"}) for user in users]
+        product_id = product.id
+    engine.dispose()
+    return product_id, tokens
+
+
+async def buy(http, gate, token, product_id, quantity, add_to_cart):
+    headers = {"Authorization": "Bearer " + token}
+    async with gate:
+        if add_to_cart:
+            response = await http.post("/cart/", json={"product_id": product_id, "quantity": quantity}, headers=headers)
+            if response.status_code == 400:
+                return "rejected_at_cart"
+            if response.status_code != 200:
+                return f"cart_{response.status_code}"
+        response = await http.post("/orders/checkout", headers=headers)
+    if response.status_code == 200:
+        return "ok"
+    return "failed_at_checkout" if response.status_code == 400 else f"checkout_{response.status_code}"
+
+
+async def run_buyers(tokens, product_id, quantity, workers, add_to_cart):
+    gate = asyncio.Semaphore(workers)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+        outcomes = await asyncio.gather(*(buy(http, gate, token, product_id, quantity, add_to_cart) for token in tokens))
+    # the next phase recreates the database file; pooled connections must not outlive this one
+    await async_engine.dispose()
+    return outcomes
+
+
+def phase(name, args):
+    legacy = name == "legacy"
+    product_id, tokens = seed(args.buyers, args.stock, args.quantity, legacy_carts=legacy)
+    inventory.conflicts.clear()
+    with Timer() as timer:
+        outcomes = asyncio.run(run_buyers(tokens, product_id, args.quantity, args.workers, add_to_cart=not legacy))
+
+    with SessionLocal() as db:
+        final_stock = db.query(Product.stock).filter(Product.id == product_id).scalar()
+        sold = db.query(func.coalesce(func.sum(OrderItem.quantity), 0)).scalar()
+        held = db.query(func.count(StockReservation.id)).scalar()
+    engine.dispose()
+
+    counts = {outcome: outcomes.count(outcome) for outcome in sorted(set(outcomes))}
+    print(f"{name:7} " + " ".join(f"{outcome}={count}" for outcome, count in counts.items()))
+    print(f"{'':7} units_sold={sold} final_stock={final_stock} reservations_left={held} "
+          f"conflicts={dict(inventory.conflicts)} elapsed={timer.elapsed:.2f}s")
+
+    ok = sold + final_stock == args.stock and final_stock >= 0 and held == 0
+    ok = ok and sold == counts.get("ok", 0) * args.quantity
+    if not ok:
+        print(f"FAIL: {name} inventory is inconsistent (oversold, lost updates or leaked reservations)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=500, help="buyers in flight at once")
+    args = parser.parse_args()
+
+    print(f"buyers={args.buyers} stock={args.stock} quantity={args.quantity} workers={args.workers}")
+    results = [phase(name, args) for name in ("legacy", "reserve")]
+    if not all(results):
+        sys.exit(1)
+    print("PASS: no overselling, no leaked reservations")
+
+
+if __name__ == "__main__":
+    main()
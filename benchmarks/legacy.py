@@ -0,0 +1,53 @@
+"""The pre-async request model, kept as a benchmark baseline.
+
+Sync def handlers with a sync Session run in Starlette's threadpool, and
+signin runs bcrypt inline, as the routes did before the async port.
+
+With a bounded pool this model deadlocks once concurrency exceeds the pool
+size: every worker thread waits for a connection while the session cleanup
+that would free one waits for a thread. The baseline therefore uses an
+unbounded NullPool engine, its best case.
+"""
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from app.core.database import SQLALCHEMY_DATABASE_URL
+from app.auth.models import User
+from app.auth.schemas import LoginSchema
+from app.auth.utils import create_access_token, verify_password
+from app.products.models import Product
+from app.products.schemas import ProductResponse
+
+legacy_engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+LegacySession = sessionmaker(bind=legacy_engine, autocommit=False, autoflush=False)
+legacy_app = FastAPI()
+
+
+def get_sync_db():
+    db = LegacySession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@legacy_app.get("/products", response_model=list[ProductResponse])
+def legacy_products(category: str = None, page: int = 1, page_size: int = 10, db: Session = Depends(get_sync_db)):
+    query = db.query(Product)
+    if category:
+        query = query.filter(Product.category == category)
+    return query.order_by(Product.price).offset((page - 1) * page_size).limit(page_size).all()
+
+
+@legacy_app.get("/products/{product_id}", response_model=ProductResponse)
+def legacy_product_detail(product_id: int, db: Session = Depends(get_sync_db)):
+    return db.get(Product, product_id)
+
+
+@legacy_app.post("/auth/signin")
+def legacy_signin(payload: LoginSchema, db: Session = Depends(get_sync_db)):
+    user = db.query(User).filter(User.email == payload.email).first()
+    if not user or not verify_password(payload.password, user.hashed_password):
+        raise HTTPException(status_code=400, detail="Incorrect password")
+    return {"access_token": create_access_token(data={"id": user.id, "email": user.email, "role": user.role.value})}
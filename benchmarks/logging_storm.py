@@ -0,0 +1,100 @@
+"""Logging cost on the request path during an error storm.
+
+Emits --records warnings from inside an event loop, as the 4xx handlers do
+under a bot flood, through the old setup (logging.basicConfig with a
+FileHandler and a StreamHandler, formatting and writing on the calling thread)
+and through the queue pipeline (JSON lines, sampling, writes on a listener
+thread). Runs once with one repeated message and once with every message
+distinct, which defeats sampling. Reports per-call latency on the calling
+thread, the time until everything is on disk, and the lines written.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+from benchmarks.common import Timer, percentile
+from app.core.logs import JSONFormatter, queue_pipeline
+
+LOGGER = "bench.storm"
+
+
+def old_setup(path, console):
+    file_handler = logging.FileHandler(path)
+    handlers = [file_handler, logging.StreamHandler(console)]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    return handlers, None
+
+
+def new_setup(path, console, args):
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=args.max_bytes, backupCount=1)
+    handlers = [file_handler, logging.StreamHandler(console)]
+    for handler in handlers:
+        handler.setFormatter(JSONFormatter())
+    queue_handler, listener = queue_pipeline(handlers, args.queue_size, args.burst, args.window)
+    listener.start()
+    return [queue_handler], listener
+
+
+async def storm(logger, records, distinct):
+    latencies = []
+    for i in range(records):
+        path = f"/products/{i}" if distinct else "/auth/signin"
+        with Timer() as timer:
+            if distinct:
+                logger.warning("ValidationError on %s: %s", path, "field required")
+            else:
+                logger.warning("ValidationError", extra={"path": path, "errors": ["field required"]})
+        latencies.append(timer.elapsed * 1e6)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    return latencies
+
+
+def run(name, args, distinct):
+    directory = tempfile.mkdtemp(prefix="python_cap_logs_")
+    path = os.path.join(directory, "logs.txt")
+    logger = logging.getLogger(LOGGER)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    with open(os.devnull, "w") as console:
+        handlers, listener = old_setup(path, console) if name == "old" else new_setup(path, console, args)
+        for handler in handlers:
+            logger.addHandler(handler)
+        with Timer() as total:
+            latencies = asyncio.run(storm(logger, args.records, distinct))
+            if listener is not None:
+                listener.stop()
+        for handler in handlers + (list(listener.handlers) if listener else []):
+            handler.close()
+            logger.removeHandler(handler)
+
+    lines = 0
+    for file_name in os.listdir(directory):
+        with open(os.path.join(directory, file_name), "rb") as log_file:
+            lines += sum(1 for _ in log_file)
+        os.remove(os.path.join(directory, file_name))
+    os.rmdir(directory)
+    return sum(latencies) / len(latencies), percentile(latencies, 99), total.elapsed, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--window", type=float, default=10.0)
+    parser.add_argument("--max-bytes", type=int, default=10 * 1024 * 1024)
+    args = parser.parse_args()
+
+    for distinct in (False, True):
+        print("distinct messages:" if distinct else "one repeated message:")
+        for name in ("old", "new"):
+            mean, p99, elapsed, lines = run(name, args, distinct)
+            print(f"  {name}: {mean:6.2f} us/call mean  p99={p99:6.2f} us  "
+                  f"drained in {elapsed:5.2f}s  lines on disk={lines}")
+
+
+if __name__ == "__main__":
+    main()
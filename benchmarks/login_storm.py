@@ -0,0 +1,80 @@
+"""Catalog latency during a login storm.
+
+Steady catalog traffic runs alongside a flood of concurrent signins (bcrypt).
+Compares the old model (benchmarks/legacy.py, bcrypt inline in the shared
+threadpool) with the current app, where bcrypt runs on the bounded process
+pool and excess logins are shed with 503.
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.common import Timer, percentile, reset_database
+from benchmarks.legacy import legacy_app
+from benchmarks.search import load_catalog
+from app.core.database import SessionLocal
+from app.auth.models import User, UserRole
+from app.auth.utils import hash_password
+from app.main import app
+
+EMAIL, PASSWORD = "storm@example.com", "correct-horse"
+
+
+async def run(target, duration, catalog_clients, storm_clients):
+    transport = httpx.ASGITransport(app=target, raise_app_exceptions=False)
+    latencies, signins = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def browse(client, n):
+        while time.perf_counter() < deadline:
+            with Timer() as timer:
+                await client.get(f"/products?category=home&sort_by=price&page={n % 20 + 1}")
+            latencies.append(timer.elapsed * 1000)
+            n += catalog_clients
+
+    async def login(client):
+        while time.perf_counter() < deadline:
+            response = await client.post("/auth/signin", json={"email": EMAIL, "password": PASSWORD})
+            signins[response.status_code] = signins.get(response.status_code, 0) + 1
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # warm-up: starts the hashing pool so spawn cost is not measured
+        await client.post("/auth/signin", json={"email": EMAIL, "password": PASSWORD})
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(browse(client, i) for i in range(catalog_clients)),
+            *(login(client) for _ in range(storm_clients)),
+        )
+    return percentile(latencies, 50), percentile(latencies, 99), len(latencies) / duration, signins
+
+
+async def compare(duration, catalog_clients, storm_clients):
+    for label, target, storm in (
+        ("async, no storm", app, 0),
+        ("legacy, storm", legacy_app, storm_clients),
+        ("async, storm", app, storm_clients),
+    ):
+        p50, p99, rps, signins = await run(target, duration, catalog_clients, storm)
+        print(f"{label:16} catalog p50={p50:7.2f}ms p99={p99:8.2f}ms rps={rps:7.1f} signins={signins}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--catalog-clients", type=int, default=20)
+    parser.add_argument("--storm-clients", type=int, default=200)
+    args = parser.parse_args()
+
+    reset_database()
+    load_catalog(args.rows)
+    db = SessionLocal()
+    db.add(User(name="storm", email=EMAIL, hashed_password=hash_password(PASSWORD), role=UserRole.user))
+    db.commit()
+    db.close()
+
+    asyncio.run(compare(args.duration, args.catalog_clients, args.storm_clients))
+
+
+if __name__ == "__main__":
+    main()
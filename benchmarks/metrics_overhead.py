@@ -0,0 +1,95 @@
+"""Per-request cost of MetricsMiddleware and the SQL statement hooks.
+
+Times a trivial ASGI app with and without the middleware, and SELECT 1 on an
+in-memory SQLite engine with and without instrument_engine, then reports the
+overhead of a request that runs --queries statements. Exits non-zero if it
+exceeds --budget microseconds. The statement hooks are timed on a sync engine:
+async engines run the same hooks, but aiosqlite's thread hop adds enough
+jitter to drown a few microseconds.
+"""
+import argparse
+import asyncio
+import sys
+from sqlalchemy import create_engine, text
+from benchmarks.common import Timer
+from app.core.metrics import Metrics, MetricsMiddleware, RequestStats, _current_request, instrument_engine
+
+SCOPE = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+
+
+async def plain_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def time_requests(app, requests):
+    with Timer() as timer:
+        for _ in range(requests):
+            await app(dict(SCOPE), receive, send)
+    return timer.elapsed / requests
+
+
+def time_queries(instrumented, statements):
+    engine = create_engine("sqlite://")
+    if instrumented:
+        instrument_engine(engine)
+    statement = text("SELECT 1")
+    token = _current_request.set(RequestStats())
+    try:
+        with engine.connect() as conn:
+            conn.execute(statement)
+            with Timer() as timer:
+                for _ in range(statements):
+                    conn.execute(statement)
+    finally:
+        _current_request.reset(token)
+        engine.dispose()
+    return timer.elapsed / statements
+
+
+async def run(args):
+    wrapped = MetricsMiddleware(plain_app, registry=Metrics())
+    # alternate runs so drift in CPU speed hits both sides equally
+    plain, measured = [], []
+    for _ in range(args.rounds):
+        plain.append(await time_requests(plain_app, args.requests))
+        measured.append(await time_requests(wrapped, args.requests))
+    request_cost = min(measured) - min(plain)
+
+    bare, hooked = [], []
+    for _ in range(args.rounds):
+        bare.append(time_queries(False, args.statements))
+        hooked.append(time_queries(True, args.statements))
+    query_cost = max(0.0, min(hooked) - min(bare))
+    return request_cost, query_cost, min(bare)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--statements", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--queries", type=int, default=2,
+                        help="statements per request in the total (catalog reads run 2)")
+    parser.add_argument("--budget", type=float, default=50.0, help="allowed overhead per request, in microseconds")
+    args = parser.parse_args()
+
+    request_cost, query_cost, query_time = asyncio.run(run(args))
+    total = request_cost + args.queries * query_cost
+    print(f"middleware:     {request_cost * 1e6:6.2f} us per request")
+    print(f"statement hook: {query_cost * 1e6:6.2f} us per statement (SELECT 1 takes {query_time * 1e6:.1f} us)")
+    print(f"total:          {total * 1e6:6.2f} us per request with {args.queries} statements "
+          f"(budget {args.budget:.0f} us)")
+    sys.exit(0 if total * 1e6 <= args.budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Order detail: checkout snapshots on order_items vs joining the live catalog.
+
+Seeds --orders orders of --lines lines each for one user, leaves the
+snapshots to the backfill (as the migration would for existing rows), then
+times reading random orders both ways. "catalog" is the route before
+snapshots: load the order, selectinload its items and join each item's
+product for the name. "snapshot" is GET /orders/{id}'s read. Both report
+p50/p95 and SQL statements per read. Finally one product is deleted and the
+orders holding it are read through the route. Exits non-zero if the two
+reads disagree or an order with a deleted product no longer reads back.
+
+    python -m benchmarks.order_detail --orders 20000 --lines 20
+"""
+import argparse
+import asyncio
+import random
+import sys
+import httpx
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import selectinload
+from benchmarks.common import Timer, percentile, reset_database
+from app.auth.models import User, UserRole
+from app.auth.utils import create_access_token
+from app.core.database import AsyncSessionLocal, async_engine, engine
+from app.core.query_counter import count_queries
+from app.main import app
+from app.orders.history import get_order_detail
+from app.orders.models import Order, OrderItem
+from app.orders.snapshots import backfill_snapshots
+from app.products.models import Product
+
+PRODUCTS = 5_000
+SEED_BATCH = 5_000
+
+
+def seed(orders: int, lines: int):
+    reset_database()
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"name": "detail", "email": "detail@example.com", "hashed_password": "x",
+                                     "role": UserRole.user}])
+        conn.execute(insert(Product), [{"name": f"part {i}", "description": "", "price": 1.0 + i % 100, "stock": 0,
+                                        "category": f"category {i % 20}"} for i in range(PRODUCTS)])
+        for first in range(1, orders + 1, SEED_BATCH):
+            ids = range(first, min(first + SEED_BATCH, orders + 1))
+            conn.execute(insert(Order), [{"id": i, "user_id": 1, "total": 0.0, "status": "Completed"} for i in ids])
+            conn.execute(insert(OrderItem), [
+                {"order_id": i, "product_id": product_id, "quantity": 1, "price": 1.0}
+                for i in ids for product_id in rng.sample(range(1, PRODUCTS + 1), lines)
+            ])
+    with Timer() as timer, engine.begin() as conn:
+        updated = backfill_snapshots(conn)
+    engine.dispose()
+    print(f"backfilled {updated} rows in {timer.elapsed:.1f}s")
+    return {"Authorization": "Bearer " + create_access_token(data={"id": 1, "email": "detail@example.com",
+                                                                     "role": "user"})}
+
+
+async def catalog_detail(db, user_id, order_id):
+    order = await db.scalar(
+        select(Order)
+        .options(selectinload(Order.items).joinedload(OrderItem.product))
+        .filter_by(id=order_id, user_id=user_id)
+    )
+    return [(item.product_id, item.product.name, item.product.category) for item in order.items]
+
+
+async def snapshot_detail(db, user_id, order_id):
+    order = await get_order_detail(db, user_id, order_id)
+    return [(item["product_id"], item["product_name"], item["product_category"]) for item in order["items"]]
+
+
+async def measure(read, order_ids):
+    samples, results = [], {}
+    with count_queries(async_engine.sync_engine) as counter:
+        for order_id in order_ids:
+            # a session per read, as a request gets
+            async with AsyncSessionLocal() as db:
+                with Timer() as timer:
+                    results[order_id] = await read(db, 1, order_id)
+            samples.append(timer.elapsed * 1000)
+    return samples, results, counter.count / len(order_ids)
+
+
+async def run(args, headers):
+    order_ids = random.Random(7).sample(range(1, args.orders + 1), min(args.reads, args.orders))
+    ok = True
+    outcomes = {}
+    for name, read in (("catalog", catalog_detail), ("snapshot", snapshot_detail)):
+        samples, outcomes[name], queries = await measure(read, order_ids)
+        print(f"{name:9} p50={percentile(samples, 50):7.2f}ms p95={percentile(samples, 95):7.2f}ms "
+              f"queries/read={queries:.0f}")
+    catalog, snapshot = ({order_id: sorted(lines) for order_id, lines in outcomes[name].items()}
+                         for name in ("catalog", "snapshot"))
+    if catalog != snapshot:
+        print("FAIL: snapshots differ from the catalog")
+        ok = False
+
+    victim = outcomes["snapshot"][order_ids[0]][0][0]
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Product).where(Product.id == victim))
+        await db.commit()
+        holders = (await db.scalars(select(OrderItem.order_id).where(OrderItem.product_id == victim))).all()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for order_id in holders:
+            response = await http.get(f"/orders/{order_id}", headers=headers)
+            names = {item["product_id"]: item["product_name"] for item in response.json()["items"]} \
+                if response.status_code == 200 else {}
+            if names.get(victim) != f"part {victim - 1}":
+                print(f"FAIL: order {order_id} does not read back after product {victim} was deleted")
+                ok = False
+    print(f"product {victim} deleted: {len(holders)} orders holding it still read back")
+    await async_engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--lines", type=int, default=20, help="order lines per order")
+    parser.add_argument("--reads", type=int, default=500, help="orders read each way")
+    args = parser.parse_args()
+
+    headers = seed(args.orders, args.lines)
+    if not asyncio.run(run(args, headers)):
+        sys.exit(1)
+    print("PASS: snapshot reads match the catalog and survive product deletion")
+
+
+if __name__ == "__main__":
+    main()
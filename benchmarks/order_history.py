@@ -0,0 +1,175 @@
+"""Order history for a wholesale account: keyset pages and the streaming export.
+
+Seeds one user with --orders orders (100k by default) of --lines lines each,
+then streams GET /orders/export in both formats while recording peak RSS.
+After that it loads the whole history with the old unbounded .all() query,
+which can only raise the peak. ru_maxrss never goes down, so the streaming
+figures come first. It also times the first and the last page of GET /orders/
+and walks every page. Exits non-zero if a page walk or an export loses,
+repeats or misorders an order.
+
+    python -m benchmarks.order_history --orders 100000
+"""
+import argparse
+import asyncio
+import resource
+import sys
+from datetime import datetime, timedelta
+import httpx
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from benchmarks.common import Timer, percentile, reset_database
+from app.auth.models import User, UserRole
+from app.auth.utils import create_access_token
+from app.core.database import AsyncSessionLocal, async_engine, engine
+from app.main import app
+from app.orders.models import Order, OrderItem
+from app.orders.schemas import OrderResponse
+from app.products.models import Product
+
+PRODUCTS = 50
+SEED_BATCH = 10_000
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(orders: int, lines: int):
+    reset_database()
+    start = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"name": "wholesale", "email": "wholesale@example.com", "hashed_password": "x",
+                                     "role": UserRole.user}])
+        conn.execute(insert(Product), [{"name": f"pallet {i}", "description": "", "price": 10.0 + i, "stock": 0,
+                                        "category": "wholesale"} for i in range(PRODUCTS)])
+        for first in range(1, orders + 1, SEED_BATCH):
+            ids = range(first, min(first + SEED_BATCH, orders + 1))
+            # pairs of orders share a timestamp, so ties on created_at are covered
+            conn.execute(insert(Order), [{"id": i, "user_id": 1, "total": 10.0 * lines, "status": "Completed",
+                                          "item_count": lines * (lines + 1) // 2,
+                                          "created_at": start + timedelta(minutes=i // 2)} for i in ids])
+            conn.execute(insert(OrderItem), [{"order_id": i, "product_id": (i + n) % PRODUCTS + 1, "quantity": n + 1,
+                                              "price": 10.0, "product_name": f"pallet {(i + n) % PRODUCTS}",
+                                              "product_category": "wholesale"} for i in ids for n in range(lines)])
+    engine.dispose()
+    return {"Authorization": "Bearer " + create_access_token(
+        data={"id": 1, "email": "wholesale@example.com", "role": "user"})}
+
+
+async def stream_export(headers, format):
+    # Drive the ASGI app directly: httpx's ASGI transport buffers whole
+    # response bodies, which would hide whether the export streams.
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/orders/export", "raw_path": b"/orders/export",
+        "query_string": f"format={format}".encode(), "root_path": "", "server": ("bench", 80),
+        "client": ("bench", 1), "headers": [(b"authorization", headers["Authorization"].encode())],
+    }
+    status = None
+    requested = False
+    pending = b""
+    order_ids = []
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # the client never disconnects
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, pending
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            *complete, pending = (pending + message.get("body", b"")).split(b"\n")
+            for line in complete:
+                if format == "ndjson":
+                    order_ids.append(orjson.loads(line)["id"])
+                elif not line.startswith(b"order_id,"):
+                    order_id = int(line.split(b",", 1)[0])
+                    if not order_ids or order_ids[-1] != order_id:
+                        order_ids.append(order_id)
+
+    await app(scope, receive, send)
+    return status, order_ids
+
+
+async def legacy_history(user_id):
+    # the route before pagination: every order at once, validated into models
+    async with AsyncSessionLocal() as db:
+        orders = (await db.scalars(
+            select(Order).filter_by(user_id=user_id).order_by(Order.created_at.desc())
+        )).all()
+        return len(TypeAdapter(list[OrderResponse]).validate_python(orders, from_attributes=True))
+
+
+async def walk_pages(http, headers, page_size):
+    order_ids, cursor, first_ms, last_ms = [], None, 0.0, 0.0
+    while True:
+        params = {"page_size": page_size, **({"cursor": cursor} if cursor else {})}
+        with Timer() as timer:
+            response = await http.get("/orders/", params=params, headers=headers)
+        response.raise_for_status()
+        data = response.json()["data"]
+        order_ids += [order["id"] for order in data["items"]]
+        first_ms, last_ms = first_ms or timer.elapsed * 1000, timer.elapsed * 1000
+        cursor = data["next_cursor"]
+        if not cursor:
+            return order_ids, first_ms, last_ms
+
+
+async def run(args, headers):
+    expected = sorted(range(1, args.orders + 1), key=lambda i: (i // 2, i), reverse=True)
+    ok = True
+
+    print(f"{'export':8} {'seconds':>8} {'orders/s':>10} {'peak RSS MB':>12}")
+    for format in ("ndjson", "csv"):
+        with Timer() as timer:
+            status, order_ids = await stream_export(headers, format)
+        print(f"{format:8} {timer.elapsed:8.2f} {len(order_ids) / timer.elapsed:10.0f} {peak_rss_mb():12.0f}")
+        if status != 200 or order_ids != expected:
+            print(f"FAIL: {format} export returned {len(order_ids)} orders, status {status}")
+            ok = False
+
+    with Timer() as timer:
+        loaded = await legacy_history(1)
+    print(f"{'all()':8} {timer.elapsed:8.2f} {loaded / timer.elapsed:10.0f} {peak_rss_mb():12.0f}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        firsts, lasts = [], []
+        for _ in range(args.walks):
+            order_ids, first_ms, last_ms = await walk_pages(http, headers, args.page_size)
+            firsts.append(first_ms)
+            lasts.append(last_ms)
+            if order_ids != expected:
+                print(f"FAIL: the page walk returned {len(order_ids)} orders")
+                ok = False
+    print(f"pages of {args.page_size}: first p50={percentile(firsts, 50):.2f}ms "
+          f"last p50={percentile(lasts, 50):.2f}ms")
+    await async_engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=3, help="order lines per order")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--walks", type=int, default=3, help="full walks through every page")
+    args = parser.parse_args()
+
+    with Timer() as timer:
+        headers = seed(args.orders, args.lines)
+    print(f"seeded {args.orders} orders of {args.lines} lines in {timer.elapsed:.1f}s, "
+          f"peak RSS {peak_rss_mb():.0f} MB")
+    if not asyncio.run(run(args, headers)):
+        sys.exit(1)
+    print("PASS: pages and exports return every order once, newest first")
+
+
+if __name__ == "__main__":
+    main()
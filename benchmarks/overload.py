@@ -0,0 +1,147 @@
+"""Checkout latency while /auth/signin is flooded, with and without admission control.
+
+Buyers, each from their own address, add an item and check out, pausing
+--think seconds between rounds. Meanwhile wrong-password signins arrive at
+--flood-rate per second from --attacker-ips addresses, open loop, whether or
+not earlier ones were answered, as they would from a credential-stuffing
+botnet. The app is built once with ADMISSION_CONTROL off and once with it
+on, using the limits from Settings. Checkout p50/p99 is reported next to a
+run with no flood, and signin outcomes are counted by status. Exits non-zero
+if a checkout fails or if, with admission control, checkout p99 under the
+flood exceeds --max-slowdown times the p99 without a flood.
+
+    python -m benchmarks.overload --duration 10 --flood-rate 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+import httpx
+from benchmarks.common import Timer, percentile, reset_database
+from app.auth.models import User, UserRole
+from app.auth.utils import create_access_token, hash_password
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.database import SessionLocal, async_engine
+from app.main import create_app
+from app.products.models import Product
+
+VICTIM, PASSWORD = "victim@example.com", "correct-horse"
+
+
+def seed(buyers):
+    reset_database()
+    with SessionLocal() as db:
+        db.add(Product(name="Overload widget", description="", price=1.0, stock=10_000_000, category="home"))
+        db.add(User(name="victim", email=VICTIM, hashed_password=hash_password(PASSWORD), role=UserRole.user))
+        accounts = [User(name=f"buyer{i}", email=f"buyer{i}@example.com", hashed_password="x", role=UserRole.user)
+                    for i in range(buyers)]
+        db.add_all(accounts)
+        db.commit()
+        return [{"Authorization": "Bearer " + create_access_token(data={"id": user.id, "email": user.email,
+                                                                          "role": "user"})} for user in accounts]
+
+
+def build(admission_control: bool):
+    settings.ADMISSION_CONTROL = admission_control
+    return create_app()
+
+
+def client_for(app, address):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False, client=(address, 50000))
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+
+
+def count(counter, status):
+    counter[status] = counter.get(status, 0) + 1
+
+
+async def run(app, buyers, args, flood_rate):
+    latencies, checkouts, carts, signins = [], {}, {}, {}
+    deadline = time.perf_counter() + args.duration
+
+    async def buy(headers, address):
+        async with client_for(app, address) as client:
+            while time.perf_counter() < deadline:
+                await asyncio.sleep(args.think)
+                added = await client.post("/cart/", json={"product_id": 1, "quantity": 1}, headers=headers)
+                count(carts, added.status_code)
+                if added.status_code != 200:
+                    continue
+                with Timer() as timer:
+                    response = await client.post("/orders/checkout", headers=headers)
+                latencies.append(timer.elapsed * 1000)
+                count(checkouts, response.status_code)
+
+    async def guess(client, n):
+        response = await client.post("/auth/signin", json={"email": VICTIM, "password": f"guess{n}"})
+        count(signins, response.status_code)
+
+    async def flood():
+        clients = [client_for(app, f"203.0.113.{n + 1}") for n in range(args.attacker_ips)]
+        pending, sent, started = set(), 0, time.perf_counter()
+        while time.perf_counter() < deadline:
+            due = int((time.perf_counter() - started) * flood_rate)
+            while sent < due:
+                task = asyncio.create_task(guess(clients[sent % len(clients)], sent))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                sent += 1
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*pending)
+        for client in clients:
+            await client.aclose()
+
+    await asyncio.gather(
+        *(buy(headers, f"198.51.100.{i + 1}") for i, headers in enumerate(buyers)),
+        *([flood()] if flood_rate else []),
+    )
+    await async_engine.dispose()
+    return latencies, checkouts, carts, signins
+
+
+async def compare(args, buyers):
+    plain, guarded = build(False), build(True)
+    # warm-up: starts the hashing pool so spawn cost is not measured
+    async with client_for(plain, "192.0.2.1") as client:
+        await client.post("/auth/signin", json={"email": VICTIM, "password": PASSWORD})
+
+    results = {}
+    for label, app, flood_rate in (
+        ("no flood", plain, 0),
+        ("flood", plain, args.flood_rate),
+        ("flood+admission", guarded, args.flood_rate),
+    ):
+        admission.reset()
+        latencies, checkouts, carts, signins = await run(app, buyers, args, flood_rate)
+        results[label] = latencies, checkouts
+        print(f"{label:16} checkout p50={percentile(latencies, 50):8.2f}ms p99={percentile(latencies, 99):8.2f}ms "
+              f"n={len(latencies):5} carts={carts} signins={dict(sorted(signins.items()))}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--buyers", type=int, default=8)
+    parser.add_argument("--think", type=float, default=0.05, help="seconds each buyer pauses between rounds")
+    parser.add_argument("--flood-rate", type=float, default=500.0, help="signin guesses per second")
+    parser.add_argument("--attacker-ips", type=int, default=20, help="addresses the guesses come from")
+    parser.add_argument("--max-slowdown", type=float, default=3.0,
+                        help="allowed checkout p99 under the flood with admission control, relative to no flood")
+    args = parser.parse_args()
+
+    results = asyncio.run(compare(args, seed(args.buyers)))
+    failed = [label for label, (_, checkouts) in results.items() if set(checkouts) - {200}]
+    if failed:
+        print(f"FAIL: checkouts failed in {failed}")
+        sys.exit(1)
+    baseline, guarded = percentile(results["no flood"][0], 99), percentile(results["flood+admission"][0], 99)
+    if guarded > args.max_slowdown * baseline:
+        print(f"FAIL: checkout p99 {guarded:.2f}ms under the flood, {baseline:.2f}ms without it")
+        sys.exit(1)
+    print(f"PASS: checkout p99 {guarded:.2f}ms under the flood with admission control, {baseline:.2f}ms without it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Deep-page latency: OFFSET/LIMIT vs keyset cursors for product listings."""
+import argparse
+import asyncio
+from sqlalchemy import select
+from benchmarks.common import Timer, percentile, reset_database
+from benchmarks.search import load_catalog
+from app.core.database import AsyncSessionLocal
+from app.products.models import Product
+from app.products.utils import encode_cursor, paginate_by_cursor
+
+PAGES = [1, 100, 1_000, 10_000]
+
+
+async def offset_page(db, sort_by, page, page_size):
+    column = getattr(Product, sort_by)
+    return (await db.scalars(select(Product).order_by(column).offset((page - 1) * page_size).limit(page_size))).all()
+
+
+async def cursor_for_page(db, sort_by, page, page_size):
+    # The cursor a client would hold after walking to `page`.
+    if page == 1:
+        return None
+    column = getattr(Product, sort_by)
+    last = await db.scalar(select(Product).order_by(column, Product.id).offset((page - 1) * page_size - 1).limit(1))
+    return encode_cursor(sort_by, last)
+
+
+async def measure(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        with Timer() as timer:
+            await fn()
+        samples.append(timer.elapsed * 1000)
+    return percentile(samples, 50)
+
+
+async def run(rows, page_size, iterations):
+    async with AsyncSessionLocal() as db:
+        for sort_by in ("id", "price", "name"):
+            for page in PAGES:
+                if (page - 1) * page_size >= rows:
+                    continue
+                cursor = await cursor_for_page(db, sort_by, page, page_size)
+                offset_ms = await measure(lambda: offset_page(db, sort_by, page, page_size), iterations)
+                cursor_ms = await measure(lambda: paginate_by_cursor(db, select(Product), sort_by, cursor, page_size), iterations)
+                print(f"sort={sort_by:5} page={page:>6} offset p50={offset_ms:8.2f}ms cursor p50={cursor_ms:6.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    reset_database()
+    load_catalog(args.rows)
+    asyncio.run(run(args.rows, args.page_size, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Query-count regression check for list-shaped endpoints.
+
+Each endpoint is called twice, once with a small result and once with a large
+one. The check exits with code 1 if the number of SQL statements grows with
+the result size, which is the signature of N+1 relationship loading.
+"""
+import sys
+from fastapi.testclient import TestClient
+from benchmarks.common import reset_database
+from app.core.database import SessionLocal, async_engine
+from app.core.query_counter import count_queries
+from app.auth.models import User, UserRole
+from app.auth.utils import create_access_token, token_cache
+from app.cart.models import Cart
+from app.orders.models import Order, OrderItem
+from app.products.models import Product
+from app.main import app
+
+SMALL, LARGE = 1, 200
+
+
+def seed_user(db, name: str, lines: int) -> dict:
+    user = User(name=name, email=f"{name}@example.com", hashed_password="x", role=UserRole.user)
+    db.add(user)
+    db.flush()
+    products = [
+        Product(name=f"{name}-item-{i}", description="", price=1.0 + i, stock=1000, category="bulk")
+        for i in range(lines)
+    ]
+    db.add_all(products)
+    db.flush()
+    db.add_all(Cart(user_id=user.id, product_id=p.id, quantity=1) for p in products)
+    order = Order(user_id=user.id, total=0, item_count=len(products))
+    db.add(order)
+    db.flush()
+    db.add_all(OrderItem(order_id=order.id, product_id=p.id, quantity=1, price=p.price, product_name=p.name,
+                          product_category=p.category) for p in products)
+    db.commit()
+    token = create_access_token(data={"id": user.id, "email": user.email, "role": "user"})
+    return {"headers": {"Authorization": f"Bearer {token}"}, "order_id": order.id}
+
+
+ENDPOINTS = {
+    "GET /cart/": lambda client, ctx: client.get("/cart/", headers=ctx["headers"]),
+    "GET /orders/": lambda client, ctx: client.get("/orders/", headers=ctx["headers"]),
+    "GET /orders/export": lambda client, ctx: client.get("/orders/export", headers=ctx["headers"]),
+    "GET /orders/{id}": lambda client, ctx: client.get(f"/orders/{ctx['order_id']}", headers=ctx["headers"]),
+}
+
+
+def main():
+    reset_database()
+    db = SessionLocal()
+    small = seed_user(db, "small", SMALL)
+    large = seed_user(db, "large", LARGE)
+    db.close()
+
+    client = TestClient(app)
+    # token revocations are polled once per interval, not per request: poll
+    # now and keep the periodic read out of the counts
+    token_cache.refresh_interval = float("inf")
+    client.get("/cart/", headers=small["headers"])
+    failed = False
+    for name, call in ENDPOINTS.items():
+        counts = []
+        for ctx in (small, large):
+            with count_queries(async_engine.sync_engine) as counter:
+                response = call(client, ctx)
+            assert response.status_code == 200, response.text
+            counts.append(counter.count)
+        status = "ok" if counts[0] == counts[1] else "FAIL"
+        failed = failed or status == "FAIL"
+        print(f"{status:4} {name:18} {SMALL} rows: {counts[0]} queries, {LARGE} rows: {counts[1]} queries")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
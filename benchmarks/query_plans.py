@@ -0,0 +1,100 @@
+"""EXPLAIN QUERY PLAN regression check.
+
+Drives every route through the test client, captures the SQL each one runs
+and asks SQLite for its plan. Exits with code 1 if any query falls back to a
+full table scan (a bare "SCAN <table>" step), which means an index is missing.
+"""
+import re
+import sys
+from fastapi.testclient import TestClient
+from benchmarks.common import reset_database
+from benchmarks.query_counts import seed_user
+from app.core.database import Base, SessionLocal, async_engine, engine
+from app.core.query_counter import count_queries
+from app.auth.models import User, UserRole
+from app.auth.utils import create_access_token
+from app.main import app
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+# Summary tables hold one row per category and are meant to be read whole.
+SCANNED_WHOLE = {"category_facets"}
+
+
+def admin_headers(db):
+    admin = User(name="admin", email="admin@example.com", hashed_password="x", role=UserRole.admin)
+    db.add(admin)
+    db.commit()
+    token = create_access_token(data={"id": admin.id, "email": admin.email, "role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def scenarios(ctx, admin):
+    user = ctx["headers"]
+    return {
+        "GET /products filtered": lambda c: c.get("/products", params={"category": "bulk", "min_price": 2, "max_price": 50, "sort_by": "price"}),
+        "GET /products by name": lambda c: c.get("/products", params={"sort_by": "name", "page": 3}),
+        "GET /products cursor": lambda c: c.get("/products", params={"pagination": "cursor", "sort_by": "price", "cursor": ctx["price_cursor"]}),
+        "GET /products/search": lambda c: c.get("/products/search", params={"search_word": "item"}),
+        "GET /products/{id}": lambda c: c.get("/products/1"),
+        "GET /products/facets": lambda c: c.get("/products/facets"),
+        "GET /admin/products": lambda c: c.get("/admin/products", params={"sort_by": "price"}, headers=admin),
+        "GET /cart/": lambda c: c.get("/cart/", headers=user),
+        "POST /cart/": lambda c: c.post("/cart/", json={"product_id": 1, "quantity": 1}, headers=user),
+        "PATCH /cart/{id}": lambda c: c.patch("/cart/2", json={"quantity": 1}, headers=user),
+        "POST /cart/batch": lambda c: c.post("/cart/batch", json={"operations": [
+            {"op": "add", "product_id": 1, "quantity": 1}, {"op": "set", "product_id": 2, "quantity": 2},
+        ]}, headers=user),
+        "DELETE /cart/{id}": lambda c: c.delete("/cart/3", headers=user),
+        "GET /orders/": lambda c: c.get("/orders/", headers=user),
+        "GET /orders/export": lambda c: c.get("/orders/export", params={"format": "csv"}, headers=user),
+        "GET /orders/{id}": lambda c: c.get(f"/orders/{ctx['order_id']}", headers=user),
+        "POST /orders/checkout": lambda c: c.post("/orders/checkout", headers=user),
+    }
+
+
+def full_scans(conn, statement, parameters):
+    # Only real tables count; scans of subqueries and FTS virtual tables are fine.
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).all()
+    return [
+        row[-1] for row in plan
+        if (match := FULL_SCAN.match(row[-1])) and match.group(1) in Base.metadata.tables
+        and match.group(1) not in SCANNED_WHOLE
+    ]
+
+
+def main():
+    reset_database()
+    db = SessionLocal()
+    ctx = seed_user(db, "shopper", 50)
+    admin = admin_headers(db)
+    db.close()
+
+    client = TestClient(app)
+    ctx["price_cursor"] = client.get(
+        "/products", params={"pagination": "cursor", "sort_by": "price", "page_size": 5}
+    ).json()["data"]["next_cursor"]
+
+    failed = False
+    with engine.connect() as conn:
+        for name, call in scenarios(ctx, admin).items():
+            with count_queries(async_engine.sync_engine) as counter:
+                response = call(client)
+            assert response.status_code < 500, response.text
+            clean = True
+            for statement, parameters in zip(counter.statements, counter.parameters):
+                if parameters is None or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                scans = full_scans(conn, statement, parameters)
+                if scans:
+                    clean = False
+                    print(f"FAIL {name}: {', '.join(scans)}\n     {' '.join(statement.split())}")
+            if clean:
+                print(f"ok   {name} ({counter.count} queries)")
+            failed = failed or not clean
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
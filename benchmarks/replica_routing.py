@@ -0,0 +1,91 @@
+"""Read replica routing: replica reads, read-your-writes stickiness and fallback.
+
+Uses a second SQLite file as the "replica", copied from the primary once and
+never updated, so it stays as stale as a lagging replica. Checks that reads
+go to the replica, that a client which just wrote reads the primary until its
+stickiness window expires, and that reads fall back to the primary while the
+replica is unreachable. Exits non-zero on any failure.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+REPLICA_PATH = os.path.join(tempfile.gettempdir(), "python_cap_bench_replica.db")
+os.environ.setdefault("DATABASE_REPLICA_URL", f"sqlite:///{REPLICA_PATH}")
+os.environ.setdefault("REPLICA_STICKY_SECONDS", "1.0")
+
+import httpx  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from benchmarks.common import remove_sqlite_files, reset_database  # noqa: E402
+from app.auth.models import User, UserRole  # noqa: E402
+from app.auth.utils import create_access_token  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.core.sessions import STICKY_COOKIE, session_provider  # noqa: E402
+from app.main import app  # noqa: E402
+from app.products.models import Product  # noqa: E402
+
+
+def seed():
+    reset_database()
+    with SessionLocal() as db:
+        user = User(name="replica", email="replica@example.com", hashed_password="x", role=UserRole.user)
+        db.add_all([user, Product(name="lamp", description="", price=10.0, stock=10, category="home")])
+        db.commit()
+        user_id = user.id
+    engine.dispose()
+    # The backup API copies a consistent snapshot whatever the journal mode.
+    remove_sqlite_files(REPLICA_PATH)
+    with sqlite3.connect(engine.url.database) as source, sqlite3.connect(REPLICA_PATH) as target:
+        source.backup(target)
+    return {"Authorization": "Bearer " + create_access_token(data={"id": user_id, "email": "replica@example.com", "role": "user"})}
+
+
+async def cart_size(client, headers):
+    response = await client.get("/cart/", headers=headers)
+    return len(response.json()["data"])
+
+
+async def run(headers, sticky_seconds):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = []
+
+    def check(name, ok):
+        results.append(ok)
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as writer, \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as other:
+        response = await writer.post("/cart/", json={"product_id": 1, "quantity": 1}, headers=headers)
+        check("write sets the stickiness cookie", response.status_code == 200 and STICKY_COOKIE in response.cookies)
+        check("writer reads its own write from the primary", await cart_size(writer, headers) == 1)
+        check("other clients read the (stale) replica", await cart_size(other, headers) == 0)
+
+        await asyncio.sleep(sticky_seconds + 0.2)
+        check("writer is back on the replica after the window", await cart_size(writer, headers) == 0)
+
+        broken = create_async_engine(f"sqlite+aiosqlite:///{tempfile.gettempdir()}/missing-dir/replica.db")
+        session_provider.replica = async_sessionmaker(bind=broken)
+        session_provider._next_probe = 0.0
+        check("reads fall back to the primary while the replica is down", await cart_size(other, headers) == 1)
+        check("replica is marked unhealthy", not session_provider.replica_healthy)
+        await broken.dispose()
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+    if session_provider.replica is None:
+        sys.exit("DATABASE_REPLICA_URL is not set")
+    headers = seed()
+    ok = asyncio.run(run(headers, settings.REPLICA_STICKY_SECONDS))
+    remove_sqlite_files(REPLICA_PATH)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Load scenarios with latency percentiles and throughput, saved as a JSON report.
+
+Scenarios: browse (catalog pages and product detail), search, cart_churn
+(add, view, update, remove), checkout_burst (add to cart then check out, all
+clients at once) and login_storm. Each runs --concurrency clients in a closed
+loop for --duration seconds. By default the app runs in-process over httpx's
+ASGITransport; --base-url drives a running server instead:
+
+    python -m benchmarks.scenarios --generate --products 100000
+    python -m benchmarks.scenarios browse search --base-url http://127.0.0.1:8000
+
+The target must serve a database loaded by benchmarks.dataset with the same
+--users and --products. The report goes to benchmarks/reports/ unless
+--output says otherwise; compare two with benchmarks.compare.
+"""
+import argparse
+import asyncio
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import httpx
+import orjson
+from benchmarks.common import percentile
+from benchmarks.dataset import PASSWORD, generate, user_email
+from benchmarks.search import CATEGORIES, QUERIES
+
+REPORTS_DIR = os.path.join(os.path.dirname(__file__), "reports")
+
+SCENARIOS = {}
+
+
+def scenario(needs_login: bool):
+    def register(fn):
+        SCENARIOS[fn.__name__] = (fn, needs_login)
+        return fn
+    return register
+
+
+class Client:
+    """One simulated user: an HTTP client, its own seeded RNG and token, and the shared recorder."""
+
+    def __init__(self, http: httpx.AsyncClient, rng: random.Random, users: int, products: int, samples: dict):
+        self.http = http
+        self.rng = rng
+        self.users = users
+        self.products = products
+        self.samples = samples
+        self.headers = {}
+
+    async def request(self, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, headers=self.headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0  # transport failure, reported as status 0
+        self.samples.setdefault(label, []).append(((time.perf_counter() - started) * 1000, status))
+        return response
+
+    def product_id(self):
+        return self.rng.randint(1, self.products)
+
+
+@scenario(needs_login=False)
+async def browse(client: Client):
+    if client.rng.random() < 0.6:
+        params = {"sort_by": client.rng.choice(["id", "price", "name"]), "page": client.rng.randint(1, 50)}
+        if client.rng.random() < 0.5:
+            params["category"] = client.rng.choice(CATEGORIES)
+        await client.request("GET /products", "GET", "/products", params=params)
+    else:
+        await client.request("GET /products/{id}", "GET", f"/products/{client.product_id()}")
+
+
+@scenario(needs_login=False)
+async def search(client: Client):
+    await client.request("GET /products/search", "GET", "/products/search",
+                         params={"search_word": client.rng.choice(QUERIES), "page": client.rng.randint(1, 3)})
+
+
+@scenario(needs_login=True)
+async def cart_churn(client: Client):
+    product_id = client.product_id()
+    await client.request("POST /cart/", "POST", "/cart/", json={"product_id": product_id, "quantity": 1})
+    await client.request("GET /cart/", "GET", "/cart/")
+    await client.request("PATCH /cart/{id}", "PATCH", f"/cart/{product_id}", json={"quantity": 2})
+    await client.request("DELETE /cart/{id}", "DELETE", f"/cart/{product_id}")
+
+
+@scenario(needs_login=True)
+async def checkout_burst(client: Client):
+    await client.request("POST /cart/", "POST", "/cart/", json={"product_id": client.product_id(), "quantity": 1})
+    await client.request("POST /orders/checkout", "POST", "/orders/checkout")
+
+
+@scenario(needs_login=False)
+async def login_storm(client: Client):
+    email = user_email(client.rng.randint(1, client.users))
+    await client.request("POST /auth/signin", "POST", "/auth/signin", json={"email": email, "password": PASSWORD})
+
+
+def summarize(samples: list, elapsed: float):
+    latencies = [latency for latency, _ in samples]
+    statuses = {}
+    for _, status in samples:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "errors": sum(count for status, count in statuses.items() if status == 0 or status >= 500),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies, default=0.0), 3),
+        },
+    }
+
+
+async def run_scenario(name: str, http: httpx.AsyncClient, args):
+    step, needs_login = SCENARIOS[name]
+    samples = {}
+    clients = []
+    for number in range(args.concurrency):
+        client = Client(http, random.Random(f"{args.seed}-{name}-{number}"), args.users, args.products, samples)
+        if needs_login:
+            # distinct users, so carts and checkouts do not contend on one row
+            email = user_email(number % args.users + 1)
+            response = await http.post("/auth/signin", json={"email": email, "password": PASSWORD})
+            response.raise_for_status()
+            client.headers = {"Authorization": "Bearer " + response.json()["data"]["access_token"]}
+        clients.append(client)
+
+    deadline = time.perf_counter() + args.warmup
+    while time.perf_counter() < deadline:
+        await step(clients[0])
+    samples.clear()
+
+    async def loop(client):
+        while time.perf_counter() < deadline:
+            await step(client)
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(loop(client) for client in clients))
+    elapsed = time.perf_counter() - started
+
+    report = summarize([sample for label in samples.values() for sample in label], elapsed)
+    report["endpoints"] = {label: summarize(values, elapsed) for label, values in sorted(samples.items())}
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from app.main import app
+        transport, base_url = httpx.ASGITransport(app=app, raise_app_exceptions=False), "http://bench"
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as http:
+        for name in args.scenarios:
+            results[name] = await run_scenario(name, http, args)
+            latency = results[name]["latency_ms"]
+            print(f"{name:15} {results[name]['throughput_rps']:9.1f} req/s  p50={latency['p50']:8.2f}ms "
+                  f"p95={latency['p95']:8.2f}ms p99={latency['p99']:8.2f}ms  errors={results[name]['errors']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds per scenario, not recorded")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--users", type=int, default=1_000, help="as loaded by benchmarks.dataset")
+    parser.add_argument("--products", type=int, default=100_000, help="as loaded by benchmarks.dataset")
+    parser.add_argument("--orders", type=int, default=10_000, help="with --generate")
+    parser.add_argument("--generate", action="store_true", help="load a fresh dataset first (local database only)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="report path (default: benchmarks/reports/<utc time>.json)")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    if args.generate:
+        generate(users=args.users, products=args.products, orders=args.orders, seed=args.seed)
+    started = datetime.now(timezone.utc)
+    results = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            "started_at": started.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": args.base_url or "in-process",
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(REPORTS_DIR, started.strftime("%Y%m%dT%H%M%SZ") + ".json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "wb") as report_file:
+        report_file.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f"report: {output}")
+
+
+if __name__ == "__main__":
+    main()
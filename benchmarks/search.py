@@ -0,0 +1,84 @@
+"""Product search benchmark: FTS5 index vs the old ilike '%word%' scan.
+
+Bulk-loads a synthetic catalog (1M products by default), then times both
+search paths for a fixed set of search words.
+"""
+import argparse
+import asyncio
+import random
+from sqlalchemy import select
+from benchmarks.common import Timer, percentile, reset_database
+from app.core.database import AsyncSessionLocal, engine
+from app.products.models import Product
+from app.products.search import search_products
+
+WORDS = [
+    "steel", "cotton", "wireless", "organic", "vintage", "compact", "deluxe", "bamboo",
+    "leather", "ceramic", "portable", "carbon", "linen", "smart", "classic", "ultra",
+]
+NOUNS = ["lamp", "chair", "speaker", "mug", "jacket", "backpack", "kettle", "watch", "desk", "blanket"]
+CATEGORIES = ["home", "audio", "kitchen", "fashion", "office", "outdoor"]
+QUERIES = ["lamp", "wire", "organic mug", "vintage leather jacket", "smar", "zzz"]
+
+
+def load_catalog(rows: int, batch: int = 50_000):
+    rng = random.Random(42)
+    insert = "INSERT INTO products (name, description, price, stock, category, image_url) VALUES (?, ?, ?, ?, ?, ?)"
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, rows, batch):
+            cursor.executemany(insert, [
+                (
+                    f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(NOUNS)} {i}",
+                    f"A {rng.choice(WORDS)} {rng.choice(NOUNS)} for everyday use",
+                    round(rng.uniform(1, 500), 2),
+                    rng.randint(0, 100),
+                    rng.choice(CATEGORIES),
+                    None,
+                )
+                for i in range(start, min(start + batch, rows))
+            ])
+        raw.commit()
+    finally:
+        raw.close()
+
+
+async def ilike_search(db, word):
+    # The pre-FTS implementation: unbounded substring scan.
+    return (await db.scalars(select(Product).where(Product.name.ilike(f"%{word}%")))).all()
+
+
+async def time_path(label, fn, iterations):
+    async with AsyncSessionLocal() as db:
+        for query in QUERIES:
+            samples = []
+            for _ in range(iterations):
+                with Timer() as timer:
+                    await fn(db, query)
+                samples.append(timer.elapsed * 1000)
+            print(f"{label:6} {query!r:26} p50={percentile(samples, 50):8.2f}ms p95={percentile(samples, 95):8.2f}ms")
+
+
+async def compare(iterations, page_size):
+    await time_path("ilike", ilike_search, iterations)
+    await time_path("fts5", lambda db, q: search_products(db, q, 1, page_size), iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args()
+
+    reset_database()
+    with Timer() as timer:
+        load_catalog(args.rows)
+    print(f"loaded {args.rows} products (with FTS triggers) in {timer.elapsed:.1f}s")
+
+    asyncio.run(compare(args.iterations, args.page_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Serialization cost of a 1,000-item product list, old response path vs new.
+
+The old path dumped each product to a dict, let FastAPI re-validate the list
+against response_model and rendered it with the stdlib json module. The new
+path validates the list once and renders with orjson; a cached page skips
+validation entirely. No database or HTTP is involved.
+"""
+import argparse
+import json
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+from benchmarks.common import Timer
+from app.products.models import Product
+from app.products.schemas import ProductResponse
+from app.products.utils import dump_products
+from app.utils.response import FastJSONResponse
+
+RESPONSE_FIELD = create_model_field(name="response", type_=list[ProductResponse], mode="serialization")
+
+
+def legacy(products):
+    data = [ProductResponse.model_validate(product).model_dump() for product in products]
+    value, _ = RESPONSE_FIELD.validate(data, {}, loc=("response",))
+    return JSONResponse(RESPONSE_FIELD.serialize(value)).body
+
+
+def current(products):
+    return FastJSONResponse(dump_products(products)).body
+
+
+def per_call_ms(fn, arg, iterations):
+    with Timer() as timer:
+        for _ in range(iterations):
+            fn(arg)
+    return timer.elapsed / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    products = [
+        Product(id=i, name=f"product {i}", description="A sturdy product for everyday use",
+                price=round(i * 1.25, 2), stock=i % 100, category="home", image_url=None)
+        for i in range(1, args.items + 1)
+    ]
+    assert json.loads(legacy(products)) == json.loads(current(products))
+    cached = dump_products(products)
+
+    old = per_call_ms(legacy, products, args.iterations)
+    new = per_call_ms(current, products, args.iterations)
+    hit = per_call_ms(lambda data: FastJSONResponse(data).body, cached, args.iterations)
+    print(f"stdlib json + response_model: {old:7.3f} ms/response")
+    print(f"validate once + orjson:       {new:7.3f} ms/response  ({old / new:.1f}x)")
+    print(f"cached page + orjson:         {hit:7.3f} ms/response  ({old / hit:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Per-request auth overhead of get_current_user with and without the token cache."""
+import argparse
+import asyncio
+from jose import jwt
+from benchmarks.common import Timer, reset_database
+from app.core.config import settings
+from app.auth.dependencies import get_current_user
+from app.auth.utils import create_access_token, token_cache
+
+
+def uncached(token):
+    return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+async def per_call_us(fn, token, iterations):
+    with Timer() as timer:
+        for _ in range(iterations):
+            await fn(token)
+    return timer.elapsed / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # get_current_user reads token revocations from the database
+    reset_database()
+    token = create_access_token(data={"id": 1, "email": "bench@example.com", "role": "user"})
+
+    async def without_cache(t):
+        return uncached(t)
+
+    token_cache.clear()
+    no_cache = asyncio.run(per_call_us(without_cache, token, args.iterations))
+    with_cache = asyncio.run(per_call_us(get_current_user, token, args.iterations))
+
+    print(f"jwt.decode every request: {no_cache:7.2f} us/request")
+    print(f"get_current_user + cache: {with_cache:7.2f} us/request  ({no_cache / with_cache:.1f}x)")
+    print(f"cache stats: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()